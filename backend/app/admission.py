@@ -0,0 +1,295 @@
+"""
+准入控制：按成本 (预计的上游调用数) 给昂贵接口的请求计费，总成本有上限；
+超出时按客户端排队、公平调度，排不上或等太久就返回 503 + Retry-After，而不是让延迟无限增长。
+
+- 成本：/api/audit = 1 次抽取 + 每条引用约 3 次上游调用 (OpenAlex / S2 / Gemini)，引用数按正文里的
+  引用标记估计 (最多 MAX_CITATIONS 条)；/api/chat = 1 (Last-Event-ID 能续上缓冲中的流时不计费，
+  续不上会重新生成，照常计费)；/api/realibuddy/audit 和 /api/realibuddy/stream 的每一批 = REALIBUDDY_COST。
+- WebSocket (/api/realibuddy/stream) 不经过中间件：会话里每批核查前调用 acquire / release
+  (见 realibuddy_stream.py)，与 HTTP 请求共用同一个控制器和公平队列。
+- 公平调度：start-time fair queueing。每个客户端 (与 slowapi 一样按来源 IP) 有自己的虚拟时间，
+  每个请求的标签 = max(全局虚拟时间, 该客户端上个请求的结束标签)，结束标签 = 标签 + 成本；
+  有空余容量时总是先放行标签最小的请求。一个客户端连续提交大批审计只会推高它自己的虚拟时间，
+  其他客户端的请求插到它前面。队头放不下时不跳过 (避免大请求饿死)。
+- 占用的容量在整个响应 (包括流式响应体) 结束后才释放，因此做成 ASGI 中间件而不是依赖项。
+- 拒绝 (shed) 原因：client_queue (该客户端排队请求过多)、queue_full (排队总成本过高)、
+  predicted_wait (预计等待超过上限)、timeout (排队超时)。
+
+环境变量：
+    ADMISSION_ENABLED=1
+    ADMISSION_CAPACITY=64              同时在途的总成本
+    ADMISSION_MAX_QUEUED_PER_CLIENT=4
+    ADMISSION_MAX_QUEUED_COST=128      排队中的总成本上限
+    ADMISSION_MAX_WAIT=20              最长排队时间 (秒)
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.metrics import metrics
+from app.sse import chat_streams
+
+load_dotenv()
+
+ENABLED = os.getenv("ADMISSION_ENABLED", "1") != "0"
+CAPACITY = float(os.getenv("ADMISSION_CAPACITY", 64))
+MAX_QUEUED_PER_CLIENT = int(os.getenv("ADMISSION_MAX_QUEUED_PER_CLIENT", 4))
+MAX_QUEUED_COST = float(os.getenv("ADMISSION_MAX_QUEUED_COST", 128))
+MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", 20))
+
+MAX_CITATIONS = 10  # 与 /api/audit 的截断一致
+CALLS_PER_CITATION = 3
+REALIBUDDY_COST = 2  # 一次核查 (单条接口，或流式接口的一批)
+# 粗略的引用标记：(Author, 2020) / (Author et al., 2020a) / [12] / [3, 4] / DOI / arXiv ID
+_CITATION_MARKERS = re.compile(
+    r"\([^()]{0,120}?\b(?:19|20)\d{2}[a-z]?\s*\)"
+    r"|\[\d+(?:\s*[,–-]\s*\d+)*\]"
+    r"|\b10\.\d{4,9}/\S+"
+    r"|\barxiv:\s*\d{4}\.\d{4,5}",
+    re.IGNORECASE,
+)
+# 初始的平均占用时长 (秒)，之后按实际占用时长做指数滑动平均，用于估算等待时间
+DEFAULT_HOLD_S = 10.0
+
+
+def estimate_audit_cost(text: str) -> float:
+    citations = len(_CITATION_MARKERS.findall(text or ""))
+    return 1 + CALLS_PER_CITATION * min(MAX_CITATIONS, max(1, citations))
+
+
+def _audit_cost(body: dict, headers: Dict[str, str]) -> float:
+    return estimate_audit_cost(body.get("text", ""))
+
+
+def _chat_cost(body: dict, headers: Dict[str, str]) -> float:
+    # 续传只是重放服务端缓冲，不会再调用 LLM；缓冲已过期 (或 ID 是编的) 时 chat_endpoint 会重新生成
+    return 0 if chat_streams.resume(headers.get("last-event-id")) is not None else 1
+
+
+def _realibuddy_cost(body: dict, headers: Dict[str, str]) -> float:
+    return REALIBUDDY_COST
+
+
+COSTS: Dict[str, Callable[[dict, Dict[str, str]], float]] = {
+    "/api/audit": _audit_cost,
+    "/api/chat": _chat_cost,
+    "/api/realibuddy/audit": _realibuddy_cost,
+}
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("client", "cost", "future", "enqueued_at", "done")
+
+    def __init__(self, client: str, cost: float):
+        self.client = client
+        self.cost = cost
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.done = False  # 已放行或已放弃 (超时)；堆里的条目惰性删除
+
+
+class AdmissionController:
+    def __init__(self, capacity: float = CAPACITY, max_queued_per_client: int = MAX_QUEUED_PER_CLIENT,
+                 max_queued_cost: float = MAX_QUEUED_COST, max_wait: float = MAX_WAIT):
+        self.capacity = capacity
+        self.max_queued_per_client = max_queued_per_client
+        self.max_queued_cost = max_queued_cost
+        self.max_wait = max_wait
+        self.in_flight = 0.0
+        self.queued_cost = 0.0
+        self.queued_by_client: Dict[str, int] = defaultdict(int)
+        self.heap: List[tuple] = []  # (start_tag, seq, waiter)
+        self.seq = itertools.count()
+        self.vtime = 0.0
+        self.last_finish: Dict[str, float] = {}
+        self.avg_hold_s = DEFAULT_HOLD_S
+
+    def _tag(self, client: str, cost: float) -> float:
+        start = max(self.vtime, self.last_finish.get(client, 0.0))
+        self.last_finish[client] = start + cost
+        return start
+
+    def retry_after(self, cost: float = 0.0) -> float:
+        """预计等待时间：排在前面的成本需要多少轮 "容量 x 平均占用时长" 才能消化完"""
+        backlog = self.queued_cost + max(0.0, self.in_flight + cost - self.capacity)
+        return backlog / self.capacity * self.avg_hold_s
+
+    async def acquire(self, client: str, cost: float) -> float:
+        """排队直到放行，返回实际计入的成本 (release 时原样交回)；过载时抛 Overloaded"""
+        cost = min(max(cost, 0.0), self.capacity)
+        if cost == 0:
+            return cost
+        if not self.heap and self.in_flight + cost <= self.capacity:
+            self.vtime = self._tag(client, cost)
+            self.in_flight += cost
+            metrics.observe("admission.queue_wait_ms", 0.0)
+            return cost
+
+        if self.queued_by_client.get(client, 0) >= self.max_queued_per_client:
+            raise self._shed("client_queue", cost)
+        if self.queued_cost + cost > self.max_queued_cost:
+            raise self._shed("queue_full", cost)
+        if self.retry_after(cost) > self.max_wait:
+            raise self._shed("predicted_wait", cost)
+
+        waiter = _Waiter(client, cost)
+        heapq.heappush(self.heap, (self._tag(client, cost), next(self.seq), waiter))
+        self.queued_cost += cost
+        self.queued_by_client[client] += 1
+        metrics.incr("admission.queued")
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done:
+                # 放行与超时 / 取消同时发生：容量已经计入，交回去
+                self.release(cost, 0.0)
+            else:
+                self._dequeue(waiter)
+                self._dispatch()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._shed("timeout", cost) from None
+            raise
+        metrics.observe("admission.queue_wait_ms", (time.monotonic() - waiter.enqueued_at) * 1000)
+        return cost
+
+    def release(self, cost: float, held_s: float) -> None:
+        if cost == 0:
+            return
+        self.in_flight = max(0.0, self.in_flight - cost)
+        if held_s > 0:
+            self.avg_hold_s = 0.9 * self.avg_hold_s + 0.1 * held_s
+        self._dispatch()
+
+    def _dequeue(self, waiter: _Waiter) -> None:
+        waiter.done = True
+        self.queued_cost -= waiter.cost
+        self.queued_by_client[waiter.client] -= 1
+        if not self.queued_by_client[waiter.client]:
+            del self.queued_by_client[waiter.client]
+
+    def _dispatch(self) -> None:
+        while self.heap:
+            start, _, waiter = self.heap[0]
+            if waiter.done:
+                heapq.heappop(self.heap)
+                continue
+            if self.in_flight + waiter.cost > self.capacity:
+                return
+            heapq.heappop(self.heap)
+            self._dequeue(waiter)
+            self.vtime = max(self.vtime, start)
+            self.in_flight += waiter.cost
+            waiter.future.set_result(None)
+        if len(self.last_finish) > 1024:
+            # 结束标签已落后于全局虚拟时间的客户端没有影响，清掉
+            self.last_finish = {c: f for c, f in self.last_finish.items() if f > self.vtime}
+
+    def _shed(self, reason: str, cost: float) -> Overloaded:
+        metrics.incr(f"admission.shed.{reason}")
+        return Overloaded(reason, max(1.0, min(120.0, self.retry_after(cost))))
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "in_flight_cost": round(self.in_flight, 1),
+            "queued_cost": round(self.queued_cost, 1),
+            "queued_requests": sum(self.queued_by_client.values()),
+            "clients_waiting": len(self.queued_by_client),
+            "avg_hold_s": round(self.avg_hold_s, 2),
+            "retry_after_s": round(self.retry_after(), 1),
+        }
+
+
+admission = AdmissionController()
+
+
+def _client_id(scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+async def _send_overloaded(send, error: Overloaded) -> None:
+    retry_after = str(math.ceil(error.retry_after))
+    body = json.dumps({"error": "Server is busy, please retry later.", "reason": error.reason,
+                       "retry_after": int(retry_after)}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [(b"content-type", b"application/json"), (b"retry-after", retry_after.encode()),
+                    (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """ASGI 中间件：COSTS 里的接口先按成本准入，整个响应 (含流式响应体) 结束后释放"""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission
+
+    async def __call__(self, scope, receive, send):
+        if (not ENABLED or scope["type"] != "http" or scope["method"] != "POST"
+                or scope["path"] not in COSTS):
+            return await self.app(scope, receive, send)
+
+        # 请求体很小 (审计正文最多 5000 字)，先读出来估算成本，再原样交给应用
+        body = await _read_body(receive)
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            payload = {}
+        endpoint = scope["path"]
+        cost = COSTS[endpoint](payload if isinstance(payload, dict) else {}, headers)
+
+        try:
+            cost = await self.controller.acquire(_client_id(scope), cost)
+        except Overloaded as e:
+            print(f"[Admission] Shed {endpoint} from {_client_id(scope)} ({e.reason}, retry in {e.retry_after:.0f}s)")
+            return await _send_overloaded(send, e)
+
+        metrics.incr(f"admission.admitted.{endpoint.strip('/').replace('/', '_')}")
+        metrics.incr("admission.admitted_cost", cost)
+        started = time.monotonic()
+        try:
+            await self.app(scope, replay, send)
+        finally:
+            self.controller.release(cost, time.monotonic() - started)
@@ -0,0 +1,104 @@
+"""
+请求级截止时间：/api/audit 整个请求共用一个预算，各阶段 (OpenAlex / S2 / 审计 / Google 搜索) 的
+固定超时缩到剩余预算以内 (抽取同样受限)；预算不够时跳过可选阶段 (S2 补全、模型升级)，
+引用返回当时能给出的最好结论，并标记 deadline_limited，而不是一直挂着。
+
+截止时间和 "本次工作被截止时间限制过的阶段" 都放在 ContextVar 里，由 deadline_scope 在
+每个引用任务 / 解析任务内部设置，服务层不需要逐层传参；没有设置时 (如 Realibuddy) 一切照旧。
+
+环境变量：
+    AUDIT_DEADLINE=30            每个 /api/audit 请求的总预算 (秒)
+    DEADLINE_MIN_CALL=1.0        剩余预算低于此值时不再发起上游调用
+    DEADLINE_OPTIONAL_BUDGET=5   可选阶段 (S2 补全、模型升级) 至少需要的剩余预算
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+from app.metrics import metrics
+
+load_dotenv()
+
+AUDIT_DEADLINE = float(os.getenv("AUDIT_DEADLINE", 30))
+MIN_CALL = float(os.getenv("DEADLINE_MIN_CALL", 1.0))
+OPTIONAL_BUDGET = float(os.getenv("DEADLINE_OPTIONAL_BUDGET", 5))
+# 上游调用超时时剩余预算不足这么多秒，就认为是被截止时间截断的 (而不是上游本身慢)
+_EXHAUSTED_SLACK = 0.25
+
+
+class Deadline:
+    __slots__ = ("expires_at",)
+
+    def __init__(self, budget: float = AUDIT_DEADLINE):
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+_deadline: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+_limits: ContextVar[Optional[List[str]]] = ContextVar("deadline_limits", default=None)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline], limits: Optional[List[str]] = None):
+    """在当前任务内启用截止时间；被限制的阶段名追加到 limits"""
+    deadline_token = _deadline.set(deadline)
+    limits_token = _limits.set(limits if limits is not None else [])
+    try:
+        yield
+    finally:
+        _limits.reset(limits_token)
+        _deadline.reset(deadline_token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def mark_limited(stage: str, how: str) -> None:
+    """记录 stage 被截止时间限制 (how = skipped / cut)"""
+    metrics.incr(f"deadline.{how}.{stage}")
+    limits = _limits.get()
+    if limits is not None:
+        limits.append(stage)
+
+
+def limited() -> bool:
+    """当前任务里是否有阶段被截止时间限制过"""
+    return bool(_limits.get())
+
+
+def stage_timeout(default: float) -> float:
+    """上游调用的超时：固定超时与剩余预算取小"""
+    left = remaining()
+    if left is None or left >= default:
+        return default
+    return max(left, 0.1)
+
+
+def has_budget(stage: str, needed: float = MIN_CALL) -> bool:
+    """剩余预算够不够跑 stage；不够时记为跳过"""
+    left = remaining()
+    if left is None or left >= needed:
+        return True
+    mark_limited(stage, "skipped")
+    return False
+
+
+def blame_deadline(stage: str) -> bool:
+    """stage 超时 / 失败后调用：预算已经耗尽时记为被截断，返回 True"""
+    left = remaining()
+    if left is None or left > _EXHAUSTED_SLACK:
+        return False
+    mark_limited(stage, "cut")
+    return True
@@ -0,0 +1,56 @@
+"""
+JSON 编解码：装了 orjson 就用 orjson，否则退回标准库 json。
+上游响应解析 (OpenAlex / S2 / Gemini REST) 和 NDJSON 输出都走这里。
+"""
+import json
+import time
+from typing import Any, Union
+
+from app.metrics import metrics
+
+try:
+    import orjson
+except ImportError:  # orjson 是可选依赖
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，捕获这个即可
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj)
+
+
+def ndjson_line(obj: Any) -> bytes:
+    """一行 NDJSON (bytes，直接交给 StreamingResponse)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj) + "\n").encode("utf-8")
+
+
+def loads_response(response, source: str) -> Any:
+    """
+    解析 httpx 响应体，并记录传输字节数 / 解压后字节数 / 解析耗时：
+    upstream.<source>.bytes_wire / bytes_body / parse_ms
+    """
+    body = response.content
+    metrics.incr(f"upstream.{source}.responses")
+    metrics.incr(f"upstream.{source}.bytes_wire", getattr(response, "num_bytes_downloaded", len(body)))
+    metrics.incr(f"upstream.{source}.bytes_body", len(body))
+
+    start = time.perf_counter()
+    data = loads(body)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    metrics.incr(f"upstream.{source}.parse_ms", elapsed_ms)
+    metrics.observe(f"upstream.{source}.parse_ms", elapsed_ms)
+    return data
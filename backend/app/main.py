@@ -1,7 +1,8 @@
 import os
-import json
 import asyncio
-from fastapi import FastAPI, Request
+import time
+from typing import Awaitable, Optional, Tuple
+from fastapi import FastAPI, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, validator
@@ -13,12 +14,26 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage
 
 # --- [Veru Services Imports] ---
-from app.services.llm_extractor import extract_citations_from_text
+from app.services.llm_extractor import TIMEOUT as EXTRACT_TIMEOUT, extract_citations_from_text
 from app.services.openalex import search_paper_on_openalex
-from app.services.google_search import verify_with_google_search
+from app.services.query_planner import openalex_planner
+from app.services.prescreen import short_circuit_rate
+from app.services.google_search import GroundedBatch, verify_with_google_search
+from app.services.key_pool import estimate_tokens, gemini_key_pool
 from app.services.auditor import verify_content_consistency
-from app.services.semantic_scholar import search_paper_on_semantic_scholar
+from app.services.semantic_scholar import S2BatchLookup, search_paper_on_semantic_scholar
+from app.services.dedup import group_citations, pick_representative
+from app.services.fusion import needs_second_source, pick_and_fuse
+from app.services.cache import TTLCache
+from app.services.paper import PaperRecord
 from app.data import get_system_prompt
+from app.json_codec import ndjson_line
+from app.metrics import metrics
+from app.admission import ENABLED as ADMISSION_ENABLED, AdmissionMiddleware, admission
+from app.deadline import OPTIONAL_BUDGET, Deadline, deadline_scope, has_budget, limited, mark_limited, stage_timeout
+from app.profiling import ProfilingMiddleware
+from app.sse import KEEPALIVE, KEEPALIVE_INTERVAL, SSE_HEADERS, chat_streams, gzip_stream, sse_event, wants_gzip
+from app.streaming import DISCONNECTED, cancel_pending, watch_disconnect
 
 # --- [Rate Limiting] ---
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -27,6 +42,7 @@ from slowapi.errors import RateLimitExceeded
 
 # --- realibuddy ---
 from app.services.realibuddy import realibuddy_service
+from app.services.realibuddy_stream import RealibuddyStreamSession
 
 # Load Env
 load_dotenv()
@@ -46,6 +62,35 @@ async def health_check():
     """
     return {"status": "awake", "message": "Ready to serve"}
 
+# === 运行指标 ===
+@app.get("/api/metrics")
+async def get_metrics():
+    """进程内计数器 + 每条引用的平均上游流量 / 解析耗时"""
+    snapshot = metrics.snapshot()
+    snapshot["per_citation"] = {
+        f"{source}.{field}": metrics.per(f"upstream.{source}.{field}", "audit.citations")
+        for source in ("openalex", "s2", "gemini_grounded")
+        for field in ("bytes_wire", "bytes_body", "parse_ms")
+    }
+    # 越低越好：UNVERIFIED 结论占比、走 Google 搜索兜底的占比 (字段融合的目标)
+    snapshot["fallback_rates"] = {
+        "unverified": metrics.per("audit.unverified", "audit.citations"),
+        "google_path": metrics.per("audit.google_path", "audit.citations"),
+    }
+    snapshot["resolution_cache"] = resolution_cache.stats()
+    snapshot["openalex_planner"] = openalex_planner.stats()
+    snapshot["prescreen_short_circuit_rate"] = short_circuit_rate()
+    snapshot["realibuddy_verdict_cache"] = realibuddy_service.cache.stats()
+    snapshot["gemini_keys"] = gemini_key_pool.stats()
+    snapshot["chat_streams_buffered"] = len(chat_streams)
+    snapshot["admission"] = admission.stats()
+    return snapshot
+
+@app.on_event("shutdown")
+async def persist_caches():
+    """关闭时把 Realibuddy 结论缓存写盘 (仅在配置了 REALIBUDDY_CACHE_PATH 时)"""
+    realibuddy_service.cache.save()
+
 # CORS 配置
 # 生产环境配置
 origins = [
@@ -55,13 +100,19 @@ origins = [
     "https://my-dev.vercel.app", # Vercel 分配的测试域名
 ]
 
+# 按成本准入 + 按客户端公平排队，过载时 503 + Retry-After (见 app/admission.py)；
+# 加在 CORS 之前 (即位于其内层)，503 响应也带 CORS 头，浏览器才能读到 Retry-After
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id", "Retry-After"],
 )
+# 按需剖析 (X-Profile 头或采样率触发，见 app/profiling.py)
+app.add_middleware(ProfilingMiddleware)
 
 # === 安全拦截词列表 ===
 FORBIDDEN_PHRASES = [
@@ -85,14 +136,8 @@ class ChatRequest(BaseModel):
     message: str
 
 
-def get_ai_model():
-    """获取 AI 模型实例 (切换为 Gemini)"""
-    # 从 .env 获取 DEV_API_KEY
-    api_key = os.getenv("DEV_API_KEY")
-
-    if not api_key:
-        print("[Warning] DEV_API_KEY not found. AI features may fail.")
-
+def get_ai_model(api_key: str):
+    """获取 AI 模型实例 (切换为 Gemini)，api_key 由 gemini_key_pool 分配"""
     return ChatGoogleGenerativeAI(
         model="gemini-2.5-flash",
         google_api_key=api_key,
@@ -102,38 +147,96 @@ def get_ai_model():
 
 
 @app.post("/api/chat")
-async def chat_endpoint(request: ChatRequest):
-    """主页终端对话接口 (流式)"""
+async def chat_endpoint(request: ChatRequest, http_request: Request):
+    """
+    主页终端对话接口 (SSE 流式)。
+    事件 ID 为 "<stream_id>:<seq>"；断线后带 Last-Event-ID 头重发同一请求即可从断点续传，
+    缓冲仍在时不会再次调用 LLM。
+    """
+    resumed = chat_streams.resume(http_request.headers.get("last-event-id"))
+    if resumed is not None:
+        stream, after = resumed
+        metrics.incr("chat.resumed")
+    else:
+        if http_request.headers.get("last-event-id"):
+            metrics.incr("chat.resume_miss")
+        stream, after = start_chat_generation(request.message), 0
+
+    async def events():
+        stream.subscribers += 1
+        last_sent = time.monotonic()
+        try:
+            async for item in stream.follow(after):
+                if item is None:
+                    # 没有新数据：检查断线，按需发送 keep-alive 注释防止代理超时 / 缓冲
+                    if await http_request.is_disconnected():
+                        metrics.incr("chat.disconnects")
+                        return
+                    if time.monotonic() - last_sent >= KEEPALIVE_INTERVAL:
+                        last_sent = time.monotonic()
+                        yield KEEPALIVE
+                    continue
+                seq, chunk = item
+                last_sent = time.monotonic()
+                yield sse_event(chunk, f"{stream.id}:{seq}")
+            yield sse_event("[DONE]", f"{stream.id}:{len(stream.chunks)}", event="done")
+        finally:
+            stream.release("chat")
+
+    headers = dict(SSE_HEADERS)
+    body = events()
+    if wants_gzip(http_request.headers.get("accept-encoding")):
+        headers.update({"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+        body = gzip_stream(body)
+    return StreamingResponse(body, media_type="text/event-stream", headers=headers)
+
+
+def start_chat_generation(message: str):
+    """新建可续传的流，并在后台开始生成 (与客户端连接解耦)"""
+    stream = chat_streams.create()
+
     # === 安全检查 Guardrail ===
     # 将用户输入转为小写进行检查
-    user_input_lower = request.message.lower()
+    user_input_lower = message.lower()
 
     # 检查是否包含由于恶意意图的关键词
     for phrase in FORBIDDEN_PHRASES:
         if phrase in user_input_lower:
             # 如果发现敏感词，直接返回拒绝信息，不调用 LLM
-            async def deny_response():
-                yield "ACCESS DENIED: Security Protocol Activated. Restricted access to core system instructions."
-
-            return StreamingResponse(deny_response(), media_type="text/event-stream")
-
-    model = get_ai_model()
+            stream.append("ACCESS DENIED: Security Protocol Activated. Restricted access to core system instructions.")
+            stream.finish()
+            return stream
 
     # 获取系统提示词 (包含简历数据)
     prompt_content = get_system_prompt()
     system_prompt = SystemMessage(content=prompt_content)
-    user_message = HumanMessage(content=request.message)
+    user_message = HumanMessage(content=message)
 
-    async def generate():
+    async def pump():
+        # 流式输出开始后无法换 key 重试，这里只做分配与记账；429 时让该 key 进入冷却
+        estimated = estimate_tokens(prompt_content + message)
+        key = None
+        output_chars = 0
         try:
+            key, entry = gemini_key_pool.acquire(estimated)
+            model = get_ai_model(key.key)
             # 使用 LangChain 的 astream 方法
-            async for chunk in model.astream([system_prompt, user_message]):
-                yield chunk.content
+            with metrics.track_upstream("gemini_chat"):
+                async for chunk in model.astream([system_prompt, user_message]):
+                    if chunk.content:
+                        output_chars += len(chunk.content)
+                        stream.append(chunk.content)
+            gemini_key_pool.record_usage(key, entry, estimated + output_chars // 4)
         except Exception as e:
+            if key is not None and ("429" in str(e) or "RESOURCE_EXHAUSTED" in str(e)):
+                gemini_key_pool.mark_exhausted(key)
             print(f"[Chat Error] {e}")
-            yield f"\n[System Error]: Connection to AI Core failed. ({str(e)})"
+            stream.append(f"\n[System Error]: Connection to AI Core failed. ({str(e)})")
+        finally:
+            stream.finish()
 
-    return StreamingResponse(generate(), media_type="text/event-stream")
+    stream.producer = asyncio.create_task(pump())
+    return stream
 
 
 # ==========================================
@@ -142,6 +245,8 @@ async def chat_endpoint(request: ChatRequest):
 
 class AuditRequest(BaseModel):
     text: str = Field(..., max_length=5000)
+    # 渐进模式：先推送 provisional (存在性) 事件，再推送 final (审计结论) 事件
+    progressive: bool = False
 
     @validator('text')
     def prevent_empty(cls, v):
@@ -157,56 +262,133 @@ class AuditResult(BaseModel):
     metadata: dict
     message: str
     confidence: float
+    # 请求截止时间跳过 / 截断了某个阶段，结论是当时能给出的最好结果
+    deadline_limited: bool = False
 
 
 def get_clean_year(year_val):
     return "".join(filter(str.isdigit, str(year_val or "")))
 
 
-async def process_single_citation(cit) -> AuditResult:
+# 跨请求的解析结果缓存：同一篇论文短时间内被重复审计时，跳过 OpenAlex/S2
+resolution_cache = TTLCache(maxsize=512, ttl=600)
+
+
+async def lookup_on_semantic_scholar(cit, s2_batch: Optional[S2BatchLookup] = None) -> PaperRecord:
+    """带 DOI / arXiv ID 的引用用整个请求共享的批量结果，只有标题的 (或批量失败的) 走搜索"""
+    if s2_batch is not None:
+        batch_result = await s2_batch.get(cit)
+        if batch_result is not None:
+            return batch_result
+    return await search_paper_on_semantic_scholar(cit.title, cit.author)
+
+
+async def resolve_citation(cit, s2_batch: Optional[S2BatchLookup] = None) -> Tuple[PaperRecord, str]:
+    """存在性解析：OpenAlex -> Semantic Scholar (兜底 / 补全)，返回 (best_result, source_name)"""
     # 1. OpenAlex
     oa_result = await search_paper_on_openalex(
         title=cit.title, author=cit.author, year=cit.year, doi=cit.doi
     )
-    best_result = oa_result
-    source_name = "OpenAlex"
-
     cit_year = get_clean_year(cit.year)
-    oa_year = get_clean_year(oa_result.get("year"))
-    is_oa_year_match = (cit_year == oa_year) if (cit_year and oa_year) else True
-
-    # 2. Semantic Scholar Fallback
-    if not oa_result["found"] or (oa_result["found"] and not is_oa_year_match):
-        s2_result = await search_paper_on_semantic_scholar(cit.title, cit.author)
-        if s2_result["found"]:
-            s2_year = get_clean_year(s2_result.get("year"))
-            is_s2_year_match = (cit_year == s2_year) if (cit_year and s2_year) else True
-            if not oa_result["found"] or (not is_oa_year_match and is_s2_year_match):
-                best_result = s2_result
-                source_name = "Semantic Scholar"
-
-    # 3. Content Audit / Google Search
-    if best_result["found"]:
+
+    # 2. Semantic Scholar：未找到、年份对不上、或缺摘要时查询，两边是同一篇论文则按字段融合
+    reason = needs_second_source(oa_result, cit_year)
+    if reason is None:
+        return oa_result, "OpenAlex"
+    # OpenAlex 已找到时 S2 只是补全 (可选阶段)，请求剩余预算不够就跳过
+    if reason != "not_found" and not has_budget("s2_enrichment", OPTIONAL_BUDGET):
+        return oa_result, "OpenAlex"
+    metrics.incr(f"fusion.s2_lookup.{reason}")
+    s2_result = await lookup_on_semantic_scholar(cit, s2_batch)
+    return pick_and_fuse(oa_result, s2_result, cit_year)
+
+
+async def resolve_citation_group(key: Optional[str], members: list,
+                                 s2_batch: Optional[S2BatchLookup] = None) -> Tuple[PaperRecord, str]:
+    """同一组引用只解析一次；找到的结果按 canonical key 缓存"""
+    if key is not None:
+        cached = resolution_cache.get(key)
+        if cached is not None:
+            return cached
+
+    resolution = await resolve_citation(pick_representative(members), s2_batch)
+    # 只缓存命中结果：未命中可能是上游临时故障；被截止时间限制过的结果也不缓存
+    if key is not None and resolution[0].found and not limited():
+        resolution_cache.set(key, resolution)
+    return resolution
+
+
+def citation_claim(cit) -> str:
+    """引用自己的待核对内容 (参考文献条目只有标识符时为空)"""
+    return (cit.summary_intent + " " + " ".join(cit.specific_claims)).strip()
+
+
+def searchable(cit) -> bool:
+    """未解析时能否走 Google 核查：至少要有标题或作者"""
+    return bool(cit.title or cit.author)
+
+
+async def process_single_citation(cit, resolution: Optional[Awaitable] = None,
+                                  grounded: Optional[GroundedBatch] = None) -> AuditResult:
+    metrics.incr("audit.citations")
+    # 1 + 2. 存在性解析 (同组引用共享同一个 resolution)
+    if resolution is None:
+        best_result, source_name = await resolve_citation(cit)
+    else:
+        # shield：一条引用被取消不应连带取消同组其他引用共享的解析任务
+        best_result, source_name = await asyncio.shield(resolution)
+
+    # 3. Content Audit / Google Search (针对每条引用自己的 claim)
+    claim = citation_claim(cit)
+    if best_result.found and not claim:
+        # 只有 DOI / arXiv ID 的参考文献条目：没有可核对的内容，解析到论文即通过
+        return AuditResult(
+            citation_text=cit.raw_text,
+            status="REAL",
+            source=source_name,
+            confidence=0.9,
+            metadata=best_result.to_dict(),
+            message="Identifier resolves to an existing paper; no claim attached to check."
+        )
+    if best_result.found:
         consistency_check = await verify_content_consistency(
-            user_claim=cit.summary_intent + " " + " ".join(cit.specific_claims),
-            real_abstract=best_result.get("abstract", "")
+            user_claim=claim,
+            real_abstract=best_result.abstract
         )
         final_status = consistency_check.get("status", "REAL")
         explanation = consistency_check.get("reason", "Verification passed.")
+        if final_status == "UNVERIFIED":
+            metrics.incr("audit.unverified")
 
         return AuditResult(
             citation_text=cit.raw_text,
             status=final_status,
             source=source_name,
             confidence=consistency_check.get("confidence", 1.0),
-            metadata=best_result,
+            metadata=best_result.to_dict(),
             message=explanation
         )
+    elif not searchable(cit):
+        # 只有 DOI / arXiv ID 且两个库都没解析到：没有标题 / 作者可交给 Google 搜索
+        metrics.incr("audit.unverified")
+        return AuditResult(
+            citation_text=cit.raw_text,
+            status="UNVERIFIED",
+            source="OpenAlex / Semantic Scholar",
+            confidence=0.0,
+            metadata=best_result.to_dict(),
+            message="Identifier not found in OpenAlex or Semantic Scholar; no title or author to search for."
+        )
     else:
         # Google Search Fallback
-        gs_result = await verify_with_google_search(cit.title, cit.author, cit.summary_intent)
+        metrics.incr("audit.google_path")
+        # 同一请求里所有未解析的引用合成一次 grounded 请求 (见 GroundedBatch)
+        verify = grounded.verify if grounded is not None else verify_with_google_search
+        gs_result = await verify(cit.title, cit.author, cit.summary_intent)
         status_map = {"REAL": "REAL", "FAKE": "FAKE", "MISMATCH": "MISMATCH", "UNVERIFIED": "UNVERIFIED"}
         g_status = status_map.get(gs_result.get("verdict"), "UNVERIFIED")
+        if g_status == "UNVERIFIED":
+            metrics.incr("audit.unverified")
 
         return AuditResult(
             citation_text=cit.raw_text,
@@ -218,14 +400,61 @@ async def process_single_citation(cit) -> AuditResult:
         )
 
 
+def provisional_event(cit, best_result: PaperRecord, source_name: str) -> dict:
+    """渐进模式的第一阶段事件：解析层已经给出 存在 / 未找到；message 按第二阶段实际要走的路径写"""
+    if best_result.found:
+        return {
+            "event": "provisional",
+            "citation_id": cit.id,
+            "citation_text": cit.raw_text,
+            "status": "FOUND",
+            "source": source_name,
+            "metadata": best_result.to_dict(),
+            "message": ("Paper located. Checking claim against abstract..." if citation_claim(cit)
+                        else "Paper located. No claim attached to check."),
+        }
+    return {
+        "event": "provisional",
+        "citation_id": cit.id,
+        "citation_text": cit.raw_text,
+        "status": "NOT_FOUND",
+        "source": "OpenAlex / Semantic Scholar",
+        "metadata": best_result.to_dict(),
+        "message": ("Not found in academic databases. Falling back to Google Search..." if searchable(cit)
+                    else "Not found in academic databases. No title or author to search the web for."),
+    }
+
+
+async def extract_within_deadline(text: str, deadline: Deadline, limits: list):
+    """
+    Gemini 抽取 (异步 client，留在事件循环里，key 池 / 指标不跨线程) 的超时缩到请求剩余预算以内；
+    超时时取消上游调用，记为被截止时间截断并抛 asyncio.TimeoutError
+    """
+    with deadline_scope(deadline, limits):
+        try:
+            return await asyncio.wait_for(extract_citations_from_text(text), timeout=stage_timeout(EXTRACT_TIMEOUT))
+        except asyncio.TimeoutError:
+            mark_limited("extract", "cut")
+            raise
+
+
 @app.post("/api/audit")
 @limiter.limit("10/minute")
 async def audit_citations(request: Request, body: AuditRequest):
+    # 整个请求 (含抽取) 共用一个截止时间，见 app/deadline.py
+    deadline = Deadline()
+    # 抽取阶段被截止时间限制 (跳过模型升级等) 时，每条引用都带上 deadline_limited
+    extract_limits = []
     try:
-        citations = extract_citations_from_text(body.text)
+        citations = await extract_within_deadline(body.text, deadline, extract_limits)
     except Exception as e:
+        if isinstance(e, asyncio.TimeoutError):
+            payload = {"error": "Extraction did not finish within the request deadline.", "deadline_limited": True}
+        else:
+            payload = {"error": f"Extraction failed: {str(e)}"}
+
         async def error_gen():
-            yield json.dumps({"error": f"Extraction failed: {str(e)}"}) + "\n"
+            yield ndjson_line(payload)
 
         return StreamingResponse(error_gen(), media_type="application/x-ndjson")
 
@@ -234,16 +463,68 @@ async def audit_citations(request: Request, body: AuditRequest):
 
     async def result_generator():
         if not citations:
-            yield json.dumps({"info": "No citations found in text."}) + "\n"
+            yield ndjson_line({"info": "No citations found in text."})
             return
 
-        tasks = [process_single_citation(cit) for cit in citations]
-        for task in asyncio.as_completed(tasks):
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def run_citation(cit, resolution, group_limits, grounded):
             try:
-                result = await task
-                yield json.dumps(result.dict()) + "\n"
+                with deadline_scope(deadline):
+                    if body.progressive:
+                        best_result, source_name = await asyncio.shield(resolution)
+                        await queue.put((False, provisional_event(cit, best_result, source_name)))
+
+                    result = await process_single_citation(cit, resolution, grounded)
+                    result.deadline_limited = limited() or bool(group_limits) or bool(extract_limits)
+                payload = result.dict()
             except Exception as e:
-                yield json.dumps({"error": str(e)}) + "\n"
+                payload = {"error": str(e)}
+
+            if body.progressive:
+                payload = {"event": "final", "citation_id": cit.id, **payload}
+            await queue.put((True, payload))
+
+        # 同一篇论文的多次引用只解析一次，但每条引用仍各自输出一行 AuditResult
+        groups = group_citations(citations)
+        # 所有带 DOI / arXiv ID 的引用合并成一次 S2 批量查询 (第一次需要 S2 兜底时才发出)
+        s2_batch = S2BatchLookup(pick_representative(members) for _, members in groups)
+
+        async def run_resolution(key, members, group_limits):
+            with deadline_scope(deadline, group_limits):
+                return await resolve_citation_group(key, members, s2_batch)
+
+        resolutions, all_limits = [], []
+        for key, members in groups:
+            # 解析阶段被截止时间限制时，同组每条引用都带上 deadline_limited
+            group_limits = []
+            resolutions.append(asyncio.ensure_future(run_resolution(key, members, group_limits)))
+            all_limits.append(group_limits)
+
+        # OpenAlex / S2 都没找到的引用在所有解析结束后合成一次 Google grounded 请求
+        # (只有标识符的条目解析不到时直接 UNVERIFIED，不参与批量)
+        grounded = GroundedBatch([([m for m in members if searchable(m)], resolution)
+                                  for (_, members), resolution in zip(groups, resolutions)])
+        tasks = [
+            asyncio.create_task(run_citation(cit, resolution, group_limits, grounded))
+            for (_, members), resolution, group_limits in zip(groups, resolutions, all_limits)
+            for cit in members
+        ]
+
+        # 客户端断开 (关闭页面) 时取消所有未完成的 OpenAlex / S2 / Gemini 调用
+        watcher = asyncio.create_task(watch_disconnect(request, tasks + resolutions, queue, "audit"))
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await queue.get()
+                if item is DISCONNECTED:
+                    break
+                is_final, payload = item
+                remaining -= is_final
+                yield ndjson_line(payload)
+        finally:
+            watcher.cancel()
+            cancel_pending(tasks + resolutions + s2_batch.pending() + grounded.pending(), "audit")
 
     return StreamingResponse(result_generator(), media_type="application/x-ndjson")
 
@@ -266,6 +547,24 @@ async def realibuddy_audit(request: ClaimRequest):
     result = await realibuddy_service.verify_claim(request.text, request.source_filter)
     return result
 
+@app.websocket("/api/realibuddy/stream")
+async def realibuddy_stream(websocket: WebSocket, source_filter: str = "all"):
+    """
+    Realibuddy 实时核查 (WebSocket)：持续接收语音转写，分句、防抖、批量核查并推送结论
+    """
+    # CORSMiddleware 不作用于 WebSocket，这里手动校验来源；浏览器总会带 Origin，没有的一律拒绝
+    origin = websocket.headers.get("origin")
+    if origin not in origins:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    # 准入中间件只管 HTTP：会话里每批核查单独走准入控制 (与 /api/realibuddy/audit 同一个成本)
+    client = websocket.client.host if websocket.client else "unknown"
+    session = RealibuddyStreamSession(websocket, realibuddy_service, source_filter,
+                                      admission=admission if ADMISSION_ENABLED else None, client=client)
+    await session.run()
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
@@ -0,0 +1,77 @@
+"""
+进程内运行指标：计数器 + 数值观测 (count / sum / max)。
+通过 GET /api/metrics 查看；进程重启即清零。
+"""
+import asyncio
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# 当前请求各上游的等待时间 (秒) 累加器；按需剖析时由 app.profiling 设置，
+# 请求内创建的 asyncio 任务复制上下文，共享同一个 dict
+upstream_wall: ContextVar[Optional[Dict[str, float]]] = ContextVar("upstream_wall", default=None)
+
+
+class Metrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.observations: Dict[str, list] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        self.counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        obs = self.observations.get(name)
+        if obs is None:
+            self.observations[name] = [1, value, value]
+        else:
+            obs[0] += 1
+            obs[1] += value
+            obs[2] = max(obs[2], value)
+
+    @contextmanager
+    def timer(self, name: str):
+        """记录一段代码的耗时 (毫秒)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    @contextmanager
+    def track_upstream(self, source: str):
+        """
+        统计一次上游调用：upstream.<source>.calls / .cancelled
+        cancelled = 客户端断开等原因被取消、结果作废的进行中请求
+        """
+        self.incr(f"upstream.{source}.calls")
+        start = time.perf_counter()
+        try:
+            yield
+        except asyncio.CancelledError:
+            self.incr(f"upstream.{source}.cancelled")
+            raise
+        finally:
+            wall = upstream_wall.get()
+            if wall is not None:
+                wall[source] += time.perf_counter() - start
+
+    def per(self, name: str, denominator: str) -> float:
+        total = self.counters.get(denominator, 0)
+        return round(self.counters.get(name, 0) / total, 3) if total else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "counters": {k: round(v, 3) for k, v in sorted(self.counters.items())},
+            "observations": {
+                k: {"count": c, "avg": round(s / c, 3), "max": round(m, 3)}
+                for k, (c, s, m) in sorted(self.observations.items())
+            },
+        }
+
+
+metrics = Metrics()
@@ -0,0 +1,148 @@
+"""
+按需请求剖析：对单个 /api/audit、/api/chat、/api/realibuddy/audit 请求 (含流式响应体) 采样剖析，
+输出 speedscope 格式 (https://www.speedscope.app 可直接打开火焰图) 和一份耗时拆分：
+CPU 部分 (打分 / JSON / 摘要重建 / 其他) 与等待上游 I/O 的时间。
+
+使用 pyinstrument (可选依赖，pip install pyinstrument)：统计采样、开销低，
+async_mode="enabled" 只采样本请求的上下文 (包括它创建的 asyncio 任务)。
+等待时间不靠采样：metrics.track_upstream 把每次上游调用的耗时累加到本请求的 upstream_wall，
+并发调用会叠加，所以各上游之和可能大于总耗时；idle = 总耗时 - 采样到的 CPU。
+
+触发方式 (二选一)：
+    PROFILE_TOKEN=...         请求带 X-Profile: <token> 头时剖析 (未设置则忽略该头)
+    PROFILE_SAMPLE_RATE=0.0   按比例随机剖析
+其他：
+    PROFILE_DIR=profiles      输出目录
+    PROFILE_INTERVAL=0.001    采样间隔 (秒)
+"""
+import json
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Optional
+
+from app.metrics import metrics, upstream_wall
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pyinstrument 是可选依赖
+    Profiler = None
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN") or None
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.001))
+PROFILED_PATHS = {"/api/audit", "/api/chat", "/api/realibuddy/audit"}
+
+# (类别, 判断函数)：按顺序匹配，命中的帧整棵子树的 CPU 时间归入该类别
+CATEGORIES = [
+    ("abstract_reconstruction", lambda f: f.function == "reconstruct_abstract"),
+    ("json", lambda f: _in(f, "app/json_codec.py", "/json/", "orjson")),
+    ("scoring", lambda f: _in(f, "app/services/lexical.py", "app/services/numeric_claims.py",
+                              "app/services/prescreen.py", "app/services/fusion.py", "app/services/dedup.py",
+                              "difflib.py") or f.function in ("_pick_best_candidate", "get_similarity_score")),
+]
+
+
+def _in(frame, *fragments: str) -> bool:
+    path = (frame.file_path or "").replace("\\", "/")
+    return any(fragment in path for fragment in fragments)
+
+
+def cpu_breakdown(root) -> Dict[str, float]:
+    """把帧树里采样到的 CPU 时间按类别拆分 (秒)；事件循环阻塞在 selector 上的样本是空闲等待，不算 CPU"""
+    totals = {name: 0.0 for name, _ in CATEGORIES}
+    idle = 0.0
+
+    def walk(frame) -> None:
+        nonlocal idle
+        if _in(frame, "selectors.py"):
+            idle += frame.time
+            return
+        for name, matches in CATEGORIES:
+            if matches(frame):
+                totals[name] += frame.time - frame.await_time()
+                return
+        for child in frame.children:
+            walk(child)
+
+    walk(root)
+    cpu = max(0.0, root.time - root.await_time() - idle)
+    totals["other"] = max(0.0, cpu - sum(totals.values()))
+    totals["total"] = cpu
+    return {k: round(v, 4) for k, v in totals.items()}
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI 中间件：命中条件的请求在采样剖析下运行，结束后写出 profile，响应带 X-Profile-Id"""
+
+    def __init__(self, app):
+        self.app = app
+        self.active = False  # 同一线程同时只跑一个采样器
+
+    def wanted(self, scope) -> bool:
+        if scope["type"] != "http" or scope["path"] not in PROFILED_PATHS or Profiler is None:
+            return False
+        if PROFILE_TOKEN and _header(scope, b"x-profile") == PROFILE_TOKEN:
+            return True
+        return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if not self.wanted(scope):
+            return await self.app(scope, receive, send)
+        if self.active:
+            metrics.incr("profiling.skipped_busy")
+            return await self.app(scope, receive, send)
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['path'].strip('/').replace('/', '_')}-{uuid.uuid4().hex[:6]}"
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        self.active = True
+        wall = defaultdict(float)
+        token = upstream_wall.set(wall)
+        profiler = Profiler(interval=INTERVAL, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            upstream_wall.reset(token)
+            self.active = False
+            self.write(profiler, profile_id, wall)
+
+    def write(self, profiler, profile_id: str, wall: Dict[str, float]) -> None:
+        try:
+            session = profiler.last_session
+            root = session.root_frame()
+            cpu = cpu_breakdown(root) if root is not None else {"total": 0.0}
+            summary = {
+                "id": profile_id,
+                "duration_s": round(session.duration, 4),
+                "cpu_s": cpu,
+                "awaited_upstream_s": {k: round(v, 4) for k, v in sorted(wall.items())},
+                "idle_s": round(max(0.0, session.duration - cpu["total"]), 4),
+            }
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(os.path.join(PROFILE_DIR, f"{profile_id}.speedscope.json"), "w", encoding="utf-8") as f:
+                f.write(profiler.output(SpeedscopeRenderer()))
+            with open(os.path.join(PROFILE_DIR, f"{profile_id}.summary.json"), "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+            metrics.incr("profiling.profiles")
+            print(f"[Profile] {profile_id}: {summary['duration_s']}s wall, cpu {cpu}, "
+                  f"upstream {summary['awaited_upstream_s']}")
+        except Exception as e:
+            print(f"[Profile] Failed to write profile {profile_id}: {e}")
@@ -1,15 +1,47 @@
-import os
+import asyncio
 import json
-import google.generativeai as genai
-from dotenv import load_dotenv
+import time
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from app.deadline import blame_deadline, has_budget, stage_timeout
+from app.metrics import metrics
+from app.services.key_pool import estimate_tokens, gemini_key_pool
+from app.services.lexical import non_latin_ratio, overlap_scores
+from app.services.model_router import confident, model_router
+from app.services.numeric_claims import NumericReport, check_figures
+from app.services.prompt_budget import fit_claim, log_usage, select_sentences
+from app.services.prescreen import TOPIC_COVERAGE, prescreen, record_llm_verdict
+
+STATUSES = ["REAL", "MISMATCH", "SUSPICIOUS", "UNVERIFIED"]
+AUDIT_TIMEOUT = 30  # 单次审计调用的超时 (秒)，请求剩余预算更少时取剩余预算
+
+
+def _deadline_verdict() -> dict:
+    return {
+        "status": "UNVERIFIED",
+        "confidence": 0.5,
+        "reason": "Paper exists, but the request deadline was reached before the content audit finished."
+    }
+
+
+def pick_audit_tier(user_claim: str, numeric: NumericReport, scores: dict):
+    """
+    词法上已经大体吻合、又没有需要核对的数字时，交给 lite 档；
+    有数字、跨语言或吻合度一般的交给 standard 档。返回 (tier, reason)。
+    scores 是预筛时算好的 overlap_scores，这里不再重算。
+    """
+    if numeric.has_figures:
+        return "standard", "claim contains figures"
+    if non_latin_ratio(user_claim) > 0.3:
+        return "standard", "cross-lingual claim"
+    coverage = scores["coverage"]
+    if coverage >= TOPIC_COVERAGE:
+        return "lite", f"lexical coverage {coverage:.2f}"
+    return "standard", f"lexical coverage {coverage:.2f}"
 
 
 async def verify_content_consistency(user_claim: str, real_abstract: str) -> dict:
     """
-    使用 Gemini 2.0 Flash 对比用户声称的内容与真实摘要。
+    使用 Gemini 对比用户声称的内容与真实摘要 (按难度路由档位，见 model_router)。
     - 异步调用 (Async)
     - 强制 JSON Schema 输出 (Stability)
     - 增强针对“数据捏造”的检测逻辑 (Anti-Hallucination)
@@ -23,15 +55,35 @@ async def verify_content_consistency(user_claim: str, real_abstract: str) -> dic
             "reason": "Paper exists, but abstract is missing in database."
         }
 
-    model = genai.GenerativeModel('gemini-2.0-flash')
+    # 本地预筛：词法重合度 + 数字核对，明确的 REAL / MISMATCH / SUSPICIOUS 不调用 LLM
+    numeric = check_figures(user_claim, real_abstract)
+    # 词法分数只算一次：预筛、选档、录制校准样本共用
+    scores = overlap_scores(user_claim, real_abstract)
+    quick_verdict = prescreen(user_claim, real_abstract, numeric, scores)
+    if quick_verdict is not None:
+        return quick_verdict
+
+    # 截止时间快到了：没有词法上的明确结论，也来不及调用 LLM
+    if not has_budget("audit"):
+        return _deadline_verdict()
+
+    numeric_hint = numeric.as_hint()
+    hint_block = f"""
+    LOCAL NUMERIC CHECK (deterministic number matching, use as a hint):
+    {numeric_hint}
+    """ if numeric_hint else ""
+
+    # prompt 里只放预算内的 claim 和与之最相关的摘要句子 (预筛 / 数字核对仍然用全文)
+    prompt_claim = fit_claim(user_claim)
+    prompt_abstract = select_sentences(user_claim, real_abstract)
 
     # Prompt 逻辑增强
     prompt = f"""
     You are a forensic academic auditor. 
     Your Task: Verify if the "User's Claim" is supported by the "Actual Abstract".
 
-    User's Claim: "{user_claim}"
-    Actual Abstract: "{real_abstract}"
+    User's Claim: "{prompt_claim}"
+    Actual Abstract: "{prompt_abstract}"
 
     AUDIT RULES:
     1. **Topic Match**: Does the paper discuss the same core topic? If no -> "MISMATCH".
@@ -47,6 +99,7 @@ async def verify_content_consistency(user_claim: str, real_abstract: str) -> dic
     - "SUSPICIOUS": The topic matches, but the user invented specific details/findings not present in the text (Hallucination of details).
     - "UNVERIFIED": Abstract is too short or ambiguous to judge.
 
+    {hint_block}
     Provide a confidence score (0.0 - 1.0) and a brief reason.
     """
 
@@ -58,7 +111,7 @@ async def verify_content_consistency(user_claim: str, real_abstract: str) -> dic
             "properties": {
                 "status": {
                     "type": "STRING",
-                    "enum": ["REAL", "MISMATCH", "SUSPICIOUS", "UNVERIFIED"]
+                    "enum": STATUSES
                 },
                 "confidence": {
                     "type": "NUMBER"
@@ -71,17 +124,33 @@ async def verify_content_consistency(user_claim: str, real_abstract: str) -> dic
         }
     }
 
-    try:
+    async def audit_with(model_name: str) -> dict:
         # 使用异步方法
-        response = await model.generate_content_async(
-            prompt,
-            generation_config=generation_config
-        )
+        began = time.perf_counter()
+        with metrics.track_upstream("gemini_auditor"):
+            response = await asyncio.wait_for(gemini_key_pool.run(
+                lambda key: gemini_key_pool.model(key, model_name).generate_content_async(
+                    prompt,
+                    generation_config=generation_config
+                ),
+                estimated_tokens=estimate_tokens(prompt),
+            ), stage_timeout(AUDIT_TIMEOUT))
+        log_usage("audit", model_name, prompt, response, (time.perf_counter() - began) * 1000)
+        # 直接解析 JSON；不符合 schema 抛 ValueError，由路由升级到更强的模型
+        verdict = json.loads(response.text)
+        if verdict.get("status") not in STATUSES:
+            raise ValueError(f"unexpected status {verdict.get('status')!r}")
+        return verdict
 
-        # 直接解析 JSON
-        return json.loads(response.text)
+    tier, reason = pick_audit_tier(user_claim, numeric, scores)
+    try:
+        verdict = await model_router.run("audit", tier, audit_with, accept=confident, reason=reason)
+        record_llm_verdict(user_claim, real_abstract, verdict, scores)
+        return verdict
 
     except Exception as e:
+        if blame_deadline("audit"):
+            return _deadline_verdict()
         print(f"[Auditor Error] {e}")
         return {
             "status": "ERROR",
@@ -0,0 +1,211 @@
+"""
+作者名匹配 (OpenAlex / Semantic Scholar 共用)。
+
+- 查询端 (引用里的作者字符串) 每个字符串只解析一次：去重音、去 "et al." / "and others" / "等"，
+  拆出多位作者，每位作者解析为 (姓, 名首字母)。支持 "A. Vaswani"、"Vaswani, A."、"Vaswani A" 等写法。
+- 候选端 (一篇论文的作者列表) 不预先分词：逐个名字做子串查找 (ASCII 名字只 lower，其他名字取
+  去重音后的 ASCII 骨架，都在 C 里完成)，只给找到的名字分词确认；同一列表被反复查询很多次时
+  才建 token -> 作者下标的字典，直接按姓查。
+  大合作论文有上千个作者，见 benchmarks/bench_author_match.py。
+
+判定：任一查询作者的姓出现在某个候选作者的名字里，且 (查询带首字母时) 该候选作者的其他名字里
+有对应首字母，即视为匹配。
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+_ET_AL = re.compile(r"\bet\.?\s*al\b\.?|\band\s+others\b|等人|等", re.IGNORECASE)
+_SPLIT_AUTHORS = re.compile(r"\s+and\s+|\s*&\s*|;|、|，")
+_COMBINING = re.compile("[\u0300-\u036f]+")
+# NFKD 不会分解的带笔画字母 (逐个 str.replace 比 str.translate 快得多)
+_STROKES = (("ø", "o"), ("ł", "l"), ("đ", "d"), ("ı", "i"))
+_INITIALS = re.compile(r"^[A-Z]{1,3}$")  # Vancouver 风格 "Vaswani AS" 里的 "AS"
+# 姓氏前缀 ("van der Maaten")，不当作名的首字母
+_PARTICLES = frozenset("van von der den de del della di da du la le dos das ter ten bin".split())
+
+
+def fold(text: str) -> str:
+    """
+    小写 + 去重音 (Müller -> muller, Zoë -> zoe, Østergaard -> ostergaard)；纯 ASCII 文本走快速路径。
+    作者匹配、引用去重 (dedup) 和词法打分 (lexical) 共用这一份
+    """
+    text = text or ""
+    if text.isascii():
+        return text.lower()
+    text = text.lower()
+    for stroke, plain in _STROKES:
+        if stroke in text:
+            text = text.replace(stroke, plain)
+    text = unicodedata.normalize("NFKD", text)
+    # 分解后已经是纯 ASCII (没有组合附加符号) 时省掉正则
+    return text if text.isascii() else _COMBINING.sub("", text)
+
+
+def ascii_skeleton(text: str) -> str:
+    """
+    只保留去重音后的 ASCII 字符 (Müller -> muller，王伟 -> 空)：查 ASCII 的姓时与 fold 等价，
+    但全部在 C 里完成，不用正则去组合附加符号。
+    """
+    text = text.lower()
+    for stroke, plain in _STROKES:
+        if stroke in text:
+            text = text.replace(stroke, plain)
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+def name_tokens(name: str) -> List[str]:
+    # str.replace + split 比正则分词快，作者列表动辄上千人
+    return fold(name or "").replace(".", " ").replace(",", " ").replace("-", " ").split()
+
+
+class QueryAuthor(NamedTuple):
+    surname: str
+    initials: Tuple[str, ...]
+
+
+def _parse_one(part: str) -> Optional[QueryAuthor]:
+    part = part.strip(" .,")
+    if not part:
+        return None
+    if "," in part:
+        # "Vaswani, A." / "Vaswani, Ashish"
+        surname_part, given_part = part.split(",", 1)
+        surname_tokens = name_tokens(surname_part)
+        given = name_tokens(given_part)
+    else:
+        raw = part.split()
+        if len(raw) > 1 and _INITIALS.match(raw[-1].replace(".", "")):
+            # "Vaswani AS"
+            surname_tokens = name_tokens(" ".join(raw[:-1]))
+            given = list(raw[-1].replace(".", "").lower())
+        else:
+            # "A. Vaswani" / "Ashish Vaswani" / "A.S. Vaswani"
+            tokens = name_tokens(part)
+            surname_tokens, given = tokens[-1:], tokens[:-1]
+    surname_tokens = [t for t in surname_tokens if len(t) > 1]
+    if not surname_tokens:
+        return None
+    return QueryAuthor(surname_tokens[-1], tuple(t[0] for t in given if t not in _PARTICLES))
+
+
+def _is_initials(piece: str) -> bool:
+    """"A." / "A. S." / "AS" / "J.-P." 这类只有首字母的片段"""
+    tokens = name_tokens(piece)
+    return bool(tokens) and (all(len(t) == 1 for t in tokens) or bool(_INITIALS.match(piece.replace(".", "").strip())))
+
+
+def _split_authors(text: str) -> List[str]:
+    """
+    按 and / & / ; 拆分，再按逗号拆分；只有首字母的片段并回前一个 (姓, 首字母)：
+    "Vaswani, A., Shazeer, N." -> ["Vaswani, A.", "Shazeer, N."]
+    """
+    authors: List[str] = []
+    for part in _SPLIT_AUTHORS.split(text):
+        for piece in part.split(","):
+            piece = piece.strip()
+            if not piece:
+                continue
+            if authors and _is_initials(piece) and "," not in authors[-1]:
+                authors[-1] = f"{authors[-1]}, {piece}"
+            else:
+                authors.append(piece)
+    return authors
+
+
+@lru_cache(maxsize=2048)
+def parse_author_query(author: Optional[str]) -> Tuple[QueryAuthor, ...]:
+    """引用里的作者字符串 -> 若干 QueryAuthor；解析不出姓时返回空元组"""
+    if not author:
+        return ()
+    parts = _split_authors(_ET_AL.sub(" ", author))
+    return tuple(q for q in (_parse_one(p) for p in parts) if q is not None)
+
+
+class AuthorIndex:
+    """
+    一篇论文作者列表的索引：按需构建、查多次。
+    前几次查询不分词：逐个名字 (ASCII 名字只 lower，其他名字取 ASCII 骨架) 做子串查找，
+    只给找到的那几个名字分词确认 (大多数候选论文只查一次，这是主要路径)；处理过的名字留着，
+    后续查询只做 find。同一列表查询超过 SCAN_QUERIES 次后，才建 token -> 作者下标的字典。
+    """
+
+    __slots__ = ("names", "folded", "tokens", "by_token", "queries")
+
+    # 子串查找比分词 + 建字典便宜得多，反复查询很多次时字典才划算
+    SCAN_QUERIES = 8
+
+    def __init__(self, names: Iterable[str]):
+        self.names = names if isinstance(names, list) else list(names)
+        self.folded: List[str] = []  # 前 len(self.folded) 个名字已 lower / 取 ASCII 骨架
+        self.tokens: Optional[List[List[str]]] = None
+        self.by_token: Optional[Dict[str, List[int]]] = None
+        self.queries = 0
+
+    @staticmethod
+    def _accepts(tokens: List[str], query: QueryAuthor) -> bool:
+        # 查询带首字母时，候选作者的其他名字里需要有第一个首字母
+        if not query.initials:
+            return True
+        return any(t[0] == query.initials[0] for t in tokens if t != query.surname)
+
+    @staticmethod
+    def _confirm(folded: str, query: QueryAuthor) -> bool:
+        """子串命中只是候选 ("li" 也在 "oliver" 里)：分词后按整词确认，规则同 _accepts (热路径，展开写)"""
+        tokens = folded.replace(".", " ").replace(",", " ").replace("-", " ").split()
+        surname = query.surname
+        if surname not in tokens:
+            return False
+        if not query.initials:
+            return True
+        initial = query.initials[0]
+        for token in tokens:
+            if token[0] == initial and token != surname:
+                return True
+        return False
+
+    def _scan(self, query: QueryAuthor) -> bool:
+        if not query.surname.isascii():
+            # 非 ASCII 的姓 (中文名等) 少见：完整 fold 后分词比对
+            return any(query.surname in tokens and self._accepts(tokens, query)
+                       for tokens in map(name_tokens, self.names))
+        surname, folded = query.surname, self.folded
+        for i in range(len(folded)):
+            if surname in folded[i] and self._confirm(folded[i], query):
+                return True
+        # 继续处理剩下的名字，边处理边比对
+        for i in range(len(folded), len(self.names)):
+            name = self.names[i] or ""
+            text = name.lower() if name.isascii() else ascii_skeleton(name)
+            folded.append(text)
+            if surname in text and self._confirm(text, query):
+                return True
+        return False
+
+    def _build_index(self) -> None:
+        self.tokens = [name_tokens(name) for name in self.names]
+        self.by_token = {}
+        for i, tokens in enumerate(self.tokens):
+            for token in tokens:
+                if len(token) > 1:
+                    self.by_token.setdefault(token, []).append(i)
+
+    def match(self, query: QueryAuthor) -> bool:
+        self.queries += 1
+        if self.queries <= self.SCAN_QUERIES:
+            return self._scan(query)
+        if self.by_token is None:
+            self._build_index()
+        return any(self._accepts(self.tokens[i], query) for i in self.by_token.get(query.surname, ()))
+
+    def matches_any(self, queries: Tuple[QueryAuthor, ...]) -> bool:
+        return any(self.match(q) for q in queries)
+
+
+def author_matches(author: Optional[str], names: Iterable[str]) -> bool:
+    """没提供作者 (或解析不出姓) 时视为匹配，与原有逻辑一致"""
+    queries = parse_author_query(author)
+    if not queries:
+        return True
+    return AuthorIndex(names).matches_any(queries)
@@ -0,0 +1,108 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from app.services.author_match import fold
+from app.services.llm_extractor import CitationData
+
+_AUTHOR_STOPWORDS = {"et", "al", "and", "others"}
+
+
+def normalize_doi(doi: Optional[str]) -> Optional[str]:
+    if not doi:
+        return None
+    clean = doi.strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "doi:"):
+        if clean.startswith(prefix):
+            clean = clean[len(prefix):]
+    clean = clean.strip().rstrip(".")
+    return clean or None
+
+
+def normalize_title(title: Optional[str]) -> str:
+    words = re.sub(r"[^\w\s]", " ", fold(title or "")).split()
+    return " ".join(words)
+
+
+def first_author_key(author: Optional[str]) -> str:
+    """
+    取第一作者的姓作为分组键：
+    "Vaswani et al." / "A. Vaswani" / "Vaswani, A." -> "vaswani"
+    """
+    if not author:
+        return ""
+    first = re.split(r"\s+and\s+|&|;", fold(author))[0]
+    if "," in first:
+        # "Vaswani, A." 格式：逗号前是姓
+        first = first.split(",")[0]
+    tokens = [t for t in re.sub(r"[^\w\s]", " ", first).split()
+              if t not in _AUTHOR_STOPWORDS and len(t) > 1]
+    return tokens[-1] if tokens else ""
+
+
+def _clean_year(year: Optional[str]) -> str:
+    return "".join(filter(str.isdigit, str(year or "")))
+
+
+def canonical_key(cit: CitationData) -> Optional[str]:
+    """DOI 优先，否则 标题+第一作者+年份；什么都没有则返回 None (不参与合并)"""
+    doi = normalize_doi(cit.doi)
+    if doi:
+        return f"doi:{doi}"
+    return _title_key(cit)
+
+
+def _title_key(cit: CitationData) -> Optional[str]:
+    title = normalize_title(cit.title)
+    if not title:
+        return None
+    return f"tay:{title}|{first_author_key(cit.author)}|{_clean_year(cit.year)}"
+
+
+def group_citations(citations: List[CitationData]) -> List[Tuple[Optional[str], List[CitationData]]]:
+    """
+    把同一篇论文的多次引用归为一组 (保持首次出现的顺序)。
+    没有标题的引用 (如 "Vaswani et al. (2017)") 如果 作者+年份 只对应唯一一组，则并入该组。
+    返回 [(canonical_key, [citations...]), ...]，key 为 None 的组只含一条引用。
+    """
+    groups: Dict[str, List[CitationData]] = {}
+    author_year_index: Dict[Tuple[str, str], set] = {}
+    orphans: List[CitationData] = []
+
+    for cit in citations:
+        key = canonical_key(cit)
+        if key is None:
+            orphans.append(cit)
+            continue
+        groups.setdefault(key, []).append(cit)
+        ay = (first_author_key(cit.author), _clean_year(cit.year))
+        if all(ay):
+            author_year_index.setdefault(ay, set()).add(key)
+
+    # 同一篇论文有的带 DOI、有的不带：按标题键并入 DOI 组
+    title_to_doi: Dict[str, str] = {}
+    for key, members in groups.items():
+        if key.startswith("doi:"):
+            for cit in members:
+                tkey = _title_key(cit)
+                if tkey:
+                    title_to_doi.setdefault(tkey, key)
+    for tkey, doi_key in title_to_doi.items():
+        if tkey in groups:
+            groups[doi_key].extend(groups.pop(tkey))
+
+    singles: List[Tuple[Optional[str], List[CitationData]]] = []
+    for cit in orphans:
+        ay = (first_author_key(cit.author), _clean_year(cit.year))
+        candidates = [k for k in author_year_index.get(ay, ()) if k in groups] if all(ay) else []
+        if len(candidates) == 1:
+            groups[candidates[0]].append(cit)
+        else:
+            singles.append((None, [cit]))
+
+    result = [(key, sorted(members, key=lambda c: c.id)) for key, members in groups.items()]
+    return sorted(result + singles, key=lambda kv: kv[1][0].id)
+
+
+def pick_representative(members: List[CitationData]) -> CitationData:
+    """选信息最全的一条引用作为解析输入"""
+    return max(members, key=lambda c: (bool(c.doi), bool(c.title), bool(c.author), bool(c.year), -c.id))
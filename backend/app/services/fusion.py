@@ -0,0 +1,113 @@
+"""
+OpenAlex + Semantic Scholar 记录融合：两边都找到同一篇论文时按字段合并
+(摘要 / 年份 / 作者 / OA 链接取有值的一方)，减少 "有论文但没摘要" 的 UNVERIFIED
+和年份对不上时落到 Google 搜索的情况。
+"""
+import difflib
+from typing import Optional, Tuple
+
+from app.metrics import metrics
+from app.services.dedup import normalize_doi, normalize_title
+from app.services.paper import PaperRecord
+
+SAME_TITLE_RATIO = 0.9
+FUSED_SOURCE = "OpenAlex + Semantic Scholar"
+
+
+def _clean_year(year) -> str:
+    return "".join(filter(str.isdigit, str(year or "")))
+
+
+def same_paper(a: PaperRecord, b: PaperRecord) -> bool:
+    """DOI 相同，或标题 (归一化后) 几乎一致"""
+    doi_a, doi_b = normalize_doi(a.doi), normalize_doi(b.doi)
+    if doi_a and doi_b:
+        return doi_a == doi_b
+    title_a, title_b = normalize_title(a.title), normalize_title(b.title)
+    if not title_a or not title_b:
+        return False
+    return difflib.SequenceMatcher(None, title_a, title_b).ratio() >= SAME_TITLE_RATIO
+
+
+def fuse(primary: PaperRecord, secondary: PaperRecord, cit_year: str = "") -> PaperRecord:
+    """
+    以 primary 为底，缺的字段从 secondary 补。
+    年份：primary 与引用对不上、secondary 对得上时取 secondary
+    (预印本年份 vs 正式发表年份是同一篇论文的常见差异)。
+    """
+    filled = []
+    abstract = primary.abstract
+    if not abstract and secondary.has_abstract:
+        abstract = secondary.abstract
+        filled.append("abstract")
+
+    year = primary.year
+    if not year or (cit_year and _clean_year(year) != cit_year and _clean_year(secondary.year) == cit_year):
+        if secondary.year:
+            year = secondary.year
+            filled.append("year")
+
+    authors = primary.authors
+    if not authors and secondary.authors:
+        authors = secondary.authors
+        filled.append("authors")
+
+    oa_url = primary.oa_url
+    if not oa_url and secondary.oa_url:
+        oa_url = secondary.oa_url
+        filled.append("oa_url")
+
+    for field in filled:
+        metrics.incr(f"fusion.filled.{field}")
+    if not filled:
+        return primary
+
+    metrics.incr("fusion.merged")
+    return PaperRecord(
+        source=FUSED_SOURCE,
+        title=primary.title or secondary.title,
+        doi=primary.doi or secondary.doi,
+        year=year,
+        authors=authors,
+        is_oa=primary.is_oa if primary.is_oa is not None else bool(oa_url),
+        oa_url=oa_url,
+        cited_by_count=max(primary.cited_by_count, secondary.cited_by_count),
+        id=primary.id or secondary.id,
+        abstract=abstract,
+    )
+
+
+def pick_and_fuse(oa: PaperRecord, s2: PaperRecord, cit_year: str = "") -> Tuple[PaperRecord, str]:
+    """
+    在 OpenAlex / S2 结果中选出最佳记录并尽可能补全，返回 (record, source_name)。
+    两边是同一篇论文时融合；否则沿用原来的选择规则 (年份对得上的优先，OpenAlex 优先)。
+    """
+    def year_ok(record: PaperRecord) -> bool:
+        year = _clean_year(record.year)
+        return cit_year == year if (cit_year and year) else True
+
+    if not s2.found:
+        return oa, "OpenAlex"
+    if not oa.found:
+        return s2, "Semantic Scholar"
+
+    if same_paper(oa, s2):
+        primary, secondary = (oa, s2) if year_ok(oa) or not year_ok(s2) else (s2, oa)
+        fused = fuse(primary, secondary, cit_year)
+        return fused, fused.source
+
+    if not year_ok(oa) and year_ok(s2):
+        return s2, "Semantic Scholar"
+    return oa, "OpenAlex"
+
+
+def needs_second_source(oa: PaperRecord, cit_year: str = "") -> Optional[str]:
+    """OpenAlex 结果需要 S2 兜底 / 补全的原因；不需要时返回 None"""
+    if not oa.found:
+        return "not_found"
+    year = _clean_year(oa.year)
+    if cit_year and year and cit_year != year:
+        return "year_mismatch"
+    if not oa.has_abstract:
+        return "no_abstract"
+    return None
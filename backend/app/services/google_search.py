@@ -1,143 +1,357 @@
-import os
+"""
+Gemini + Google Search 全网核查 (OpenAlex / S2 都没找到的引用)。
+- 单条：verify_with_google_search
+- 批量：GroundedBatch 把一次审计请求里所有未解析的引用合成一次 grounded 请求 (数组 schema)，
+  格式不合法 / 置信度低的条目再逐条走单条路径
+
+环境变量：
+    GROUNDED_BATCH_WINDOW=3   第一条未解析引用到达后，最多等多久 (秒) 收集同一请求里的其他引用
+"""
+import asyncio
 import json
+import os
+import time
+from typing import Any, List, Optional, Tuple
+
 import httpx
+import google.api_core.exceptions
 from dotenv import load_dotenv
 
-load_dotenv()
-
-API_KEY = os.getenv("GEMINI_API_KEY")
-
-
-async def verify_with_google_search(title: str, author: str, claim_summary: str) -> dict:
-    """
-    使用 Gemini 2.0 Flash + Google Search 进行全网核查。
-    优化点：使用 JSON Schema 强制结构化输出。
-    """
+from app.deadline import blame_deadline, current_deadline, deadline_scope, has_budget, remaining, stage_timeout
+from app.json_codec import loads_response
+from app.metrics import metrics
+from app.services.key_pool import estimate_tokens, gemini_key_pool
+from app.services.model_router import TIER_MODELS, confident, model_router
+from app.services.prompt_budget import fit_claim, log_usage
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={API_KEY}"
-
-    # Prompt 可以更加专注于“思考逻辑”，而不用操心“格式”
-    prompt = f"""
-    You are an academic auditor. Verify if this specific paper exists using Google Search.
-
-    Target Paper:
-    - Title: "{title}"
-    - Author: "{author}"
+load_dotenv()
 
-    User's Claim/Summary:
-    "{claim_summary}"
+API_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+VERDICTS = ["REAL", "FAKE", "MISMATCH", "UNVERIFIED"]
+TIMEOUT = 30
+BATCH_TIMEOUT = 60  # 批量请求要查多篇论文，超时放宽 (仍不超过请求剩余预算)
+BATCH_WINDOW = float(os.getenv("GROUNDED_BATCH_WINDOW", 3))
 
-    INSTRUCTIONS:
+INSTRUCTIONS = """
     1. Use Google Search to find this paper.
     2. If you cannot find a paper with this SPECIFIC title and author, verdict is "FAKE".
     3. If found, compare the real abstract with the User's Claim.
        - If the claim completely misrepresents the content (e.g. wrong topic), verdict is "MISMATCH".
        - If accurate, verdict is "REAL".
     4. Provide a confidence score (0.0 - 1.0).
-    """
+"""
 
-    # 定义严格的 JSON Schema
-    generation_config = {
-        "response_mime_type": "application/json",
-        "response_schema": {
-            "type": "OBJECT",
-            "properties": {
-                "verdict": {
-                    "type": "STRING",
-                    "enum": ["REAL", "FAKE", "MISMATCH", "UNVERIFIED"]
-                },
-                "confidence": {
-                    "type": "NUMBER"
-                },
-                "reason": {
-                    "type": "STRING"
-                },
-                "actual_paper_info": {
-                    "type": "STRING",
-                    "nullable": True
-                }
-            },
-            "required": ["verdict", "confidence", "reason"]
+# 定义严格的 JSON Schema
+VERDICT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "verdict": {
+            "type": "STRING",
+            "enum": VERDICTS
+        },
+        "confidence": {
+            "type": "NUMBER"
+        },
+        "reason": {
+            "type": "STRING"
+        },
+        "actual_paper_info": {
+            "type": "STRING",
+            "nullable": True
         }
+    },
+    "required": ["verdict", "confidence", "reason"]
+}
+
+# 批量：每篇论文一个元素，用 index 对应请求里的编号
+BATCH_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"index": {"type": "INTEGER"}, **VERDICT_SCHEMA["properties"]},
+        "required": ["index", *VERDICT_SCHEMA["required"]],
     }
+}
+
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
+]
+
 
-    payload = {
+class GroundingUnavailable(RuntimeError):
+    """API 错误 / 无候选 / 安全拦截：换模型也无济于事，直接返回 UNVERIFIED"""
+
+
+def _payload(prompt: str, schema: dict) -> dict:
+    return {
         "contents": [{
             "parts": [{"text": prompt}]
         }],
         "tools": [
             {"google_search": {}}
         ],
-        "generationConfig": generation_config,
-        "safetySettings": [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
-        ]
+        "generationConfig": {
+            "response_mime_type": "application/json",
+            "response_schema": schema,
+        },
+        "safetySettings": SAFETY_SETTINGS,
     }
 
+
+async def _grounded_json(task: str, model_name: str, prompt: str, schema: dict, timeout: float) -> Any:
+    """发出一次 grounded 请求并解析 JSON；JSON 错误抛 ValueError (由路由升级到更强的模型重试)"""
+    url = API_URL.format(model=model_name)
+    payload = _payload(prompt, schema)
     headers = {"Content-Type": "application/json"}
 
+    async def post(key):
+        async with httpx.AsyncClient(timeout=stage_timeout(timeout)) as client:
+            response = await client.post(url, params={"key": key.key}, json=payload, headers=headers)
+        # 429 交给 key 池：冷却当前 key 并换下一个重试
+        if response.status_code == 429:
+            raise google.api_core.exceptions.ResourceExhausted(response.text)
+        return response
+
+    # 使用异步请求
+    began = time.perf_counter()
+    with metrics.track_upstream("gemini_grounded"):
+        response = await gemini_key_pool.run(post, estimated_tokens=estimate_tokens(prompt))
+
+    if response.status_code != 200:
+        print(f"[Google Search API Error] Status: {response.status_code} - {response.text}")
+        raise GroundingUnavailable(f"API Error {response.status_code}")
+
+    result = loads_response(response, "gemini_grounded")
+    log_usage(task, model_name, prompt, result, (time.perf_counter() - began) * 1000)
+
+    if 'candidates' not in result or not result['candidates']:
+        raise GroundingUnavailable("No response candidates from AI")
+
+    candidate = result['candidates'][0]
+    finish_reason = candidate.get('finishReason')
+
+    # 安全过滤器拦截
+    if finish_reason == 'SAFETY':
+        raise GroundingUnavailable("Content blocked by safety filters.")
+
+    parts = candidate.get('content', {}).get('parts', [])
+    raw_text = "".join([part.get('text', '') for part in parts])
     try:
-        # 使用异步请求
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(url, json=payload, headers=headers)
-
-        if response.status_code != 200:
-            print(f"[Google Search API Error] Status: {response.status_code} - {response.text}")
-            return {
-                "verdict": "UNVERIFIED",
-                "confidence": 0.0,
-                "reason": f"API Error {response.status_code}",
-                "actual_paper_info": None
-            }
+        return json.loads(raw_text)
+    except json.JSONDecodeError:
+        print(f"[Google Search Parse Error] JSON Decode Failed: {raw_text}")
+        raise
 
-        result = response.json()
 
-        if 'candidates' not in result or not result['candidates']:
-            return {
-                "verdict": "UNVERIFIED",
-                "confidence": 0.0,
-                "reason": "No response candidates from AI",
-                "actual_paper_info": None
-            }
+async def verify_with_google_search(title: str, author: str, claim_summary: str) -> dict:
+    """
+    使用 Gemini + Google Search 进行全网核查 (从 standard 档开始，低置信度升级)。
+    优化点：使用 JSON Schema 强制结构化输出。
+    """
 
-        candidate = result['candidates'][0]
-        finish_reason = candidate.get('finishReason')
+    if not has_budget("grounded_search"):
+        return _unverified("Deadline reached before web verification")
 
-        # 安全过滤器拦截
-        if finish_reason == 'SAFETY':
-            return {
-                "verdict": "UNVERIFIED",
-                "confidence": 0.0,
-                "reason": "Content blocked by safety filters.",
-                "actual_paper_info": None
-            }
+    # Prompt 可以更加专注于“思考逻辑”，而不用操心“格式”
+    prompt = f"""
+    You are an academic auditor. Verify if this specific paper exists using Google Search.
 
-        # 解析
-        try:
-            parts = candidate['content']['parts']
-            raw_text = "".join([part.get('text', '') for part in parts])
-
-            # 因为指定了 response_schema，Gemini 保证返回的是合法的 JSON 字符串
-            parsed_json = json.loads(raw_text)
-            return parsed_json
-
-        except json.JSONDecodeError as e:
-            print(f"[Google Search Parse Error] JSON Decode Failed: {raw_text}")
-            return {
-                "verdict": "UNVERIFIED",
-                "confidence": 0.0,
-                "reason": "Failed to parse AI response (JSON Error)",
-                "actual_paper_info": None
-            }
+    Target Paper:
+    - Title: "{title}"
+    - Author: "{author}"
+
+    User's Claim/Summary:
+    "{fit_claim(claim_summary)}"
+
+    INSTRUCTIONS:{INSTRUCTIONS}"""
+
+    try:
+        return await model_router.run(
+            "grounded_search", "standard",
+            lambda model_name: _grounded_json("grounded_search", model_name, prompt, VERDICT_SCHEMA, TIMEOUT),
+            accept=confident)
+
+    except GroundingUnavailable as e:
+        return _unverified(str(e))
+
+    except json.JSONDecodeError:
+        return _unverified("Failed to parse AI response (JSON Error)")
 
     except Exception as e:
+        if blame_deadline("grounded_search"):
+            return _unverified("Deadline reached during web verification")
         print(f"[Google Search Exception] {e}")
-        return {
-            "verdict": "UNVERIFIED",
-            "confidence": 0.0,
-            "reason": f"Internal Error: {str(e)}",
-            "actual_paper_info": None
-        }
\ No newline at end of file
+        return _unverified(f"Internal Error: {str(e)}")
+
+
+def _usable(item: Any) -> bool:
+    """批量结果里的一条：字段齐全、取值合法，且置信度够高 (否则单条路径会升级模型，这里交给它)"""
+    if not isinstance(item, dict) or item.get("verdict") not in VERDICTS or not isinstance(item.get("reason"), str):
+        return False
+    try:
+        float(item.get("confidence"))
+    except (TypeError, ValueError):
+        return False
+    return confident(item)
+
+
+async def verify_batch_with_google_search(papers: List[Tuple[str, str, str]]) -> List[Optional[dict]]:
+    """
+    一次 grounded 请求核查多篇论文 [(title, author, claim_summary), ...]，按顺序返回结论；
+    整个批次失败、或某一条缺失 / 格式不合法 / 置信度低时，对应位置为 None (调用方逐条重试)。
+    """
+    listing = "\n".join(
+        f'    [{i}] Title: "{title}" | Author: "{author}" | User\'s Claim/Summary: "{fit_claim(claim)}"'
+        for i, (title, author, claim) in enumerate(papers, 1)
+    )
+    prompt = f"""
+    You are an academic auditor. Verify if each of these specific papers exists using Google Search.
+
+    Target Papers:
+{listing}
+
+    INSTRUCTIONS (apply to each paper separately):{INSTRUCTIONS}
+    5. Return exactly one result per paper, with "index" set to the paper's number.
+    """
+    results: List[Optional[dict]] = [None] * len(papers)
+
+    metrics.incr("grounded.batches")
+    metrics.incr("grounded.batch_items", len(papers))
+    try:
+        # 批量层面不升级模型：解析失败的批次 / 条目交给单条路径 (它会按需升级)
+        items = await _grounded_json("grounded_batch", TIER_MODELS["standard"], prompt, BATCH_SCHEMA,
+                                     BATCH_TIMEOUT)
+    except Exception as e:
+        print(f"[Google Search Batch Error] {e}")
+        metrics.incr("grounded.batch_failed")
+        return results
+
+    if not isinstance(items, list):
+        metrics.incr("grounded.batch_failed")
+        return results
+    seen = set()
+    for item in items:
+        index = item.get("index") if isinstance(item, dict) else None
+        if not isinstance(index, int) or not 1 <= index <= len(papers):
+            continue
+        if index in seen:
+            # 同一编号出现多次：不知道哪条可信，这篇论文逐条重试
+            results[index - 1] = None
+            metrics.incr("grounded.batch_duplicates")
+            continue
+        seen.add(index)
+        if _usable(item):
+            results[index - 1] = {
+                "verdict": item["verdict"],
+                "confidence": item["confidence"],
+                "reason": item["reason"],
+                "actual_paper_info": item.get("actual_paper_info"),
+            }
+    return results
+
+
+class _Pending:
+    __slots__ = ("paper", "future")
+
+    def __init__(self, paper: Tuple[str, str, str]):
+        self.paper = paper
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class GroundedBatch:
+    """
+    一次审计请求内共享的批量核查 (与 S2BatchLookup 同样的用法)。
+    groups = [(同组引用, 该组的解析任务)]：所有解析结束、且每条未找到的引用都已提交
+    (或收集窗口到期) 后发出一次批量请求；只有一条时直接走单条路径。
+    批量没给出可用结论的条目，在调用方自己的任务里逐条重试 (截止时间 / 模型升级照常按引用计算)。
+    """
+
+    def __init__(self, groups: List[Tuple[list, asyncio.Future]], window: float = BATCH_WINDOW):
+        self.groups = groups
+        self.window = window
+        self.waiting: List[_Pending] = []
+        self.submitted = 0  # 所有轮次里已提交的引用条数
+        self.collector: Optional[asyncio.Future] = None
+        self.tasks: List[asyncio.Future] = []
+        # 解析结束 / 有引用提交时唤醒收集循环，不用轮询
+        self.changed = asyncio.Event()
+        for _, resolution in groups:
+            resolution.add_done_callback(lambda _: self.changed.set())
+
+    def _expected(self) -> Optional[int]:
+        """
+        所有解析结束后，需要走 Google 的引用条数；还有解析没结束时返回 None。
+        解析失败 / 被取消的组不算：这些引用在 process_single_citation 里直接抛出，不会来提交
+        """
+        expected = 0
+        for members, resolution in self.groups:
+            if not resolution.done():
+                return None
+            if not resolution.cancelled() and resolution.exception() is None and not resolution.result()[0].found:
+                expected += len(members)
+        return expected
+
+    async def verify(self, title: str, author: str, claim_summary: str) -> dict:
+        pending = _Pending((title, author, claim_summary))
+        self.waiting.append(pending)
+        self.submitted += 1
+        self.changed.set()
+        if self.collector is None:
+            self.collector = asyncio.ensure_future(self._flush(current_deadline()))
+            self.tasks.append(self.collector)
+        # shield：一条引用被取消不应连带取消共享的批量请求
+        result = await asyncio.shield(pending.future)
+        if result is None:
+            metrics.incr("grounded.retried_individually")
+            result = await verify_with_google_search(title, author, claim_summary)
+        return result
+
+    async def _flush(self, deadline) -> None:
+        # 用自己的 limits 列表：批量请求被截止时间限制不应只算到触发它的那条引用头上
+        with deadline_scope(deadline, []):
+            await self._collect()
+            # 收集结束后到达的引用开始新的一轮
+            batch, self.waiting, self.collector = self.waiting, [], None
+            # 只有一条、或批量请求失败 / 被取消时，结果为 None，各引用逐条重试
+            results: List[Optional[dict]] = [None] * len(batch)
+            try:
+                if len(batch) > 1 and has_budget("grounded_search"):
+                    results = await verify_batch_with_google_search([p.paper for p in batch])
+            finally:
+                for pending, result in zip(batch, results):
+                    if not pending.future.done():
+                        pending.future.set_result(result)
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        left = remaining()
+        window = self.window if left is None else min(self.window, max(0.0, left / 4))
+        collect_until = loop.time() + window
+        while True:
+            expected = self._expected()
+            if expected is not None and self.submitted >= expected:
+                return
+            left = collect_until - loop.time()
+            if left <= 0:
+                return
+            # 检查和 clear 之间没有 await，不会漏掉唤醒
+            self.changed.clear()
+            try:
+                await asyncio.wait_for(self.changed.wait(), left)
+            except asyncio.TimeoutError:
+                return
+
+    def pending(self) -> List[asyncio.Future]:
+        return list(self.tasks)
+
+
+def _unverified(reason: str) -> dict:
+    return {
+        "verdict": "UNVERIFIED",
+        "confidence": 0.0,
+        "reason": reason,
+        "actual_paper_info": None
+    }
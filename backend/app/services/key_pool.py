@@ -0,0 +1,224 @@
+"""
+Gemini API Key 池：按 key 统计每分钟请求数 / token 数，429 后冷却，
+每次调用分配剩余额度最多的 key。吞吐量随配置的 key 数量线性增长。
+
+环境变量：
+    GEMINI_API_KEYS=key1,key2,...   (额外的 key，逗号分隔)
+    GEMINI_API_KEY / DEV_API_KEY    (原有的两个 key，也并入池中)
+    GEMINI_KEY_RPM=15               (每个 key 每分钟请求数上限)
+    GEMINI_KEY_TPM=1000000          (每个 key 每分钟 token 上限)
+    GEMINI_KEY_COOLDOWN=60          (ResourceExhausted 后的基础冷却秒数，连续触发翻倍)
+
+按 key 绑定模型用的是 google-generativeai 的私有属性 (GenerativeModel._client / _async_client)，
+requirements.txt 里固定了 SDK 版本；升级 SDK 前要先确认这两个属性还在 (不在时 model() 直接报错)。
+"""
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+import google.ai.generativelanguage as glm
+import google.api_core.exceptions
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+from app.metrics import metrics
+from app.services.prompt_budget import count_tokens
+
+load_dotenv()
+
+T = TypeVar("T")
+WINDOW_SECONDS = 60.0
+
+
+class NoKeyAvailable(RuntimeError):
+    pass
+
+
+class KeyState:
+    def __init__(self, key: str, rpm: int, tpm: int, index: int = 0):
+        self.key = key
+        # /api/metrics 不需要认证，标签里不能带 key 的任何部分
+        self.label = f"key{index}"
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window: deque = deque()  # [timestamp, tokens]
+        self.cooldown_until = 0.0
+        self.consecutive_exhausted = 0
+        # 累计计数
+        self.requests = 0
+        self.tokens = 0
+        self.exhausted = 0
+        self.errors = 0
+        self._client = None
+        self._async_client = None
+
+    def _trim(self, now: float) -> None:
+        while self.window and now - self.window[0][0] > WINDOW_SECONDS:
+            self.window.popleft()
+
+    def remaining_capacity(self, now: float) -> float:
+        """0~1：当前窗口内 请求 / token 两种额度中较紧的那个的剩余比例"""
+        if now < self.cooldown_until:
+            return 0.0
+        self._trim(now)
+        used_requests = len(self.window)
+        used_tokens = sum(entry[1] for entry in self.window)
+        return max(0.0, min(1 - used_requests / self.rpm, 1 - used_tokens / self.tpm))
+
+    def client(self):
+        if self._client is None:
+            self._client = glm.GenerativeServiceClient(client_options={"api_key": self.key})
+        return self._client
+
+    def async_client(self):
+        if self._async_client is None:
+            self._async_client = glm.GenerativeServiceAsyncClient(client_options={"api_key": self.key})
+        return self._async_client
+
+
+class KeyPool:
+    def __init__(self):
+        keys: List[str] = []
+        for raw in [os.getenv("GEMINI_API_KEYS", ""), os.getenv("GEMINI_API_KEY", ""), os.getenv("DEV_API_KEY", "")]:
+            for key in raw.split(","):
+                key = key.strip()
+                if key and key not in keys:
+                    keys.append(key)
+        if not keys:
+            print("[Warning] No Gemini API key found (GEMINI_API_KEYS / GEMINI_API_KEY / DEV_API_KEY).")
+
+        rpm = int(os.getenv("GEMINI_KEY_RPM", 15))
+        tpm = int(os.getenv("GEMINI_KEY_TPM", 1_000_000))
+        self.base_cooldown = float(os.getenv("GEMINI_KEY_COOLDOWN", 60))
+        self.keys: List[KeyState] = [KeyState(k, rpm, tpm, i) for i, k in enumerate(keys)]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    # --- 分配 / 记账 ---
+
+    def acquire(self, estimated_tokens: int = 0) -> Tuple[KeyState, list]:
+        """
+        选剩余额度最多的 key 并预先记一次请求 (按预估 token)；全部冷却中时选最早恢复的那个。
+        返回 (key, 窗口记录)，调用结束后用 record_usage 把记录改成真实 token 数。
+        """
+        if not self.keys:
+            raise NoKeyAvailable("No Gemini API key configured")
+        now = time.time()
+        ranked = sorted(self.keys, key=lambda k: (k.remaining_capacity(now), -k.cooldown_until), reverse=True)
+        state = ranked[0]
+        if state.remaining_capacity(now) <= 0:
+            state = min(self.keys, key=lambda k: max(k.cooldown_until, now))
+            metrics.incr("key_pool.saturated")
+
+        entry = [now, estimated_tokens]
+        state.window.append(entry)
+        state.requests += 1
+        return state, entry
+
+    def record_usage(self, state: KeyState, entry: list, tokens: int) -> None:
+        entry[1] = tokens
+        state.tokens += tokens
+        state.consecutive_exhausted = 0
+
+    def mark_exhausted(self, state: KeyState, retry_after: Optional[float] = None) -> None:
+        state.exhausted += 1
+        state.consecutive_exhausted += 1
+        cooldown = retry_after or self.base_cooldown * (2 ** (state.consecutive_exhausted - 1))
+        state.cooldown_until = time.time() + min(cooldown, 600)
+        metrics.incr("key_pool.exhausted")
+        print(f"[KeyPool] Key {state.label} exhausted, cooling down {cooldown:.0f}s")
+
+    # --- 带 key 轮换的调用 ---
+
+    def model(self, state: KeyState, model_name: str, **kwargs) -> genai.GenerativeModel:
+        """绑定指定 key 的 GenerativeModel (不依赖全局 genai.configure)"""
+        model = genai.GenerativeModel(model_name, **kwargs)
+        # SDK 改了内部结构时赋值不会报错，只会悄悄退回全局配置；这里提前发现
+        if not (hasattr(model, "_client") and hasattr(model, "_async_client")):
+            raise RuntimeError(f"google-generativeai {genai.__version__} no longer exposes "
+                               "GenerativeModel._client; update KeyPool.model")
+        model._client = state.client()
+        model._async_client = state.async_client()
+        return model
+
+    async def run(self, call: Callable[[KeyState], Awaitable[T]], estimated_tokens: int = 0) -> T:
+        """
+        异步调用：call(key_state) 抛 ResourceExhausted 时冷却该 key 并换下一个 key 重试，
+        所有 key 都试过仍失败则抛出最后一次的异常。
+        """
+        rotation = _Rotation(self, estimated_tokens)
+        for state in rotation:
+            try:
+                result = await call(state)
+            except Exception as e:
+                if rotation.retry(e):
+                    continue
+                raise
+            return rotation.done(result)
+        raise rotation.last_error
+
+    def stats(self) -> Dict[str, dict]:
+        now = time.time()
+        return {
+            state.label: {
+                "requests": state.requests,
+                "tokens": state.tokens,
+                "exhausted": state.exhausted,
+                "errors": state.errors,
+                "remaining_capacity": round(state.remaining_capacity(now), 3),
+                "cooldown_s": round(max(0.0, state.cooldown_until - now), 1),
+            }
+            for state in self.keys
+        }
+
+
+class _Rotation:
+    """
+    run 使用的 key 轮换与记账：最多把每个 key 试一次；
+    429 冷却当前 key 并换下一个，其他异常记一次错误后由调用方抛出。
+    """
+
+    def __init__(self, pool: KeyPool, estimated_tokens: int):
+        self.pool = pool
+        self.estimated_tokens = estimated_tokens
+        self.state: Optional[KeyState] = None
+        self.entry: Optional[list] = None
+        self.last_error: Optional[Exception] = None
+
+    def __iter__(self) -> Iterator[KeyState]:
+        for _ in range(max(1, len(self.pool.keys))):
+            self.state, self.entry = self.pool.acquire(self.estimated_tokens)
+            yield self.state
+
+    def retry(self, error: Exception) -> bool:
+        """True：换下一个 key 重试；False：调用方直接抛出"""
+        if isinstance(error, google.api_core.exceptions.ResourceExhausted):
+            self.pool.mark_exhausted(self.state)
+            self.last_error = error
+            return True
+        self.state.errors += 1
+        return False
+
+    def done(self, result: T) -> T:
+        self.pool.record_usage(self.state, self.entry, usage_tokens(result, self.estimated_tokens))
+        return result
+
+
+def estimate_tokens(text: str) -> int:
+    """本地估算 token 数 (见 prompt_budget.count_tokens；对中文比 "字符数 / 4" 准得多)"""
+    return count_tokens(text)
+
+
+def usage_tokens(response, default: int = 0) -> int:
+    """从 SDK 响应 (usage_metadata) 或 REST 响应 (usageMetadata) 里取总 token 数"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        return int(getattr(usage, "total_token_count", 0) or default)
+    if isinstance(response, dict):
+        return int((response.get("usageMetadata") or {}).get("totalTokenCount", default))
+    return default
+
+
+gemini_key_pool = KeyPool()
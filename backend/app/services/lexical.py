@@ -0,0 +1,111 @@
+"""
+本地词法打分：claim 与摘要的 IDF 加权重合度。
+IDF 表预先生成并随应用发布 (app/services/data/idf_en.json，见 scripts/build_idf_table.py)，
+表里没有的词视为罕见词，取最大 IDF。
+"""
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List
+
+from app.services.author_match import fold
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.%][0-9]+)?%?")
+_DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just me more most my now of off on once only or other
+our ours out over own same she should so some such than that the their theirs them then there these they this
+those through to too under until up very was we were what when where which while who whom why will with would
+you your paper study work authors author et al show shows shown propose proposes proposed present presents
+""".split())
+# 否定线索：词法重合度看不出 "X does not Y" 和 "X does Y" 的区别
+# (否定词不在停用词里；随应用发布的 IDF 表是去掉否定词时生成的，重新生成前按罕见词计)
+_NEGATION = re.compile(
+    r"\b(?:not|no|never|neither|nor|without|cannot|fail(?:s|ed)?\s+to)\b|n['’]t\b|不|没有|未|并非|无法",
+    re.IGNORECASE,
+)
+
+
+def stem(token: str) -> str:
+    """极简词干：只处理英文复数"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(t) for t in _TOKEN.findall(fold(text)) if t not in STOPWORDS and len(t) > 1]
+
+
+def has_negation(text: str) -> bool:
+    return bool(_NEGATION.search(text or ""))
+
+
+def non_latin_ratio(text: str) -> float:
+    """非拉丁字母占比 (中文 claim 对英文摘要时词法重合没有意义)"""
+    letters = [ch for ch in text if ch.isalpha()]
+    if not letters:
+        return 0.0
+    return sum(1 for ch in letters if ord(ch) > 0x24F) / len(letters)
+
+
+class IdfTable:
+    def __init__(self, path: str = os.path.join(_DATA_DIR, "idf_en.json")):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.idf: Dict[str, float] = data["idf"]
+        self.default = float(data.get("default", max(self.idf.values(), default=10.0)))
+
+    def __getitem__(self, token: str) -> float:
+        return self.idf.get(token, self.default)
+
+
+_idf_table = None
+
+
+def get_idf_table() -> IdfTable:
+    global _idf_table
+    if _idf_table is None:
+        _idf_table = IdfTable()
+    return _idf_table
+
+
+def tfidf_vector(tokens: List[str], idf: IdfTable) -> Dict[str, float]:
+    counts = Counter(tokens)
+    return {t: (1 + math.log(c)) * idf[t] for t, c in counts.items()}
+
+
+def overlap_scores(claim: str, abstract: str) -> dict:
+    """
+    返回：
+    - coverage: claim 词的 IDF 加权召回率 (claim 的信息有多少出现在摘要里)，0~1
+    - cosine:   TF-IDF 余弦相似度，0~1
+    - claim_terms: claim 的有效词数
+    """
+    idf = get_idf_table()
+    claim_tokens = tokenize(claim)
+    abstract_tokens = set(tokenize(abstract))
+    if not claim_tokens or not abstract_tokens:
+        return {"coverage": 0.0, "cosine": 0.0, "claim_terms": len(set(claim_tokens))}
+
+    claim_terms = set(claim_tokens)
+    total = sum(idf[t] for t in claim_terms)
+    covered = sum(idf[t] for t in claim_terms if t in abstract_tokens)
+
+    qv = tfidf_vector(claim_tokens, idf)
+    dv = tfidf_vector(tokenize(abstract), idf)
+    dot = sum(w * dv[t] for t, w in qv.items() if t in dv)
+    norm = math.sqrt(sum(w * w for w in qv.values())) * math.sqrt(sum(w * w for w in dv.values()))
+
+    return {
+        "coverage": round(covered / total, 4) if total else 0.0,
+        "cosine": round(dot / norm, 4) if norm else 0.0,
+        "claim_terms": len(claim_terms),
+    }
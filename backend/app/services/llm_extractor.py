@@ -1,16 +1,23 @@
-import os
 import json
 import re
-import google.generativeai as genai
+import time
 from pydantic import BaseModel
 from typing import List, Optional, Union
-from dotenv import load_dotenv
-import time
-import google.api_core.exceptions
 
-load_dotenv()
+from app.deadline import OPTIONAL_BUDGET, has_budget
+from app.metrics import metrics
+from app.services.author_match import parse_author_query
+from app.services.key_pool import estimate_tokens, gemini_key_pool
+from app.services.model_router import model_router
+from app.services.prompt_budget import extraction_chunks, log_usage
+from app.services.reference_parser import split_references
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+_DOI = re.compile(r"\b10\.\d{4,9}/\S+")
+SHORT_TEXT_CHARS = 800
+# 抽取 (含模型升级重试) 的总超时；/api/audit 里再缩到请求剩余预算以内
+TIMEOUT = 30
+# 快速路径解析出条目后，剩下的文本少于这么多词 (如 "References" 标题) 就不再调用 LLM
+MIN_LEFTOVER_WORDS = 4
 
 
 class CitationData(BaseModel):
@@ -24,29 +31,154 @@ class CitationData(BaseModel):
     specific_claims: List[str] = []
 
 
-def generate_with_retry(model, prompt):
-    max_attempts = 2  # 1 次失败 + 1 次重试
-    for attempt in range(max_attempts):
-        try:
-            return model.generate_content(prompt)
+async def generate_with_retry(model_name, prompt, task="extract"):
+    # 429 Resource Exhausted 时不再原地等待，由 key 池冷却该 key 并换下一个 key 重试；
+    # 所有 key 都耗尽才抛出。异步调用：在事件循环里跑，超时取消时上游请求一并取消
+    began = time.perf_counter()
+    response = await gemini_key_pool.run(
+        lambda key: gemini_key_pool.model(key, model_name).generate_content_async(prompt),
+        estimated_tokens=estimate_tokens(prompt),
+    )
+    log_usage(task, model_name, prompt, response, (time.perf_counter() - began) * 1000)
+    return response
 
-        except google.api_core.exceptions.ResourceExhausted:
-            # 属于 Vertex AI 的 429 Resource Exhausted
-            if attempt == max_attempts - 1:
-                raise  # 最后一次失败 → 抛出
 
-            wait = 2 ** attempt  # 第一次失败等待 1s
-            print(f"[WARN] 429 Resource Exhausted. {wait}s 后重试第 {attempt + 2} 次调用...")
-            time.sleep(wait)
+def pick_extraction_tier(text: str):
+    """短文本且引用都带明确 DOI 时交给 lite 档，其余交给 standard 档。返回 (tier, reason)"""
+    if len(text) <= SHORT_TEXT_CHARS and _DOI.search(text):
+        return "lite", "short text with explicit DOI"
+    return "standard", f"{len(text)} chars"
 
-        except Exception:
-            raise  # 其他错误不属于可重试范围，直接抛出
 
+def parse_citations(raw_content: str) -> List[CitationData]:
+    """解析模型输出；JSON / 字段不合法时抛 ValueError (pydantic ValidationError 也是 ValueError)"""
+    # 清洗逻辑
+    clean_json = raw_content.replace("```json", "").replace("```", "").strip()
+    data = json.loads(clean_json)
+    if not isinstance(data, list):
+        raise ValueError("expected a JSON list of citations")
+
+    results = []
+    for idx, item in enumerate(data):
+        item['id'] = idx + 1
+
+        # 容错处理
+        if not item.get('raw_text'):
+            item['raw_text'] = item.get('title', 'Unknown Reference')
+        if 'specific_claims' not in item or item['specific_claims'] is None:
+            item['specific_claims'] = []
+
+        # 类型强制转换 - 无论 Gemini 返回的是 int 1992 还是 str "1992"，都转成 str
+        if 'year' in item and item['year'] is not None:
+            item['year'] = str(item['year'])
+
+        results.append(CitationData(**item))
+    return results
+
+
+async def extract_citations_from_text(text: str) -> List[CitationData]:
+    """
+    先用本地解析器取出参考文献列表里格式规范的条目 (DOI / arXiv ID / APA / IEEE，毫秒级)；
+    只有参考文献列表时不调用 Gemini。还有正文时正文交给 Gemini 抽取，正文里的引用
+    ("(Vaswani et al., 2017)") 与对应条目合并：标题 / 作者 / DOI 取条目，claim 取正文；
+    没被引用到的条目单独保留。结果按在原文里出现的位置排序。
+    """
+    with metrics.timer("extract.fast_path_ms"):
+        parsed, leftover = split_references(text)
+    metrics.incr("extract.fast_path_citations", len(parsed))
+
+    llm_results: List[CitationData] = []
+    if leftover and (not parsed or len(leftover.split()) >= MIN_LEFTOVER_WORDS):
+        metrics.incr("extract.llm_calls")
+        llm_results = await _extract_with_llm(leftover)
+    elif parsed:
+        metrics.incr("extract.llm_skipped")
+
+    entries = [CitationData(id=0, **fields) for fields in parsed]
+    merged = _merge_with_entries(llm_results, entries)
+    results = _in_document_order(text, [e for i, e in enumerate(entries) if i not in merged], llm_results)
+    for idx, cit in enumerate(results):
+        cit.id = idx + 1
+    if parsed:
+        print(f"[Debug] 本地解析 {len(parsed)} 条引用，LLM 抽取 {len(llm_results)} 条，合并 {len(merged)} 条")
+    return results
+
+
+def _first_surname(author: Optional[str]) -> str:
+    queries = parse_author_query(author)
+    return queries[0].surname if queries else ""
 
-def extract_citations_from_text(text: str) -> List[CitationData]:
-    print(f"\n[Debug] 正在让 Gemini 提取文本: {text[:50]}...")
-    model = genai.GenerativeModel('gemini-2.0-flash')
 
+def _year(year: Optional[str]) -> str:
+    return "".join(filter(str.isdigit, str(year or "")))
+
+
+def _same_work(cit: CitationData, entry: CitationData) -> bool:
+    """DOI 相同，或第一作者的姓 + 年份相同 ((Vaswani et al., 2017) 对 Vaswani, A., ... (2017))"""
+    if cit.doi and entry.doi:
+        return cit.doi.strip().lower().rstrip(".") == entry.doi.strip().lower().rstrip(".")
+    surname = _first_surname(cit.author)
+    return bool(surname) and surname == _first_surname(entry.author) and \
+        bool(_year(cit.year)) and _year(cit.year) == _year(entry.year)
+
+
+def _merge_with_entries(citations: List[CitationData], entries: List[CitationData]) -> set:
+    """
+    正文引用匹配到参考文献条目时，就地补上条目的标题 / 作者 / 年份 / DOI (claim 保留正文的)。
+    返回被合并的条目下标；同一条目可被正文多次引用
+    """
+    merged = set()
+    if not entries:
+        return merged
+    for cit in citations:
+        for i, entry in enumerate(entries):
+            if _same_work(cit, entry):
+                cit.title = entry.title or cit.title
+                cit.author = entry.author or cit.author
+                cit.year = entry.year or cit.year
+                cit.doi = entry.doi or cit.doi
+                merged.add(i)
+                break
+    if merged:
+        metrics.incr("extract.entries_merged", len(merged))
+    return merged
+
+
+def _positions(text: str, citations: List[CitationData]) -> List[int]:
+    """raw_text 在原文里的位置；找不到 (模型改写了原文) 时沿用同一组里前一条的位置"""
+    positions = []
+    last = -1
+    for cit in citations:
+        found = text.find(cit.raw_text) if cit.raw_text else -1
+        last = found if found >= 0 else last
+        positions.append(last)
+    return positions
+
+
+def _in_document_order(text: str, *groups: List[CitationData]) -> List[CitationData]:
+    """几组结果 (本地解析的条目、LLM 抽取的正文引用) 按在原文里出现的位置合成一个列表"""
+    keyed = []
+    for g, group in enumerate(groups):
+        keyed.extend(((pos, g, i), cit) for i, (pos, cit) in enumerate(zip(_positions(text, group), group)))
+    return [cit for _, cit in sorted(keyed, key=lambda item: item[0])]
+
+
+async def _extract_with_llm(text: str) -> List[CitationData]:
+    """超出预算的长文本只保留带引用线索的句子 (及其后一句)，切成几块逐块抽取后拼接"""
+    print(f"\n[Debug] 正在让 Gemini 提取文本: {text[:50]}...")
+    chunks = extraction_chunks(text)
+    results: List[CitationData] = []
+    for n, chunk in enumerate(chunks):
+        # 请求预算快用完时剩下的块不再抽取 (记为 deadline_limited)，已抽到的照常返回
+        if n and not has_budget("extract", OPTIONAL_BUDGET):
+            break
+        results.extend(await _extract_chunk(chunk))
+    if len(chunks) > 1:
+        metrics.incr("extract.chunks", len(chunks))
+    return results
+
+
+async def _extract_chunk(text: str) -> List[CitationData]:
     prompt = f"""
         You are a forensic text auditor. 
         Analyze the text and extract ALL academic papers mentioned.
@@ -82,33 +214,16 @@ def extract_citations_from_text(text: str) -> List[CitationData]:
         {text}
     """
 
-    try:
-        response = generate_with_retry(model, prompt)
-        raw_content = response.text
-
-        # 清洗逻辑
-        clean_json = raw_content.replace("```json", "").replace("```", "").strip()
-        data = json.loads(clean_json)
-
-        results = []
-        for idx, item in enumerate(data):
-            item['id'] = idx + 1
-
-            # 容错处理
-            if not item.get('raw_text'):
-                item['raw_text'] = item.get('title', 'Unknown Reference')
-            if 'specific_claims' not in item or item['specific_claims'] is None:
-                item['specific_claims'] = []
-
-            # 类型强制转换 - 无论 Gemini 返回的是 int 1992 还是 str "1992"，都转成 str
-            if 'year' in item and item['year'] is not None:
-                item['year'] = str(item['year'])
-
-            results.append(CitationData(**item))
+    async def call(model_name):
+        return parse_citations((await generate_with_retry(model_name, prompt)).text)
 
+    tier, reason = pick_extraction_tier(text)
+    try:
+        # 输出不是合法 JSON / 字段不符时，路由升级到更强的模型重试
+        results = await model_router.run("extract", tier, call, reason=reason)
         print(f"[Debug] 成功提取到 {len(results)} 条引用")
         return results
 
     except Exception as e:
         print(f"[ERROR] 提取失败: {e}")
-        return []
\ No newline at end of file
+        return []
@@ -0,0 +1,106 @@
+"""
+模型分级路由：简单任务 (短文本 + 明确 DOI、摘要词法高度吻合等) 先交给更快更便宜的档位，
+结果置信度低或不符合 schema 时再逐级升级到更强的模型。
+每次路由决定和各档位耗时都记入 metrics (router.<task>.*)，用于调整速度 / 质量的取舍。
+
+环境变量：
+    GEMINI_MODEL_LITE=gemini-2.0-flash-lite
+    GEMINI_MODEL_STANDARD=gemini-2.0-flash
+    GEMINI_MODEL_STRONG=gemini-2.5-flash
+    ROUTER_ENABLED=1            (0 = 一律使用 standard，不升级，即原有行为)
+    ROUTER_MIN_CONFIDENCE=0.6   (低于此置信度的结论升级到下一档)
+"""
+import os
+import time
+from typing import Awaitable, Callable, Iterator, Optional, TypeVar
+
+from app.deadline import OPTIONAL_BUDGET, has_budget
+from app.metrics import metrics
+
+T = TypeVar("T")
+
+TIERS = ["lite", "standard", "strong"]
+TIER_MODELS = {
+    "lite": os.getenv("GEMINI_MODEL_LITE", "gemini-2.0-flash-lite"),
+    "standard": os.getenv("GEMINI_MODEL_STANDARD", "gemini-2.0-flash"),
+    "strong": os.getenv("GEMINI_MODEL_STRONG", "gemini-2.5-flash"),
+}
+ENABLED = os.getenv("ROUTER_ENABLED", "1") != "0"
+MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", 0.6))
+
+
+class ModelRouter:
+    async def run(self, task: str, tier: str, call: Callable[[str], Awaitable[T]],
+                  accept: Optional[Callable[[T], bool]] = None, reason: str = "") -> T:
+        """
+        从 tier 开始调用 call(model_name)；
+        结果未通过 accept (如置信度低) 或抛出 ValueError (JSON / schema 解析失败) 时升级到下一档。
+        已经是最高档、或请求剩余预算不够再升级时：返回最后的结果 / 抛出最后的异常。
+        """
+        steps = _Escalation(task, tier, accept, reason)
+        for model_name in steps:
+            try:
+                result = await call(model_name)
+            except ValueError as e:
+                if steps.failed(e):
+                    continue
+                raise
+            if steps.finished(result):
+                return result
+        raise RuntimeError("unreachable")
+
+
+class _Escalation:
+    """run 使用的逐档升级：迭代出每一档的模型名，每档结束后决定是否升级"""
+
+    def __init__(self, task: str, tier: str, accept: Optional[Callable], reason: str):
+        if not ENABLED:
+            tier = "standard"
+        metrics.incr(f"router.{task}.start.{tier}")
+        print(f"[Router] {task}: start at {tier} ({TIER_MODELS[tier]}){' - ' + reason if reason else ''}")
+        self.task = task
+        self.accept = accept
+        self.tiers = TIERS[TIERS.index(tier):] if ENABLED else [tier]
+        self.index = 0
+        self.began = 0.0
+
+    def __iter__(self) -> Iterator[str]:
+        for self.index, tier in enumerate(self.tiers):
+            self.began = time.perf_counter()
+            yield TIER_MODELS[tier]
+
+    def failed(self, error: ValueError) -> bool:
+        """当前档结果不符合 schema：能升级返回 True，否则调用方抛出"""
+        self._observe()
+        return self._escalate(f"schema failure: {error}")
+
+    def finished(self, result) -> bool:
+        """当前档有结果：可以返回时为 True，升级到下一档时为 False"""
+        self._observe()
+        if self.accept is None or self.accept(result):
+            return True
+        return not self._escalate("low confidence")
+
+    def _escalate(self, why: str) -> bool:
+        # 已经是最高档，或请求剩余预算不够再跑一档时 (可选阶段，见 app/deadline.py)，用当前结果
+        if self.index == len(self.tiers) - 1 or not has_budget(f"{self.task}_escalation", OPTIONAL_BUDGET):
+            return False
+        from_tier, to_tier = self.tiers[self.index], self.tiers[self.index + 1]
+        metrics.incr(f"router.{self.task}.escalated.{from_tier}")
+        print(f"[Router] {self.task}: {from_tier} -> {to_tier} ({why})")
+        return True
+
+    def _observe(self) -> None:
+        tier = self.tiers[self.index]
+        metrics.incr(f"router.{self.task}.{tier}.calls")
+        metrics.observe(f"router.{self.task}.{tier}.latency_ms", (time.perf_counter() - self.began) * 1000)
+
+
+def confident(result: dict, field: str = "confidence") -> bool:
+    try:
+        return float(result.get(field, 0)) >= MIN_CONFIDENCE
+    except (TypeError, ValueError):
+        return False
+
+
+model_router = ModelRouter()
@@ -0,0 +1,163 @@
+"""
+数字类陈述的本地核对 (对应审计 prompt 里的 "Data Integrity" 规则)：
+从 claim 和摘要里抽取 百分比 / p 值 / 样本量 / 其他数值，归一化后比对，
+claim 里有而摘要里没有的数字即为 SUSPICIOUS 候选。
+"""
+import re
+from typing import List, NamedTuple, Optional
+
+_SCALE = {"thousand": 1e3, "k": 1e3, "million": 1e6, "m": 1e6, "billion": 1e9, "b": 1e9}
+_NUM = r"(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?|\.\d+)"
+
+_P_VALUE = re.compile(r"\bp\s*(?:-?\s*values?\s*(?:of|was|=|<|>|≤|≥)?)?\s*([<>=≤≥]{1,2})?\s*" + _NUM, re.IGNORECASE)
+_PERCENT = re.compile(_NUM + r"\s*(?:%|percent\b|per cent\b|pct\b)", re.IGNORECASE)
+_SAMPLE_N = re.compile(r"\bn\s*=\s*" + _NUM, re.IGNORECASE)
+_SAMPLE_UNIT = re.compile(
+    _NUM + r"(?:\s*(thousand|million|billion))?\s+(?:[a-z-]+\s+)?(?:participants|subjects|patients|respondents|students|people|individuals|"
+    r"volunteers|adults|children|users|workers|cases|samples|images|documents|sentences|examples)\b",
+    re.IGNORECASE,
+)
+# 前面紧贴字母或 "字母-" 的数字是名字的一部分 (GPT-3, ResNet-50, L2)，不算数据
+_GENERIC = re.compile(r"(?<![A-Za-z])(?<![A-Za-z]-)(?<![\d.,])" + _NUM + r"(?:\s*(thousand|million|billion|[kmb])\b)?",
+                      re.IGNORECASE)
+_SIGNIFICANT = re.compile(r"\bsignificant(?:ly)?\b", re.IGNORECASE)
+# "not significant" / "no significant" / "non-significant" / "not statistically significant" 是相反的意思
+_NEGATED_BEFORE = re.compile(r"\b(?:not|no|non|in)[\s-]+(?:statistically\s+)?$", re.IGNORECASE)
+
+
+class Figure(NamedTuple):
+    kind: str  # percent / p / n / number
+    value: float
+    raw: str
+    decimals: int  # 原文的小数位数 (比对时按此精度四舍五入)
+    op: str = "="
+
+
+def _to_float(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def _decimals(text: str) -> int:
+    return len(text.split(".", 1)[1]) if "." in text else 0
+
+
+def _is_year(value: float, raw: str) -> bool:
+    return raw.isdigit() and len(raw) == 4 and 1900 <= value <= 2100
+
+
+def extract_figures(text: str) -> List[Figure]:
+    if not text:
+        return []
+    figures: List[Figure] = []
+    taken: List[range] = []
+
+    def add(match, kind, num_group, op="=", scale=""):
+        span = range(match.start(), match.end())
+        if any(span.start < t.stop and t.start < span.stop for t in taken):
+            return
+        raw = match.group(num_group)
+        value = _to_float(raw) * _SCALE.get((scale or "").lower(), 1)
+        figures.append(Figure(kind, value, match.group(0).strip(), _decimals(raw), op))
+        taken.append(span)
+
+    for m in _P_VALUE.finditer(text):
+        add(m, "p", 2, (m.group(1) or "=").replace("≤", "<=").replace("≥", ">="))
+    for m in _PERCENT.finditer(text):
+        add(m, "percent", 1)
+    for m in _SAMPLE_N.finditer(text):
+        add(m, "n", 1)
+    for m in _SAMPLE_UNIT.finditer(text):
+        add(m, "n", 1, scale=m.group(2))
+    for m in _GENERIC.finditer(text):
+        raw = m.group(1)
+        value = _to_float(raw)
+        scale = (m.group(2) or "").lower()
+        if not scale and _is_year(value, raw):
+            continue
+        # 个位整数多是序号 / 计数 ("Step 1", "3 layers")，不当作数据
+        if not scale and raw.isdigit() and value < 10:
+            continue
+        span = range(m.start(), m.end())
+        if any(span.start < t.stop and t.start < span.stop for t in taken):
+            continue
+        figures.append(Figure("number", value * _SCALE.get(scale, 1), m.group(0).strip(), _decimals(raw)))
+        taken.append(span)
+    return figures
+
+
+def _same_value(claimed: Figure, actual: float) -> bool:
+    # claim 写 "95%"，摘要写 "95.3%" 视为一致 (按 claim 的精度四舍五入)
+    if round(actual, claimed.decimals) == round(claimed.value, claimed.decimals):
+        return True
+    return abs(actual - claimed.value) <= abs(claimed.value) * 0.005
+
+
+def is_supported(claimed: Figure, abstract_figures: List[Figure], abstract: str) -> bool:
+    for actual in abstract_figures:
+        if claimed.kind == "p":
+            if actual.kind != "p":
+                continue
+            if claimed.op in ("<", "<=") and actual.value <= claimed.value:
+                return True
+            if _same_value(claimed, actual.value):
+                return True
+            continue
+        if _same_value(claimed, actual.value):
+            return True
+        # 95% <-> 0.95
+        if claimed.kind == "percent" and _same_value(claimed, actual.value * 100):
+            return True
+        if actual.kind == "percent" and _same_value(claimed._replace(value=claimed.value * 100), actual.value):
+            return True
+    # "p < 0.05" 与摘要中的 "significantly" 视为隐含支持；摘要给出的 p 值与阈值矛盾时不算
+    if claimed.kind == "p" and claimed.op in ("<", "<=") and _affirms_significance(abstract):
+        return not any(_contradicts(claimed, actual) for actual in abstract_figures)
+    return False
+
+
+def _affirms_significance(abstract: str) -> bool:
+    """摘要里有没被否定的 "significant(ly)" (前面不是 not / no / non- / in-)"""
+    for m in _SIGNIFICANT.finditer(abstract):
+        if not _NEGATED_BEFORE.search(abstract[max(0, m.start() - 30):m.start()]):
+            return True
+    return False
+
+
+def _contradicts(claimed: Figure, actual: Figure) -> bool:
+    """摘要里的 p 值达不到 claim 的阈值 (p = 0.3 / p > 0.05 对 p < 0.05)"""
+    if actual.kind != "p":
+        return False
+    return actual.value > claimed.value or (actual.op in (">", ">=") and actual.value >= claimed.value)
+
+
+class NumericReport(NamedTuple):
+    claimed: List[Figure]
+    matched: List[Figure]
+    missing: List[Figure]
+
+    @property
+    def has_figures(self) -> bool:
+        return bool(self.claimed)
+
+    def as_hint(self) -> Optional[str]:
+        """给 LLM 的提示 (没有数字时返回 None)"""
+        if not self.claimed:
+            return None
+        lines = []
+        if self.matched:
+            lines.append("Found in abstract: " + "; ".join(f.raw for f in self.matched))
+        if self.missing:
+            lines.append("NOT found in abstract: " + "; ".join(f.raw for f in self.missing))
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        return {"matched": [f.raw for f in self.matched], "missing": [f.raw for f in self.missing]}
+
+
+def check_figures(claim: str, abstract: str) -> NumericReport:
+    claimed = extract_figures(claim)
+    abstract_figures = extract_figures(abstract)
+    matched, missing = [], []
+    for figure in claimed:
+        (matched if is_supported(figure, abstract_figures, abstract) else missing).append(figure)
+    return NumericReport(claimed, matched, missing)
@@ -1,33 +1,14 @@
 import httpx
 import difflib
 import re
-from typing import Optional, Dict, Any
+from typing import Optional, Tuple
 
-
-def reconstruct_abstract(inverted_index: Dict[str, list]) -> str:
-    if not inverted_index:
-        return ""
-    word_list = []
-    for word, positions in inverted_index.items():
-        for pos in positions:
-            word_list.append((pos, word))
-    word_list.sort(key=lambda x: x[0])
-    return " ".join([w[1] for w in word_list])
-
-
-def check_author_match(query_author: str, paper_authors: list) -> bool:
-    if not query_author:
-        return True
-
-    q_parts = set(query_author.lower().replace(",", "").replace(".", "").split())
-    q_parts.discard("et")
-    q_parts.discard("al")
-
-    for db_author in paper_authors:
-        db_parts = set(db_author.lower().replace(",", "").replace(".", "").split())
-        if q_parts.intersection(db_parts):
-            return True
-    return False
+from app.deadline import blame_deadline, has_budget, stage_timeout
+from app.json_codec import loads_response
+from app.metrics import metrics
+from app.services.author_match import AuthorIndex, parse_author_query
+from app.services.paper import PaperRecord
+from app.services.query_planner import openalex_planner
 
 
 def get_similarity_score(str1: str, str2: str) -> float:
@@ -36,23 +17,34 @@ def get_similarity_score(str1: str, str2: str) -> float:
     return difflib.SequenceMatcher(None, s1, s2).ratio()
 
 
-async def fetch_from_openalex(params: dict) -> list:
+# 只取评分和 PaperRecord 用到的顶层字段 (OpenAlex select 不支持嵌套字段)
+OPENALEX_SELECT = ",".join([
+    "id", "doi", "title", "publication_year", "authorships",
+    "open_access", "cited_by_count", "abstract_inverted_index",
+])
+
+
+async def fetch_from_openalex(params: dict) -> Optional[list]:
+    """返回结果列表；请求失败 (超时 / 非 200) 时返回 None，与 "查询成功但没有结果" 区分开"""
+    params = {"select": OPENALEX_SELECT, **params}
     try:
-        # 使用异步上下文管理器
-        async with httpx.AsyncClient(timeout=20) as client:
-            response = await client.get("https://api.openalex.org/works", params=params)
+        # 使用异步上下文管理器；超时不超过请求剩余预算
+        with metrics.track_upstream("openalex"):
+            async with httpx.AsyncClient(timeout=stage_timeout(20)) as client:
+                response = await client.get("https://api.openalex.org/works", params=params)
             if response.status_code == 200:
-                return response.json().get("results", [])
+                return loads_response(response, "openalex").get("results", [])
     except Exception as e:
+        blame_deadline("openalex")
         print(f"[OpenAlex Error] {e}")
         pass
-    return []
+    return None
 
 
 async def search_paper_on_openalex(title: Optional[str], author: Optional[str] = None, year: Optional[str] = None,
-                                   doi: Optional[str] = None) -> Dict[str, Any]:
+                                   doi: Optional[str] = None) -> PaperRecord:
     # --- 策略 0: DOI 精确查找 (最高优先级) ---
-    if doi:
+    if doi and has_budget("openalex"):
         # 清洗 DOI (去掉 https://doi.org/ 前缀)
         clean_doi = doi.replace("https://doi.org/", "").replace("doi:", "").strip()
         print(f"[OpenAlex] Searching by DOI: {clean_doi}")
@@ -60,40 +52,62 @@ async def search_paper_on_openalex(title: Optional[str], author: Optional[str] =
         if results:
             best_paper = results[0]
             # 直接返回，无需评分
-            return _format_result(best_paper, found=True)
+            return PaperRecord.from_openalex(best_paper)
 
     # --- 常规标题搜索 ---
     if not title:
-        return {"found": False, "reason": "No title extracted"}
+        return PaperRecord.not_found("No title extracted", source="OpenAlex")
 
     clean_title = title.replace('"', '').replace("'", "").replace("“", "").replace("”", "").strip()
     if len(clean_title) < 3:
-        return {"found": False, "reason": "Title is too short"}
-
-    # 策略 1: 宽泛搜索
-    results = await fetch_from_openalex({
-        "search": clean_title,
-        "per_page": 20,
-        "mailto": "audit_test@realibuddy.com"
-    })
-
-    # 策略 2: 精准过滤 (如果宽泛搜索没结果)
-    if not results and len(clean_title.split()) > 2:
-        results = await fetch_from_openalex({
-            "filter": f"title.search:{clean_title}",
-            "per_page": 20,
-            "mailto": "audit_test@realibuddy.com"
-        })
+        return PaperRecord.not_found("Title is too short", source="OpenAlex")
 
+    target_year = int(year) if (year and year.isdigit()) else None
+
+    # 策略 1..n: 由查询规划器按 已有字段 + 历史命中率 排序 (精确过滤优先，宽泛搜索兜底)
+    low_confidence = None
+    skip_filters = False
+    for strategy, params in openalex_planner.plan(clean_title, author, target_year):
+        if skip_filters and strategy != "search":
+            continue
+        # 预算不够就不再尝试后面的策略 (也不计入规划器的命中率)
+        if not has_budget("openalex"):
+            break
+        results = await fetch_from_openalex(params)
+        best_paper, score, threshold = _pick_best_candidate(results, clean_title, author, target_year)
+        hit = best_paper is not None and score >= threshold
+        # 请求失败 (超时 / 非 200) 不说明策略好坏，不计入命中率
+        if results is not None:
+            openalex_planner.record(strategy, hit)
+        if hit:
+            print(f"[OpenAlex] Hit via {strategy} ({len(results)} results)")
+            return PaperRecord.from_openalex(best_paper)
+        if best_paper is not None:
+            low_confidence = score
+        # 过滤查询没有结果：剩下的过滤查询跳过，只按标题过滤都没有结果时连宽泛搜索也不做
+        if results == [] and strategy != "search":
+            if openalex_planner.stop_after_empty(strategy):
+                metrics.incr("openalex.planner.stopped_empty")
+                break
+            skip_filters = True
+
+    if low_confidence is not None:
+        return PaperRecord.not_found(f"Low confidence match ({low_confidence:.2f})", source="OpenAlex")
+    return PaperRecord.not_found("No matches found in OpenAlex", source="OpenAlex")
+
+
+def _pick_best_candidate(results: list, clean_title: str, author: Optional[str],
+                         target_year: Optional[int]) -> Tuple[Optional[dict], float, float]:
+    """对候选论文打分，返回 (最佳论文, 分数, 阈值)；没有候选时论文为 None"""
     if not results:
-        return {"found": False, "reason": "No matches found in OpenAlex"}
+        return None, 0.0, 0.0
 
     # --- 智能评分逻辑 ---
     candidates = []
-    target_year = int(year) if (year and year.isdigit()) else None
+    # 引用作者只解析一次；每个候选的作者列表建一次索引
+    author_queries = parse_author_query(author)
 
     for paper in results:
-        paper_authors = [a["author"]["display_name"] for a in paper.get("authorships", [])]
         paper_title = paper.get("title", "") or ""
         paper_year = paper.get("publication_year")
 
@@ -101,7 +115,9 @@ async def search_paper_on_openalex(title: Optional[str], author: Optional[str] =
         title_sim = get_similarity_score(clean_title, paper_title)
 
         # 2. 作者验证 (权重调整)
-        is_auth_match = check_author_match(author, paper_authors)
+        is_auth_match = (not author_queries or AuthorIndex(
+            a["author"]["display_name"] for a in paper.get("authorships") or []
+        ).matches_any(author_queries))
 
         # 3. 年份验证 (允许 ±1 年误差)
         is_year_match = False
@@ -128,7 +144,8 @@ async def search_paper_on_openalex(title: Optional[str], author: Optional[str] =
         candidates.append({
             "paper": paper,
             "score": final_score,
-            "raw_sim": title_sim
+            "raw_sim": title_sim,
+            "author_match": is_auth_match,
         })
 
     # 按分数降序排序
@@ -140,33 +157,8 @@ async def search_paper_on_openalex(title: Optional[str], author: Optional[str] =
     threshold = 0.6
 
     # 宽松特例：如果作者对且年份对，标题相似度只要 > 0.4 即可（应对标题简写）
-    if author and year and check_author_match(author, [a["author"]["display_name"] for a in
-                                                       best_candidate['paper'].get("authorships", [])]):
-        if abs(int(year) - (best_candidate['paper'].get("publication_year") or 0)) <= 1:
+    if author and target_year and best_candidate['author_match']:
+        if abs(target_year - (best_candidate['paper'].get("publication_year") or 0)) <= 1:
             threshold = 0.4
 
-    if best_candidate['score'] < threshold:
-        return {"found": False, "reason": f"Low confidence match ({best_candidate['score']:.2f})"}
-
-    return _format_result(best_candidate['paper'], found=True)
-
-
-def _format_result(paper: dict, found: bool) -> dict:
-    """辅助函数：格式化 OpenAlex 返回的数据"""
-    abstract_text = ""
-    inverted_idx = paper.get("abstract_inverted_index")
-    if inverted_idx:
-        abstract_text = reconstruct_abstract(inverted_idx)
-
-    return {
-        "found": found,
-        "title": paper.get("title"),
-        "doi": paper.get("doi"),
-        "year": str(paper.get("publication_year")),
-        "authors": [a["author"]["display_name"] for a in paper.get("authorships", [])[:3]],
-        "is_oa": paper.get("open_access", {}).get("is_oa", False),
-        "oa_url": paper.get("open_access", {}).get("oa_url", None),
-        "abstract": abstract_text,
-        "cited_by_count": paper.get("cited_by_count", 0),
-        "id": paper.get("id")
-    }
\ No newline at end of file
+    return best_candidate['paper'], best_candidate['score'], threshold
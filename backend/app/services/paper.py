@@ -0,0 +1,135 @@
+from typing import Any, Dict, List, Optional
+
+
+def reconstruct_abstract(inverted_index: Optional[Dict[str, list]]) -> str:
+    """
+    OpenAlex 倒排索引 -> 摘要原文。
+    按位置直接放入预分配的列表 (线性时间)，不再构造 (pos, word) 元组再排序。
+    """
+    if not inverted_index:
+        return ""
+
+    size = 0
+    for positions in inverted_index.values():
+        if positions:
+            size = max(size, max(positions) + 1)
+
+    slots: List[Optional[str]] = [None] * size
+    for word, positions in inverted_index.items():
+        for pos in positions:
+            slots[pos] = word
+    # 倒排索引偶尔有空洞 (被 OpenAlex 过滤掉的词)，跳过即可
+    return " ".join([w for w in slots if w is not None])
+
+
+class PaperRecord:
+    """
+    OpenAlex / Semantic Scholar 共用的精简论文记录。
+    - __slots__：每个实例不带 __dict__
+    - 摘要延迟重建：只有审计真正读取 .abstract 时才从倒排索引拼出原文
+    """
+
+    __slots__ = (
+        "found", "reason", "source", "title", "doi", "year", "authors",
+        "is_oa", "oa_url", "cited_by_count", "id",
+        "_abstract", "_inverted_index",
+    )
+
+    def __init__(self, found: bool = True, reason: Optional[str] = None, source: Optional[str] = None,
+                 title: Optional[str] = None, doi: Optional[str] = None, year: str = "",
+                 authors: Optional[List[str]] = None, is_oa: Optional[bool] = None,
+                 oa_url: Optional[str] = None, cited_by_count: int = 0, id: Optional[str] = None,
+                 abstract: Optional[str] = None, inverted_index: Optional[Dict[str, list]] = None):
+        self.found = found
+        self.reason = reason
+        self.source = source
+        self.title = title
+        self.doi = doi
+        self.year = year
+        self.authors = authors or []
+        self.is_oa = is_oa
+        self.oa_url = oa_url
+        self.cited_by_count = cited_by_count
+        self.id = id
+        self._abstract = abstract
+        self._inverted_index = inverted_index
+
+    @classmethod
+    def not_found(cls, reason: str, source: Optional[str] = None) -> "PaperRecord":
+        return cls(found=False, reason=reason, source=source)
+
+    @classmethod
+    def from_openalex(cls, paper: dict) -> "PaperRecord":
+        open_access = paper.get("open_access") or {}
+        year = paper.get("publication_year")
+        return cls(
+            source="OpenAlex",
+            title=paper.get("title"),
+            doi=paper.get("doi"),
+            year=str(year) if year else "",
+            authors=[a["author"]["display_name"] for a in (paper.get("authorships") or [])[:3]],
+            is_oa=open_access.get("is_oa", False),
+            oa_url=open_access.get("oa_url"),
+            cited_by_count=paper.get("cited_by_count", 0) or 0,
+            id=paper.get("id"),
+            inverted_index=paper.get("abstract_inverted_index"),
+        )
+
+    @classmethod
+    def from_semantic_scholar(cls, paper: dict) -> "PaperRecord":
+        oa_pdf = paper.get("openAccessPdf") or {}
+        year = paper.get("year")
+        return cls(
+            source="Semantic Scholar",
+            title=paper.get("title"),
+            year=str(year) if year else "",
+            authors=[a["name"] for a in (paper.get("authors") or [])[:3]],
+            oa_url=oa_pdf.get("url") or paper.get("url"),
+            cited_by_count=paper.get("citationCount", 0) or 0,
+            abstract=paper.get("abstract") or "",
+        )
+
+    @property
+    def abstract(self) -> str:
+        if self._abstract is None:
+            self._abstract = reconstruct_abstract(self._inverted_index)
+            # 重建后释放倒排索引
+            self._inverted_index = None
+        return self._abstract
+
+    @abstract.setter
+    def abstract(self, value: str) -> None:
+        self._abstract = value
+        self._inverted_index = None
+
+    @property
+    def has_abstract(self) -> bool:
+        """不触发重建，判断是否有摘要可用"""
+        if self._abstract is not None:
+            return bool(self._abstract)
+        return bool(self._inverted_index)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """输出给 NDJSON metadata 的字典 (未命中只含 found / reason)"""
+        if not self.found:
+            return {"found": False, "reason": self.reason}
+
+        data = {
+            "found": True,
+            "title": self.title,
+            "doi": self.doi,
+            "year": self.year,
+            "authors": self.authors,
+            "is_oa": self.is_oa,
+            "oa_url": self.oa_url,
+            "abstract": self.abstract,
+            "cited_by_count": self.cited_by_count,
+            "id": self.id,
+            "source": self.source,
+        }
+        return {k: v for k, v in data.items() if v is not None}
+
+    def __repr__(self) -> str:
+        if not self.found:
+            return f"PaperRecord(found=False, reason={self.reason!r})"
+        return f"PaperRecord({self.source}: {self.title!r}, {self.year})"
@@ -0,0 +1,110 @@
+"""
+LLM 审计前的本地预筛：词法重合度很高 / 很低、或主题吻合但数字对不上 (numeric_claims)
+的明确情况直接给结论，只有中间的模糊区间才交给 Gemini。
+
+两条路径分开开关：
+- 数字核对 (SUSPICIOUS) 默认开启：claim 里的具体数字在摘要中找不到是确定性的判断，
+  只有主题吻合 (词重合度 >= PRESCREEN_TOPIC_COVERAGE) 时才用，且只会判为可疑、不会判为通过。
+- 词法阈值 (REAL / MISMATCH) 默认关闭：下面的默认阈值是手工设定的，还没有在录制的 LLM 结论上
+  校准过，而预筛结论会直接替代审计结论返回给用户。先设置 PRESCREEN_RECORD_PATH 录制样本，
+  用 scripts/calibrate_prescreen.py 校准出阈值后再开启。
+    PRESCREEN_ENABLED=0           (词法 REAL / MISMATCH 捷径)
+    PRESCREEN_NUMERIC_ENABLED=1   (数字对不上 -> SUSPICIOUS)
+    PRESCREEN_HIGH_COVERAGE=0.8   PRESCREEN_HIGH_COSINE=0.3    (>= 判为 REAL)
+    PRESCREEN_LOW_COVERAGE=0.12   PRESCREEN_LOW_COSINE=0.05    (<= 判为 MISMATCH)
+    PRESCREEN_TOPIC_COVERAGE=0.5  (主题吻合但 claim 的数字不在摘要里 -> SUSPICIOUS)
+    PRESCREEN_RECORD_PATH=...     (把交给 LLM 的样本与结论追加写入 JSONL，用于校准)
+"""
+import json
+import os
+from typing import Optional
+
+from app.metrics import metrics
+from app.services.lexical import has_negation, non_latin_ratio, overlap_scores
+from app.services.numeric_claims import NumericReport
+
+ENABLED = os.getenv("PRESCREEN_ENABLED", "0") == "1"
+NUMERIC_ENABLED = os.getenv("PRESCREEN_NUMERIC_ENABLED", "1") == "1"
+HIGH_COVERAGE = float(os.getenv("PRESCREEN_HIGH_COVERAGE", 0.8))
+HIGH_COSINE = float(os.getenv("PRESCREEN_HIGH_COSINE", 0.3))
+LOW_COVERAGE = float(os.getenv("PRESCREEN_LOW_COVERAGE", 0.12))
+LOW_COSINE = float(os.getenv("PRESCREEN_LOW_COSINE", 0.05))
+TOPIC_COVERAGE = float(os.getenv("PRESCREEN_TOPIC_COVERAGE", 0.5))
+RECORD_PATH = os.getenv("PRESCREEN_RECORD_PATH") or None
+
+MIN_CLAIM_TERMS = 3
+
+
+def decide(scores: dict, numeric: NumericReport, negated: bool = False,
+           lexical: bool = True, numeric_check: bool = True) -> Optional[str]:
+    """
+    根据分数和数字核对给出 'REAL' / 'MISMATCH' / 'SUSPICIOUS'，模糊区间返回 None。
+    negated：claim 含否定线索时词重合高也可能是在反驳摘要，不走 REAL 捷径。
+    lexical / numeric_check：是否启用词法阈值 (REAL / MISMATCH) / 数字核对 (SUSPICIOUS)
+    """
+    if scores["claim_terms"] < MIN_CLAIM_TERMS:
+        return None
+    if lexical and scores["coverage"] <= LOW_COVERAGE and scores["cosine"] <= LOW_COSINE:
+        return "MISMATCH"
+    # 主题吻合，但 claim 里的具体数字在摘要中找不到 (Data Integrity 规则)
+    if numeric_check and numeric.missing and scores["coverage"] >= TOPIC_COVERAGE:
+        return "SUSPICIOUS"
+    if (lexical and scores["coverage"] >= HIGH_COVERAGE and scores["cosine"] >= HIGH_COSINE and not numeric.missing
+            and not negated):
+        return "REAL"
+    return None
+
+
+def prescreen(claim: str, abstract: str, numeric: NumericReport, scores: Optional[dict] = None) -> Optional[dict]:
+    """
+    返回与 verify_content_consistency 相同结构的结论 (附带 prescreen 分数)，
+    需要交给 LLM 时返回 None。scores：调用方已经算好的 overlap_scores (没有则在这里算)
+    """
+    if not (ENABLED or NUMERIC_ENABLED):
+        return None
+    metrics.incr("prescreen.checks")
+
+    # 跨语言 (如中文 claim 对英文摘要) 词法重合度没有意义
+    if non_latin_ratio(claim) > 0.3:
+        metrics.incr("prescreen.escalated")
+        return None
+
+    scores = scores or overlap_scores(claim, abstract)
+    verdict = decide(scores, numeric, has_negation(claim), lexical=ENABLED, numeric_check=NUMERIC_ENABLED)
+    if verdict is None:
+        metrics.incr("prescreen.escalated")
+        return None
+
+    metrics.incr(f"prescreen.short_circuit.{verdict.lower()}")
+    if verdict == "REAL":
+        reason = f"Claim terms are well covered by the abstract (lexical coverage {scores['coverage']:.2f})."
+        confidence = round(min(0.95, 0.6 + scores["coverage"] * 0.35), 2)
+    elif verdict == "SUSPICIOUS":
+        reason = ("Topic matches, but these figures do not appear in the abstract: "
+                  + "; ".join(f.raw for f in numeric.missing) + ".")
+        confidence = 0.75 if not numeric.matched else 0.65
+    else:
+        reason = f"Claim shares almost no content with the abstract (lexical coverage {scores['coverage']:.2f})."
+        confidence = round(min(0.9, 0.9 - scores["coverage"]), 2)
+    return {"status": verdict, "confidence": confidence, "reason": reason,
+            "prescreen": {**scores, "figures": numeric.to_dict()}}
+
+
+def record_llm_verdict(claim: str, abstract: str, verdict: dict, scores: Optional[dict] = None) -> None:
+    """录制交给 LLM 的样本 (用于阈值校准)"""
+    if not RECORD_PATH:
+        return
+    try:
+        row = {"claim": claim, "abstract": abstract, "status": verdict.get("status"),
+               **(scores or overlap_scores(claim, abstract))}
+        with open(RECORD_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"[Prescreen] Failed to record sample: {e}")
+
+
+def short_circuit_rate() -> float:
+    checks = metrics.counters.get("prescreen.checks", 0)
+    if not checks:
+        return 0.0
+    return round((checks - metrics.counters.get("prescreen.escalated", 0)) / checks, 4)
@@ -0,0 +1,207 @@
+"""
+按 token 预算构建 prompt (审计器 / 抽取器 / Google 核查)：
+- count_tokens：本地估算 token 数 (不调用 countTokens 接口)。拉丁文字按词切分，长词约每 4 个字符
+  一个 token；中日韩字符一个字一个 token；标点各算一个。与 Gemini 实际计数误差一般在 10~15% 以内，
+  比 "字符数 / 4" 准 (后者对中文低估约 4 倍)。
+- select_sentences：摘要超出预算时，按与 claim 的 IDF 加权词重合度 (lexical.py 同一套打分) 挑句子，
+  第一句 (通常交代主题，判断 MISMATCH 要用) 总是保留，其余按原顺序拼接，不相邻处用 "…" 连接。
+- extraction_chunks：抽取输入超出预算时，只保留带引用线索的句子 (人名 + 年份、et al. / 等人、DOI、[n]、
+  引号 / 书名号) 及其后一句 (常常是对该论文的描述)，一条线索都没有时保留全文；按原顺序切成若干块，
+  每块在预算内，各调用一次抽取。不截断，带线索的句子一句都不丢。
+- log_usage：每次调用记录 prompt / completion token 数和耗时 (tokens.<task>.*)，把延迟和 prompt 大小对上。
+
+环境变量：
+    PROMPT_ABSTRACT_TOKENS=400   审计 prompt 里摘要的预算
+    PROMPT_CLAIM_TOKENS=250      审计 prompt 里 claim 的预算
+    PROMPT_EXTRACT_TOKENS=1200   抽取 prompt 里输入文本的预算 (每块)
+"""
+import math
+import os
+import re
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.metrics import metrics
+from app.services.lexical import get_idf_table, tokenize
+
+load_dotenv()
+
+ABSTRACT_TOKENS = int(os.getenv("PROMPT_ABSTRACT_TOKENS", 400))
+CLAIM_TOKENS = int(os.getenv("PROMPT_CLAIM_TOKENS", 250))
+EXTRACT_TOKENS = int(os.getenv("PROMPT_EXTRACT_TOKENS", 1200))
+
+_PIECES = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]|[^\W_]+|[^\w\s]", re.UNICODE)
+_CJK = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+# 句末标点后接大写 / 数字 / 中文；"et al." 和单个首字母 ("A.") 后面不断句
+_SENTENCE_END = re.compile(r"(?<=[.!?。！？])(?<!\bal\.)(?<!\b[A-Z]\.)\s+(?=[\"“A-Z0-9一-鿿])|(?<=[。！？])")
+# 引用线索：Author (2020) / Author, 2020 / et al. / DOI / arXiv / [12] / 引号里的标题；
+# 中文：王等人（2020）/ 王伟 (2019) / （王，2020）/ 等人 / ［12］ / 书名号里的标题
+_CITATION_CUE = re.compile(
+    r"\b[A-Z][\w'’-]+(?:\s+et\s+al\.?)?,?\s*\(?(?:19|20)\d{2}[a-z]?\)?"
+    r"|\bet\s+al\b|\b10\.\d{4,9}/|\barxiv\b|\[\d+(?:[,–-]\s*\d+)*\]|[\"“][^\"”]{8,}[\"”]|《[^》]+》"
+    r"|[一-鿿](?:等人|等)?\s*[（(]\s*(?:19|20)\d{2}[a-z]?\s*[）)]"
+    r"|[（(][^（）()]{1,40}[，,、]\s*(?:19|20)\d{2}[a-z]?\s*[）)]|等人|［\d+(?:[，,–-]\s*\d+)*］",
+    re.IGNORECASE,
+)
+ELLIPSIS = " … "
+
+
+def count_tokens(text: str) -> int:
+    total = 0
+    for piece in _PIECES.findall(text or ""):
+        if len(piece) == 1 or _CJK.match(piece):
+            total += 1
+        else:
+            total += math.ceil(len(piece) / 4)
+    return max(1, total)
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END.split(text or "") if s and s.strip()]
+
+
+def _join(sentences: List[str], keep: List[int]) -> str:
+    parts: List[str] = []
+    previous = None
+    for i in sorted(keep):
+        if previous is not None and i != previous + 1:
+            parts.append(ELLIPSIS.strip())
+        parts.append(sentences[i])
+        previous = i
+    return " ".join(parts)
+
+
+def _truncate(text: str, budget: int) -> str:
+    """单句就超预算时按比例截断字符"""
+    tokens = count_tokens(text)
+    if tokens <= budget:
+        return text
+    return text[:max(1, len(text) * budget // tokens)].rstrip() + "…"
+
+
+def select_sentences(claim: str, abstract: str, budget: int = ABSTRACT_TOKENS) -> str:
+    """摘要在预算内原样返回；否则保留第一句 + 与 claim 最相关的句子"""
+    if count_tokens(abstract) <= budget:
+        return abstract
+    sentences = split_sentences(abstract)
+    if len(sentences) <= 1:
+        return _truncate(abstract, budget)
+
+    idf = get_idf_table()
+    claim_terms = set(tokenize(claim))
+    costs = [count_tokens(s) for s in sentences]
+
+    def score(i: int) -> float:
+        terms = set(tokenize(sentences[i]))
+        return sum(idf[t] for t in terms & claim_terms)
+
+    keep = [0]
+    used = min(costs[0], budget)
+    if costs[0] > budget:
+        return _truncate(sentences[0], budget)
+    # 同分时靠前的句子优先
+    for i in sorted(range(1, len(sentences)), key=lambda i: (-score(i), i)):
+        if used + costs[i] + 1 <= budget:
+            keep.append(i)
+            used += costs[i] + 1
+    metrics.incr("prompt.abstract_trimmed")
+    return _join(sentences, keep)
+
+
+def fit_claim(claim: str, budget: int = CLAIM_TOKENS) -> str:
+    """claim 超出预算时按原顺序保留完整的句子，放不下的截断"""
+    if count_tokens(claim) <= budget:
+        return claim
+    kept: List[str] = []
+    used = 0
+    for sentence in split_sentences(claim):
+        cost = count_tokens(sentence)
+        if used + cost > budget:
+            if not kept:
+                kept.append(_truncate(sentence, budget))
+            break
+        kept.append(sentence)
+        used += cost
+    metrics.incr("prompt.claim_trimmed")
+    return " ".join(kept)
+
+
+def _split_long(sentence: str, budget: int) -> List[str]:
+    """单句就超预算时切成几段 (尽量在空白处切)，不丢字"""
+    pieces: List[str] = []
+    while count_tokens(sentence) > budget:
+        cut = max(1, len(sentence) * budget // count_tokens(sentence))
+        space = sentence.rfind(" ", 0, cut)
+        cut = space if space > cut // 2 else cut
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+
+def extraction_chunks(text: str, budget: int = EXTRACT_TOKENS) -> List[str]:
+    """
+    抽取输入在预算内原样返回一块；否则保留带引用线索的句子及其后一句 (没有线索时保留全部句子)，
+    按原顺序装进若干块，每块不超过预算，不相邻处用 "…" 连接
+    """
+    if count_tokens(text) <= budget:
+        return [text]
+    sentences = split_sentences(text)
+    wanted = sorted({j for i, sentence in enumerate(sentences) if _CITATION_CUE.search(sentence)
+                     for j in (i, i + 1) if j < len(sentences)})
+    if not wanted:
+        # 认不出线索 (格式少见) 时宁可多花 token，也不猜着删
+        metrics.incr("prompt.extract_no_cues")
+        wanted = list(range(len(sentences)))
+    elif len(wanted) < len(sentences):
+        metrics.incr("prompt.extract_trimmed")
+
+    chunks: List[str] = []
+    parts: List[str] = []
+    used = 0
+    previous = None
+    for i in wanted:
+        for piece in _split_long(sentences[i], budget):
+            cost = count_tokens(piece) + 1
+            gap = bool(parts) and i not in (previous, previous + 1)
+            if parts and used + cost + gap > budget:
+                chunks.append(" ".join(parts))
+                parts, used, gap = [], 0, False
+            if gap:
+                parts.append(ELLIPSIS.strip())
+                used += 1
+            parts.append(piece)
+            used += cost
+            previous = i
+    if parts:
+        chunks.append(" ".join(parts))
+    if len(chunks) > 1:
+        metrics.incr("prompt.extract_chunked")
+    return chunks
+
+
+def usage_counts(response) -> Tuple[Optional[int], Optional[int]]:
+    """(prompt, completion) token 数：SDK 响应 (usage_metadata) 或 REST 响应 JSON (usageMetadata)"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        return (getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None))
+    if isinstance(response, dict):
+        usage = response.get("usageMetadata") or {}
+        return usage.get("promptTokenCount"), usage.get("candidatesTokenCount")
+    return None, None
+
+
+def log_usage(task: str, model_name: str, prompt: str, response, latency_ms: float) -> None:
+    """记录一次调用的 token 用量与耗时；上游没返回用量时用本地估算的 prompt token 数"""
+    estimated = count_tokens(prompt)
+    prompt_tokens, completion_tokens = usage_counts(response)
+    metrics.observe(f"tokens.{task}.prompt", prompt_tokens or estimated)
+    metrics.observe(f"tokens.{task}.prompt_estimated", estimated)
+    if completion_tokens is not None:
+        metrics.observe(f"tokens.{task}.completion", completion_tokens)
+    metrics.observe(f"tokens.{task}.latency_ms", latency_ms)
+    print(f"[Tokens] {task} ({model_name}): prompt={prompt_tokens if prompt_tokens is not None else '?'} "
+          f"(local {estimated}), completion={completion_tokens if completion_tokens is not None else '?'}, "
+          f"{latency_ms:.0f}ms")
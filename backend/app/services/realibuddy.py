@@ -1,24 +1,21 @@
-import os
 import json
 import re
 from datetime import datetime
-import google.generativeai as genai
-from dotenv import load_dotenv
+from typing import List, Optional
 
-load_dotenv()
-
-API_KEY = os.getenv("DEV_API_KEY")
+from app.metrics import metrics
+from app.services.key_pool import estimate_tokens, gemini_key_pool
+from app.services.verdict_cache import VerdictCache
 
 
 class RealibuddyService:
     def __init__(self):
-        if not API_KEY:
-            print("Warning: DEV_API_KEY not found.")
-        else:
-            genai.configure(api_key=API_KEY)
+        # 使用 Gemini 2.5 Flash (API key 由 gemini_key_pool 按剩余额度分配)
+        self.model_name = 'gemini-2.5-flash'
+        self.cache = VerdictCache()
 
-        # 使用 Gemini 2.5 Flash
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+    def _model(self, key):
+        return gemini_key_pool.model(key, self.model_name)
 
     def _clean_json_text(self, text: str) -> str:
         """清理 LLM 返回的 Markdown 格式"""
@@ -44,14 +41,14 @@ class RealibuddyService:
         else:  # "all"
             return f"{base} Use your general knowledge base to verify claims across all trusted sources."
 
-    async def verify_claim(self, text: str, source_filter: str = "all"):
+    def _build_system_prompt(self, source_filter: str, response_format: str) -> str:
         now = datetime.now()
         current_date_str = now.strftime("%Y-%m-%d")
 
         # 1. 动态生成 Prompt
         role_prompt = self._get_source_prompt(source_filter)
 
-        system_prompt = f"""{role_prompt}
+        return f"""{role_prompt}
 CRITICAL CONTEXT:
 - Today's Date: {current_date_str}
 
@@ -62,31 +59,112 @@ RULES:
 4. **Hallucination Prevention**: If the claim is too obscure, return "unverifiable".
 
 RESPONSE FORMAT:
-You MUST output a valid JSON object.
+{response_format}
+"""
+
+    async def verify_claim(self, text: str, source_filter: str = "all"):
+        cached = self.cache.get(text, source_filter, self.model_name)
+        if cached is not None:
+            return cached
+
+        system_prompt = self._build_system_prompt(source_filter, f"""You MUST output a valid JSON object.
 {{
   "verdict": "True" | "False" | "Unverifiable",
   "confidence": 0.0-1.0,
   "evidence": "A single sentence correction or confirmation.",
   "source": "Name of a specific {source_filter} source you are citing"
-}}
-"""
+}}""")
         try:
             full_prompt = f"{system_prompt}\n\nVerify this statement: {text}"
 
-            # 2. 纯 Prompt 驱动，不调用 Tools
-            response = self.model.generate_content(full_prompt)
+            # 2. 纯 Prompt 驱动，不调用 Tools (异步调用，不阻塞事件循环)
+            response = await gemini_key_pool.run(
+                lambda key: self._model(key).generate_content_async(full_prompt),
+                estimated_tokens=estimate_tokens(full_prompt),
+            )
 
             cleaned_text = self._clean_json_text(response.text)
-            return json.loads(cleaned_text)
+            verdict = json.loads(cleaned_text)
+            self.cache.set(text, source_filter, self.model_name, verdict)
+            return verdict
 
         except Exception as e:
             print(f"Realibuddy Error: {e}")
-            return {
-                "verdict": "Unverifiable",
-                "confidence": 0,
-                "evidence": f"Verification failed. ({str(e)})",
-                "source": "System Error"
-            }
+            return self._error_verdict(e)
+
+    async def verify_claims(self, texts: List[str], source_filter: str = "all") -> List[dict]:
+        """
+        批量核查：一次模型调用核查多条陈述 (实时流式接口使用)。
+        返回列表与 texts 一一对应；模型漏掉的条目记为 Unverifiable。
+        """
+        if not texts:
+            return []
+
+        # 先查缓存，只把未命中的陈述交给模型
+        results: List[Optional[dict]] = [self.cache.get(t, source_filter, self.model_name) for t in texts]
+        misses = [i for i, r in enumerate(results) if r is None]
+        if not misses:
+            return results
+
+        fresh = await self._verify_claims_uncached([texts[i] for i in misses], source_filter)
+        for i, verdict in zip(misses, fresh):
+            results[i] = verdict
+            # 模型漏掉 / 格式不对的条目不缓存，下次重新核查
+            if verdict.get("source") != "System Error":
+                self.cache.set(texts[i], source_filter, self.model_name, verdict)
+        return results
+
+    async def _verify_claims_uncached(self, texts: List[str], source_filter: str) -> List[dict]:
+        system_prompt = self._build_system_prompt(source_filter, f"""You MUST output a valid JSON array with one object per statement, in the same order.
+[
+  {{
+    "id": <statement number>,
+    "verdict": "True" | "False" | "Unverifiable",
+    "confidence": 0.0-1.0,
+    "evidence": "A single sentence correction or confirmation.",
+    "source": "Name of a specific {source_filter} source you are citing"
+  }}
+]""")
+        numbered = "\n".join(f"{i + 1}. {t}" for i, t in enumerate(texts))
+
+        try:
+            full_prompt = f"{system_prompt}\n\nVerify each of these statements independently:\n{numbered}"
+            response = await gemini_key_pool.run(
+                lambda key: self._model(key).generate_content_async(full_prompt),
+                estimated_tokens=estimate_tokens(full_prompt),
+            )
+
+            cleaned_text = self._clean_json_text(response.text)
+            items = json.loads(cleaned_text)
+            if isinstance(items, dict):
+                items = [items]
+
+            by_id = {}
+            for pos, item in enumerate(items if isinstance(items, list) else []):
+                # 单条格式不对 (不是对象 / id 不是数字 / 没有 verdict) 只丢这一条，不影响同批其他结论
+                if not isinstance(item, dict) or "verdict" not in item:
+                    metrics.incr("realibuddy.batch_bad_items")
+                    continue
+                try:
+                    claim_id = int(item.pop("id", pos + 1))
+                except (TypeError, ValueError):
+                    claim_id = pos + 1
+                by_id.setdefault(claim_id, item)
+            missing = {"verdict": "Unverifiable", "confidence": 0,
+                       "evidence": "No verdict returned for this statement.", "source": "System Error"}
+            return [by_id.get(i + 1, missing) for i in range(len(texts))]
+
+        except Exception as e:
+            print(f"Realibuddy Batch Error: {e}")
+            return [self._error_verdict(e) for _ in texts]
+
+    def _error_verdict(self, e: Exception) -> dict:
+        return {
+            "verdict": "Unverifiable",
+            "confidence": 0,
+            "evidence": f"Verification failed. ({str(e)})",
+            "source": "System Error"
+        }
 
 
 realibuddy_service = RealibuddyService()
@@ -0,0 +1,275 @@
+"""
+Realibuddy 实时流式核查 (WebSocket)
+
+客户端持续发送语音转写 (ASR) 结果，服务端：
+1. 把转写切成句子，过滤掉不值得核查的句子 (问句 / 观点 / 太短)
+2. 防抖：句子稳定 debounce 秒 (或该段转写已 final) 后才进入待核查队列
+3. 新的转写修改了某个还没核查的句子时，旧句子直接丢弃 (superseded)
+4. 把待核查句子攒成一批，一次 RealibuddyService.verify_claims 调用
+   (每批先经过准入控制，与 HTTP 接口共用 app/admission.py 的容量和按客户端的公平队列)
+5. 每批结果出来就推送回客户端；过载时这批句子放回待核查队列，通知客户端并等 retry_after 秒再试
+
+客户端消息 (JSON)：
+    {"type": "transcript", "text": "...", "is_final": false}   # 当前这段话的最新识别结果 (会被后续消息覆盖)
+    {"type": "transcript", "text": "...", "is_final": true}    # 这段话识别完毕
+    {"type": "config", "source_filter": "news"}
+    {"type": "flush"}                                          # 立即核查所有待核查句子
+纯文本消息视为 is_final=true 的 transcript。
+
+服务端消息：
+    {"type": "verdict", "claim_id": 3, "text": "...", "verdict": "False", "confidence": 0.9, "evidence": "...", "source": "..."}
+    {"type": "busy", "claim_ids": [3, 4], "retry_after": 5}   # 服务器过载，这些句子稍后再核查
+    {"type": "error", "claim_ids": [3, 4], "message": "..."}  # 这批核查失败 (会话继续；claim_ids 为空表示消息本身不合法)
+"""
+import asyncio
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.admission import REALIBUDDY_COST, AdmissionController, Overloaded
+from app.metrics import metrics
+
+_SENTENCE_END = re.compile(r"(?<=[.!?。！？])\s+")
+_OPINION_PREFIXES = (
+    "i think", "i feel", "i believe", "i guess", "in my opinion", "maybe", "perhaps",
+    "personally", "i hope", "i wish", "i love", "i hate", "i like",
+)
+_FACTUAL_HINT = re.compile(
+    r"\d|\b(is|are|was|were|has|have|had|will|won|lost|invented|discovered|founded|born|died|"
+    r"largest|smallest|first|last|most|least|percent|million|billion)\b",
+    re.IGNORECASE,
+)
+
+MIN_WORDS = 5
+DEBOUNCE_SECONDS = 0.8
+MAX_BATCH = 5
+MAX_PENDING = 20
+MAX_CHECKED = 500  # 每个会话记住的已核查句子数 (超出时忘掉最久没出现过的)
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END.split(text.strip()) if s.strip()]
+
+
+def is_complete(sentence: str) -> bool:
+    return sentence[-1] in ".!?。！？"
+
+
+def normalize_sentence(sentence: str) -> str:
+    return " ".join(re.sub(r"[^\w\s%]", " ", sentence.lower()).split())
+
+
+def is_check_worthy(sentence: str) -> bool:
+    """启发式：够长、不是问句、不是主观观点、含有可核查的事实特征"""
+    if sentence.endswith("?") or sentence.endswith("？"):
+        return False
+    norm = normalize_sentence(sentence)
+    if len(norm.split()) < MIN_WORDS:
+        return False
+    if norm.startswith(_OPINION_PREFIXES):
+        return False
+    return bool(_FACTUAL_HINT.search(sentence))
+
+
+class PendingClaim:
+    __slots__ = ("id", "text", "key", "segment", "updated_at", "final")
+
+    def __init__(self, claim_id: int, text: str, key: str, segment: int):
+        self.id = claim_id
+        self.text = text
+        self.key = key
+        self.segment = segment
+        self.updated_at = time.monotonic()
+        self.final = False
+
+
+class RealibuddyStreamSession:
+    def __init__(self, websocket: WebSocket, service, source_filter: str = "all",
+                 debounce: float = DEBOUNCE_SECONDS, max_batch: int = MAX_BATCH,
+                 admission: Optional[AdmissionController] = None, client: str = "unknown"):
+        self.websocket = websocket
+        self.service = service
+        self.admission = admission  # None = 不做准入控制
+        self.client = client
+        self.source_filter = source_filter
+        self.debounce = debounce
+        self.max_batch = max_batch
+
+        self.segment = 0  # 当前这段话 (utterance) 的编号
+        self.pending: Dict[str, PendingClaim] = {}  # key = f"{segment}:{normalized}"
+        # 本次会话已核查过的句子 (归一化文本)，LRU，最多 MAX_CHECKED 条
+        self.checked: "OrderedDict[str, None]" = OrderedDict()
+        self.next_id = 1
+        self.wakeup = asyncio.Event()
+        self.flush_requested = False
+
+    # --- 转写处理 ---
+
+    def on_transcript(self, text: str, is_final: bool) -> None:
+        sentences = split_sentences(text)
+        segment = self.segment
+
+        # 最新识别结果里已经不存在的待核查句子 -> 被新语音覆盖，丢弃
+        current_keys = {f"{segment}:{normalize_sentence(s)}" for s in sentences}
+        for key, claim in list(self.pending.items()):
+            if claim.segment == segment and key not in current_keys:
+                del self.pending[key]
+                metrics.incr("realibuddy_stream.superseded")
+
+        for sentence in sentences:
+            # interim 结果的最后半句可能还没说完，不核查
+            if not is_final and not is_complete(sentence):
+                continue
+            if not is_check_worthy(sentence):
+                continue
+            norm = normalize_sentence(sentence)
+            if norm in self.checked:
+                self.checked.move_to_end(norm)
+                continue
+            key = f"{segment}:{norm}"
+            claim = self.pending.get(key)
+            if claim is None:
+                claim = PendingClaim(self.next_id, sentence, key, segment)
+                self.next_id += 1
+                self.pending[key] = claim
+                metrics.incr("realibuddy_stream.claims")
+            claim.final = claim.final or is_final
+
+        if is_final:
+            self.segment += 1
+
+        # 积压过多时丢弃最旧的，保证推送的是最近的话
+        while len(self.pending) > MAX_PENDING:
+            oldest = min(self.pending.values(), key=lambda c: c.id)
+            del self.pending[oldest.key]
+            metrics.incr("realibuddy_stream.dropped_backlog")
+
+        self.wakeup.set()
+
+    def take_ready_batch(self) -> List[PendingClaim]:
+        now = time.monotonic()
+        ready = [
+            c for c in self.pending.values()
+            if self.flush_requested or c.final or now - c.updated_at >= self.debounce
+        ]
+        ready.sort(key=lambda c: c.id)
+        batch = ready[:self.max_batch]
+        for claim in batch:
+            del self.pending[claim.key]
+            self.checked[claim.key.split(":", 1)[1]] = None
+        while len(self.checked) > MAX_CHECKED:
+            self.checked.popitem(last=False)
+        if len(ready) <= self.max_batch:
+            self.flush_requested = False
+        return batch
+
+    # --- 主循环 ---
+
+    async def run(self) -> None:
+        worker = asyncio.create_task(self._worker())
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("text") is None:
+                    # 二进制帧不在协议里：回一条 error，会话继续
+                    metrics.incr("realibuddy_stream.binary_frames")
+                    await self._send({"type": "error", "claim_ids": [], "message": "Binary frames are not supported."})
+                    continue
+                self._handle_message(message["text"])
+        except WebSocketDisconnect:
+            pass
+        finally:
+            worker.cancel()
+            if self.pending:
+                metrics.incr("realibuddy_stream.dropped_on_close", len(self.pending))
+
+    def _handle_message(self, raw: str) -> None:
+        try:
+            message = json.loads(raw)
+        except json.JSONDecodeError:
+            message = {"type": "transcript", "text": raw, "is_final": True}
+        if not isinstance(message, dict):
+            return
+
+        msg_type = message.get("type", "transcript")
+        if msg_type == "transcript":
+            self.on_transcript(str(message.get("text", "")), bool(message.get("is_final", False)))
+        elif msg_type == "config":
+            self.source_filter = message.get("source_filter", self.source_filter)
+        elif msg_type == "flush":
+            self.flush_requested = True
+            self.wakeup.set()
+
+    async def _worker(self) -> None:
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+
+            # 防抖：等一小段时间，让后续语音有机会修正/补全句子
+            if not self.flush_requested:
+                await asyncio.sleep(self.debounce)
+
+            batch = self.take_ready_batch()
+            if not batch:
+                if self.pending:
+                    self.wakeup.set()
+                continue
+            if self.pending:
+                self.wakeup.set()
+
+            try:
+                await self._check_batch(batch)
+            except Exception as e:
+                # 一批失败不能结束 worker：通知客户端，这些句子可以在后续转写里重新提交
+                print(f"[Realibuddy Stream] batch failed: {e}")
+                metrics.incr("realibuddy_stream.batch_errors")
+                for claim in batch:
+                    self.checked.pop(claim.key.split(":", 1)[1], None)
+                await self._send({"type": "error", "claim_ids": [c.id for c in batch],
+                                  "message": f"Verification failed: {e}"})
+
+    async def _check_batch(self, batch: List[PendingClaim]) -> None:
+        cost = 0.0
+        if self.admission is not None:
+            try:
+                cost = await self.admission.acquire(self.client, REALIBUDDY_COST)
+            except Overloaded as e:
+                await self._back_off(batch, e.retry_after)
+                return
+        metrics.incr("realibuddy_stream.batches")
+        metrics.observe("realibuddy_stream.batch_size", len(batch))
+        started = time.monotonic()
+        try:
+            verdicts = await self.service.verify_claims([c.text for c in batch], self.source_filter)
+        finally:
+            if self.admission is not None:
+                self.admission.release(cost, time.monotonic() - started)
+        for claim, verdict in zip(batch, verdicts):
+            await self._send({"type": "verdict", "claim_id": claim.id, "text": claim.text, **verdict})
+
+    async def _back_off(self, batch: List[PendingClaim], retry_after: float) -> None:
+        """过载：这批句子放回待核查队列 (仍受 MAX_PENDING 限制)，通知客户端，等 retry_after 秒再试"""
+        metrics.incr("realibuddy_stream.shed")
+        for claim in batch:
+            self.pending.setdefault(claim.key, claim)
+            self.checked.pop(claim.key.split(":", 1)[1], None)
+        while len(self.pending) > MAX_PENDING:
+            oldest = min(self.pending.values(), key=lambda c: c.id)
+            del self.pending[oldest.key]
+            metrics.incr("realibuddy_stream.dropped_backlog")
+        await self._send({"type": "busy", "claim_ids": [c.id for c in batch], "retry_after": math.ceil(retry_after)})
+        await asyncio.sleep(retry_after)
+        self.wakeup.set()
+
+    async def _send(self, payload: dict) -> None:
+        try:
+            await self.websocket.send_json(payload)
+        except Exception as e:
+            print(f"[Realibuddy Stream] send failed: {e}")
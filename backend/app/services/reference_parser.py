@@ -0,0 +1,117 @@
+"""
+引用抽取的确定性快速路径：参考文献列表里格式规范的条目不必等一次 Gemini 往返。
+
+逐条识别 (编号 "[1]" / "1." 开头的条目可以跨行)：
+- APA：Vaswani, A., Shazeer, N., & Polosukhin, I. (2017). Attention is all you need. In NeurIPS.
+- IEEE：[1] A. Vaswani, N. Shazeer, and I. Polosukhin, "Attention is all you need," in Proc. NeurIPS, 2017.
+- 只有标识符的行：doi:10.1038/nature14539 / https://doi.org/... / arXiv:1706.03762
+
+条目里的 DOI 一并取出；arXiv ID 保留在 raw_text 里，由 S2 批量查询识别 (semantic_scholar.s2_paper_id)。
+识别不了的片段 (正文段落、格式不规整的条目) 原样拼回 leftover，交给 LLM 抽取。
+返回的是字段 dict 而不是 CitationData (llm_extractor 负责编号和构造，避免循环导入)。
+"""
+import re
+from typing import List, Optional, Tuple
+
+_MARKER = re.compile(r"^\s*(?:\[\d{1,3}\]|\d{1,3}[.)])\s+")
+_DOI = re.compile(r"\b10\.\d{4,9}/[^\s\"<>]+")
+_ARXIV = re.compile(r"\barxiv(?:\.org/(?:abs|pdf))?[:\s./]*\d{4}\.\d{4,5}(?:v\d+)?", re.IGNORECASE)
+# 去掉标识符后剩下的只有这些 (标签 / URL 前缀 / 标点)，就算 "只有标识符的行"
+_ID_NOISE = re.compile(r"https?://(?:dx\.)?doi\.org/|https?:/*|\bdoi\b|\barxiv\b|\bid\b|[\s:.,;/()\[\]<>-]",
+                       re.IGNORECASE)
+
+_YEAR = re.compile(r"\b(?:19|20)\d{2}\b")
+# APA：作者 (年份). 标题. —— 作者部分必须像 "姓, 首字母." 的列表
+_APA = re.compile(
+    r"^(?P<authors>[^()]{2,400}?)\s*\((?P<year>(?:19|20)\d{2})[a-z]?(?:,[^)]*)?\)\.\s+"
+    r"(?P<title>[^.?!]{8,300}[?!]?)(?:[.?!]|$)"
+)
+_APA_AUTHOR = re.compile(r"[A-Z][\w'’-]+,\s*(?:[A-Z]\.\s*-?\s*)+")
+# IEEE：作者, "标题," 出处, 年份.
+_IEEE = re.compile(r'^(?P<authors>[^"“”]{2,400}?),?\s*["“](?P<title>[^"“”]{8,300}?)[,.]?\s*["”]')
+_IEEE_AUTHOR = re.compile(r"(?:[A-Z]\.\s*-?\s*)+[A-Z][\w'’-]+")
+
+_OPEN_ENDINGS = (",", ";", ":", "-", "–", " and", " in")
+MAX_ENTRY_CHARS = 800  # 更长的片段当作正文段落
+
+
+def _segments(text: str) -> List[str]:
+    """
+    按行切分；编号条目的续行并入该条目：紧跟其后、没有编号，并且缩进或上一行停在句子中间 (逗号等)
+    """
+    segments: List[str] = []
+    in_numbered = False
+    for line in text.splitlines():
+        if not line.strip():
+            in_numbered = False
+            segments.append("")
+        elif _MARKER.match(line):
+            in_numbered = True
+            segments.append(line.strip())
+        elif in_numbered and (line[:1].isspace() or segments[-1].endswith(_OPEN_ENDINGS)):
+            segments[-1] = f"{segments[-1]} {line.strip()}"
+        else:
+            in_numbered = False
+            segments.append(line.strip())
+    return segments
+
+
+def _clean_doi(match: Optional[re.Match]) -> Optional[str]:
+    return match.group(0).rstrip(".,;)]") if match else None
+
+
+def _clean_authors(authors: str) -> str:
+    return authors.strip().rstrip(",").strip()
+
+
+def parse_reference(entry: str) -> Optional[dict]:
+    """单条参考文献 -> CitationData 字段；不是规范格式时返回 None"""
+    if len(entry) > MAX_ENTRY_CHARS:
+        return None
+    body = _MARKER.sub("", entry, count=1).strip()
+    doi = _clean_doi(_DOI.search(body))
+
+    match = _APA.match(body)
+    if match and _APA_AUTHOR.match(match.group("authors").strip()):
+        title = match.group("title").strip()
+        return _fields(entry, title, _clean_authors(match.group("authors")), match.group("year"), doi)
+
+    match = _IEEE.match(body)
+    if match and _IEEE_AUTHOR.match(match.group("authors").strip()):
+        years = _YEAR.findall(_DOI.sub("", body[match.end():]))
+        return _fields(entry, match.group("title").strip(), _clean_authors(match.group("authors")),
+                       years[-1] if years else None, doi)
+
+    # 只有 DOI / arXiv ID
+    if doi or _ARXIV.search(body):
+        rest = _ARXIV.sub("", _DOI.sub("", body))
+        if not _ID_NOISE.sub("", rest):
+            return _fields(entry, None, None, None, doi)
+    return None
+
+
+def _fields(raw_text: str, title: Optional[str], author: Optional[str], year: Optional[str],
+            doi: Optional[str]) -> dict:
+    return {
+        "raw_text": raw_text,
+        "title": title,
+        "author": author,
+        "year": year,
+        "doi": doi,
+        # 参考文献条目本身只声称 "有这篇论文"：以标题作为待核对内容，只有标识符时为空
+        "summary_intent": title or "",
+        "specific_claims": [],
+    }
+
+
+def split_references(text: str) -> Tuple[List[dict], str]:
+    """返回 (识别出的条目字段, 剩余交给 LLM 的文本)"""
+    parsed: List[dict] = []
+    leftover: List[str] = []
+    for segment in _segments(text):
+        fields = parse_reference(segment) if segment else None
+        if fields is not None:
+            parsed.append(fields)
+        else:
+            leftover.append(segment)
+    return parsed, "\n".join(leftover).strip()
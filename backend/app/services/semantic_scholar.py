@@ -1,31 +1,186 @@
+"""
+Semantic Scholar 客户端：
+- 带 DOI / arXiv ID 的引用：一次请求的所有 ID 合并成一个 POST /paper/batch
+- 只有标题的引用：走 /paper/search
+
+环境变量：
+    S2_API_KEY=         (可选，放在 x-api-key 头里)
+    S2_MIN_INTERVAL=    (两次请求的最小间隔秒数；默认有 key 时 1.0，
+                         对应 S2 给 API key 的 1 req/s 限额，无 key 时不限速)
+"""
+import asyncio
 import httpx
 import difflib
-from typing import Optional, Dict, Any
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+
+from app.deadline import MIN_CALL, blame_deadline, has_budget, mark_limited, remaining, stage_timeout
+from app.json_codec import loads_response
+from app.metrics import metrics
+from app.services.author_match import AuthorIndex, parse_author_query
+from app.services.dedup import normalize_doi
+from app.services.paper import PaperRecord
+
+load_dotenv()
+
+API_BASE = "https://api.semanticscholar.org/graph/v1"
+# 只请求 PaperRecord 用到的字段
+FIELDS = "title,authors,year,abstract,openAccessPdf,citationCount,url"
+BATCH_LIMIT = 500  # /paper/batch 每次最多 500 个 ID
+
+API_KEY = os.getenv("S2_API_KEY") or None
+MIN_INTERVAL = float(os.getenv("S2_MIN_INTERVAL") or (1.0 if API_KEY else 0.0))
+
+_ARXIV = re.compile(r"arxiv(?:\.org/(?:abs|pdf))?[:\s./]*(\d{4}\.\d{4,5})(?:v\d+)?", re.IGNORECASE)
+
+
+class _Pacer:
+    """
+    保证相邻两次 S2 请求间隔至少 MIN_INTERVAL 秒 (进程内)。
+    先占好自己的时段再在锁外等待，并发请求不会排在一把锁后面串行睡眠；
+    时段落在请求截止时间之后时不占位、不等待，记为跳过。
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_slot = 0.0
+
+    async def wait(self) -> bool:
+        """等到自己的时段后返回 True；截止时间前轮不到时立即返回 False"""
+        if self.interval <= 0:
+            return True
+        # 读取和占位之间没有 await，在事件循环里是原子的，不需要锁
+        now = time.monotonic()
+        slot = max(now, self.next_slot)
+        left = remaining()
+        if left is not None and slot - now > left - MIN_CALL:
+            mark_limited("s2", "skipped")
+            return False
+        self.next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            metrics.observe("upstream.s2.paced_ms", delay * 1000)
+            await asyncio.sleep(delay)
+        return True
+
+
+_pacer = _Pacer(MIN_INTERVAL)
+
+
+def _headers() -> dict:
+    return {"x-api-key": API_KEY} if API_KEY else {}
+
+
+def s2_paper_id(cit) -> Optional[str]:
+    """引用的 S2 外部 ID ("DOI:..." / "ARXIV:...")，没有则返回 None"""
+    doi = normalize_doi(cit.doi)
+    if doi:
+        return f"DOI:{doi}"
+    for text in (cit.raw_text, cit.title):
+        match = _ARXIV.search(text or "")
+        if match:
+            return f"ARXIV:{match.group(1)}"
+    return None
+
+
+async def fetch_batch_from_semantic_scholar(ids: List[str]) -> Dict[str, Optional[dict]]:
+    """POST /paper/batch；返回 {id: paper 或 None}，请求失败的 ID 不出现在结果里"""
+    found: Dict[str, Optional[dict]] = {}
+    for start in range(0, len(ids), BATCH_LIMIT):
+        chunk = ids[start:start + BATCH_LIMIT]
+        if not await _pacer.wait() or not has_budget("s2"):
+            break
+        with metrics.track_upstream("s2"):
+            async with httpx.AsyncClient(timeout=stage_timeout(20)) as client:
+                response = await client.post(f"{API_BASE}/paper/batch", params={"fields": FIELDS},
+                                             json={"ids": chunk}, headers=_headers())
+        if response.status_code != 200:
+            print(f"[Semantic Scholar Batch Error] Status: {response.status_code}")
+            continue
+        # 返回列表与请求的 ids 一一对应，查不到的为 null
+        found.update(zip(chunk, loads_response(response, "s2")))
+    return found
+
+
+async def resolve_ids_on_semantic_scholar(citations: Iterable) -> Dict[str, PaperRecord]:
+    """
+    把一次请求里所有带 ID 的引用合并成一次批量查询。
+    返回 {s2_paper_id: PaperRecord}；批量请求失败的 ID 不在结果里 (调用方退回 search)。
+    """
+    ids = list(dict.fromkeys(filter(None, (s2_paper_id(cit) for cit in citations))))
+    if not ids:
+        return {}
+    metrics.incr("upstream.s2.batch_ids", len(ids))
+    try:
+        papers = await fetch_batch_from_semantic_scholar(ids)
+    except Exception as e:
+        blame_deadline("s2")
+        print(f"[Semantic Scholar Batch Error] {e}")
+        return {}
+    return {
+        paper_id: PaperRecord.from_semantic_scholar(paper) if paper
+        else PaperRecord.not_found("Not found in Semantic Scholar", source="Semantic Scholar")
+        for paper_id, paper in papers.items()
+    }
+
 
+class S2BatchLookup:
+    """
+    一次请求内共享的批量查询：第一条需要 S2 兜底的带 ID 引用触发一次 /paper/batch
+    (包含本请求所有带 ID 的引用)，之后的引用复用同一结果。OpenAlex 全部命中时不发请求。
+    """
 
-async def search_paper_on_semantic_scholar(title: str, author: Optional[str] = None) -> Dict[str, Any]:
+    def __init__(self, citations: Iterable):
+        self.citations = list(citations)
+        self.task: Optional[asyncio.Future] = None
+
+    async def get(self, cit) -> Optional[PaperRecord]:
+        """返回批量结果；引用没有 ID 或批量请求失败时返回 None (调用方退回 search)"""
+        paper_id = s2_paper_id(cit)
+        if not paper_id:
+            return None
+        if self.task is None:
+            self.task = asyncio.ensure_future(resolve_ids_on_semantic_scholar(self.citations))
+        # shield：一条引用被取消不应连带取消共享的批量请求
+        batch = await asyncio.shield(self.task)
+        return batch.get(paper_id)
+
+    def pending(self) -> List[asyncio.Future]:
+        return [self.task] if self.task is not None else []
+
+
+async def search_paper_on_semantic_scholar(title: str, author: Optional[str] = None) -> PaperRecord:
     if not title or len(title) < 3:
-        return {"found": False, "reason": "Title too short"}
+        return PaperRecord.not_found("Title too short", source="Semantic Scholar")
 
-    url = "https://api.semanticscholar.org/graph/v1/paper/search"
+    url = f"{API_BASE}/paper/search"
     params = {
         "query": title,
         "limit": 5,
-        "fields": "title,authors,year,abstract,openAccessPdf,citationCount,url,externalIds"
+        "fields": FIELDS,
     }
 
     try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            response = await client.get(url, params=params)
+        # 截止时间前轮不到限速时段时直接放弃；等待之后再看一次预算
+        if not await _pacer.wait() or not has_budget("s2"):
+            return PaperRecord.not_found("Deadline reached before Semantic Scholar lookup",
+                                         source="Semantic Scholar")
+        with metrics.track_upstream("s2"):
+            async with httpx.AsyncClient(timeout=stage_timeout(20)) as client:
+                response = await client.get(url, params=params, headers=_headers())
 
         if response.status_code != 200:
-            return {"found": False, "reason": f"S2 API Error {response.status_code}"}
+            return PaperRecord.not_found(f"S2 API Error {response.status_code}", source="Semantic Scholar")
 
-        data = response.json()
+        data = loads_response(response, "s2")
         results = data.get("data", [])
 
         if not results:
-            return {"found": False, "reason": "Not found in Semantic Scholar"}
+            return PaperRecord.not_found("Not found in Semantic Scholar", source="Semantic Scholar")
 
         # --- 筛选逻辑 ---
         # 复用 OpenAlex 的筛选思路：优先匹配作者
@@ -33,21 +188,16 @@ async def search_paper_on_semantic_scholar(title: str, author: Optional[str] = N
 
         clean_title = title.lower().replace('"', '').replace("'", "").strip()
 
+        # 引用作者只解析一次；每个候选的作者列表建一次索引
+        author_queries = parse_author_query(author)
+
         for paper in results:
-            paper_authors = [a["name"] for a in paper.get("authors", [])]
             paper_title = paper.get("title", "") or ""
 
-            # 作者匹配
-            author_match = False
-            if author:
-                q_parts = set(author.lower().replace(",", "").split())
-                for db_author in paper_authors:
-                    db_parts = set(db_author.lower().replace(",", "").split())
-                    if q_parts.intersection(db_parts):
-                        author_match = True
-                        break
-            else:
-                author_match = True  # 没提供作者就当匹配
+            # 作者匹配 (没提供作者就当匹配)
+            author_match = not author_queries or AuthorIndex(
+                a["name"] for a in paper.get("authors") or []
+            ).matches_any(author_queries)
 
             # 标题相似度
             title_sim = difflib.SequenceMatcher(None, clean_title, paper_title.lower()).ratio()
@@ -58,21 +208,12 @@ async def search_paper_on_semantic_scholar(title: str, author: Optional[str] = N
                 break
 
         if not best_match:
-            return {"found": False, "reason": "Found candidates but details mismatch"}
+            return PaperRecord.not_found("Found candidates but details mismatch", source="Semantic Scholar")
 
         # 提取数据
-        return {
-            "found": True,
-            "title": best_match.get("title"),
-            "year": str(best_match.get("year", "")),
-            "authors": [a["name"] for a in best_match.get("authors", [])[:3]],
-            "abstract": best_match.get("abstract", ""),
-            "oa_url": best_match.get("openAccessPdf", {}).get("url") if best_match.get(
-                "openAccessPdf") else best_match.get("url"),
-            "cited_by_count": best_match.get("citationCount", 0),
-            "source": "Semantic Scholar"
-        }
+        return PaperRecord.from_semantic_scholar(best_match)
 
     except Exception as e:
+        blame_deadline("s2")
         print(f"[Semantic Scholar Error] {e}")
-        return {"found": False, "reason": str(e)}
\ No newline at end of file
+        return PaperRecord.not_found(str(e), source="Semantic Scholar")
\ No newline at end of file
@@ -0,0 +1,101 @@
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.services.cache import TTLCache
+
+# 时效性强的陈述：prompt 里带了今天的日期，结论可能随时间变化
+_NEWS_HINT = re.compile(
+    r"\b(today|tonight|yesterday|tomorrow|now|currently|current|latest|recent|recently|breaking|"
+    r"this (week|month|year|season)|last (week|month|night)|so far|still|"
+    r"president|prime minister|ceo|chancellor|governor|mayor|election|poll|"
+    r"stock|shares|price|inflation|rate|ranking|ranked|record|champion|score)\b",
+    re.IGNORECASE,
+)
+_YEAR = re.compile(r"\b(19|20)\d{2}\b")
+
+NEWS_SOURCE_FILTERS = {"news", "social"}
+
+
+def normalize_claim(text: str) -> str:
+    """大小写 / 标点 / 空白 不影响缓存命中"""
+    tokens = (t.strip(".") for t in re.sub(r"[^\w\s%.]", " ", text.lower()).split())
+    return " ".join(t for t in tokens if t)
+
+
+def classify_claim(text: str, source_filter: str) -> str:
+    """'news' (短 TTL) 或 'stable' (长 TTL)"""
+    if source_filter in NEWS_SOURCE_FILTERS:
+        return "news"
+    if _NEWS_HINT.search(text):
+        return "news"
+    this_year = datetime.now().year
+    if any(int(m.group(0)) >= this_year - 1 for m in _YEAR.finditer(text)):
+        return "news"
+    return "stable"
+
+
+class VerdictCache:
+    """
+    Realibuddy 结论缓存：key = 模型 + source_filter + 归一化陈述。
+    - news 类：短 TTL，且不跨过当天 (prompt 里的日期变了结论可能就变了)
+    - stable 类：长 TTL (如 "water boils at 100°C")
+    - 设置 REALIBUDDY_CACHE_PATH 时持久化到 JSON 文件
+    """
+
+    def __init__(self):
+        self.news_ttl = float(os.getenv("REALIBUDDY_CACHE_NEWS_TTL", 3600))
+        self.stable_ttl = float(os.getenv("REALIBUDDY_CACHE_STABLE_TTL", 30 * 24 * 3600))
+        self.path = os.getenv("REALIBUDDY_CACHE_PATH") or None
+        self.save_every = 25
+        self._writes_since_save = 0
+        self.cache = TTLCache(maxsize=int(os.getenv("REALIBUDDY_CACHE_SIZE", 2048)), ttl=self.stable_ttl)
+        self.hits_by_kind = {"news": 0, "stable": 0}
+
+        if self.path:
+            try:
+                print(f"[Realibuddy Cache] Loaded {self.cache.load(self.path)} verdicts from {self.path}")
+            except Exception as e:
+                print(f"[Realibuddy Cache] Failed to load {self.path}: {e}")
+
+    @staticmethod
+    def make_key(text: str, source_filter: str, model_name: str) -> str:
+        return f"{model_name}|{source_filter}|{normalize_claim(text)}"
+
+    def ttl_for(self, text: str, source_filter: str) -> float:
+        if classify_claim(text, source_filter) == "stable":
+            return self.stable_ttl
+        now = datetime.now()
+        end_of_day = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        return min(self.news_ttl, (end_of_day - now).total_seconds())
+
+    def get(self, text: str, source_filter: str, model_name: str) -> Optional[dict]:
+        verdict = self.cache.get(self.make_key(text, source_filter, model_name))
+        if verdict is not None:
+            self.hits_by_kind[classify_claim(text, source_filter)] += 1
+            return dict(verdict)
+        return None
+
+    def set(self, text: str, source_filter: str, model_name: str, verdict: dict) -> None:
+        # 系统错误不缓存
+        if not isinstance(verdict, dict) or verdict.get("source") == "System Error":
+            return
+        self.cache.set(self.make_key(text, source_filter, model_name), verdict,
+                       ttl=self.ttl_for(text, source_filter))
+
+        self._writes_since_save += 1
+        if self.path and self._writes_since_save >= self.save_every:
+            self.save()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        try:
+            self.cache.dump(self.path)
+            self._writes_since_save = 0
+        except Exception as e:
+            print(f"[Realibuddy Cache] Failed to save {self.path}: {e}")
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "hits_by_kind": dict(self.hits_by_kind), "persistent": bool(self.path)}
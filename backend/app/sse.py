@@ -0,0 +1,154 @@
+"""
+Server-Sent Events：标准 data:/id: 分帧、keep-alive 注释、可选 gzip，
+以及可续传的生成缓冲 —— 客户端断线后带 Last-Event-ID 重连，从断点继续读，不再调用 LLM。
+
+事件 ID 格式为 "<stream_id>:<seq>"。生成任务独立于连接运行，结果写入 ResumableStream；
+所有连接都断开后再等 SSE_RESUME_GRACE 秒，仍无人重连才取消生成。
+
+环境变量：
+    SSE_KEEPALIVE=15        (多少秒无数据时发送一次 ": keep-alive" 注释)
+    SSE_RESUME_TTL=120      (生成结束后缓冲保留多久)
+    SSE_RESUME_GRACE=10     (全部连接断开后，生成任务继续跑多久等待重连)
+    SSE_RESUME_MAX=256      (最多保留多少个流)
+    SSE_GZIP=0              (1 = 客户端支持时用 gzip 压缩，每个事件后 SYNC_FLUSH)
+"""
+import asyncio
+import os
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional, Tuple
+
+from app.metrics import metrics
+from app.streaming import cancel_pending
+
+KEEPALIVE_INTERVAL = float(os.getenv("SSE_KEEPALIVE", 15))
+RESUME_TTL = float(os.getenv("SSE_RESUME_TTL", 120))
+RESUME_GRACE = float(os.getenv("SSE_RESUME_GRACE", 10))
+RESUME_MAX = int(os.getenv("SSE_RESUME_MAX", 256))
+GZIP_ENABLED = os.getenv("SSE_GZIP", "0") == "1"
+
+KEEPALIVE = ": keep-alive\n\n"
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # 关闭 nginx 等反向代理的缓冲
+}
+
+
+def sse_event(data: str, event_id: Optional[str] = None, event: Optional[str] = None) -> str:
+    """一条 SSE 事件；多行数据拆成多个 data: 行 (客户端按 \\n 拼回)"""
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+def wants_gzip(accept_encoding: Optional[str]) -> bool:
+    return GZIP_ENABLED and "gzip" in (accept_encoding or "").lower()
+
+
+async def gzip_stream(events: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """逐事件压缩并 SYNC_FLUSH，保证每个事件立即可解码 (不会被压缩器攒着)"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for text in events:
+        yield compressor.compress(text.encode("utf-8")) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+class ResumableStream:
+    def __init__(self, stream_id: str):
+        self.id = stream_id
+        self.chunks: List[str] = []
+        self.done = False
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.producer: Optional[asyncio.Task] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+
+    def append(self, data: str) -> None:
+        self.chunks.append(data)
+        self._notify()
+
+    def finish(self) -> None:
+        self.done = True
+        self.finished_at = time.time()
+        self._notify()
+
+    def _notify(self) -> None:
+        # 换一个新 Event：等待者持有旧的，被唤醒后再去拿新的
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self, after: int = 0, poll_interval: float = 0.5) -> AsyncIterator[Optional[Tuple[int, str]]]:
+        """
+        依次产出 (seq, chunk)，seq 从 1 开始、只产出 seq > after 的；
+        每 poll_interval 秒没有新数据时产出 None (调用方借此检查断线 / 发 keep-alive)；
+        生成结束且全部读完后停止。
+        """
+        seq = after
+        while True:
+            while seq < len(self.chunks):
+                seq += 1
+                yield seq, self.chunks[seq - 1]
+            if self.done:
+                return
+            changed = self._changed
+            try:
+                await asyncio.wait_for(changed.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                yield None
+
+    def release(self, label: str) -> None:
+        """一个连接结束；没有连接且仍在生成时，宽限期后取消生成任务"""
+        self.subscribers -= 1
+        if self.done or self.subscribers > 0 or self.producer is None:
+            return
+        asyncio.get_running_loop().call_later(RESUME_GRACE, self._abandon, label)
+
+    def _abandon(self, label: str) -> None:
+        if self.subscribers == 0 and not self.done and self.producer is not None:
+            if cancel_pending([self.producer], label):
+                print(f"[Stream] No reconnect for {self.id} within {RESUME_GRACE:.0f}s, generation aborted")
+
+
+class ResumableStreams:
+    def __init__(self):
+        self.streams: "OrderedDict[str, ResumableStream]" = OrderedDict()
+
+    def create(self) -> ResumableStream:
+        self._evict()
+        stream = ResumableStream(uuid.uuid4().hex[:16])
+        self.streams[stream.id] = stream
+        return stream
+
+    def resume(self, last_event_id: Optional[str]) -> Optional[Tuple[ResumableStream, int]]:
+        """解析 Last-Event-ID ("<stream_id>:<seq>")，返回 (stream, seq)；缓冲已过期返回 None"""
+        if not last_event_id or ":" not in last_event_id:
+            return None
+        stream_id, _, seq = last_event_id.strip().rpartition(":")
+        self._evict()
+        stream = self.streams.get(stream_id)
+        if stream is None or not seq.isdigit():
+            return None
+        return stream, int(seq)
+
+    def _evict(self) -> None:
+        now = time.time()
+        for stream_id in [sid for sid, s in self.streams.items()
+                          if s.done and now - s.finished_at > RESUME_TTL]:
+            del self.streams[stream_id]
+        while len(self.streams) > RESUME_MAX:
+            _, oldest = self.streams.popitem(last=False)
+            if oldest.producer is not None and not oldest.done:
+                cancel_pending([oldest.producer], "sse.evicted")
+
+    def __len__(self) -> int:
+        return len(self.streams)
+
+
+chat_streams = ResumableStreams()
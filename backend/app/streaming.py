@@ -0,0 +1,50 @@
+"""
+流式接口的公共逻辑：客户端断开时取消仍在运行的上游任务。
+
+用法：生产者任务把结果放进 asyncio.Queue，生成器从队列里取；
+watch_disconnect 轮询连接状态，断开后取消生产者并放入 DISCONNECTED 让生成器退出。
+"""
+import asyncio
+from typing import Iterable
+
+from fastapi import Request
+
+from app.metrics import metrics
+
+# 队列哨兵
+DISCONNECTED = object()
+STREAM_END = object()
+
+
+def _is_cancelling(task: asyncio.Future) -> bool:
+    cancelling = getattr(task, "cancelling", None)  # Python 3.11+
+    return bool(cancelling()) if cancelling else False
+
+
+def cancel_pending(tasks: Iterable[asyncio.Future], label: str) -> int:
+    """取消尚未完成的任务，返回被取消的数量并记入 <label>.aborted_tasks"""
+    aborted = 0
+    for task in tasks:
+        # 已经在取消中的任务 (watch_disconnect 取消过) 不重复计数
+        if not task.done() and not _is_cancelling(task):
+            task.cancel()
+            aborted += 1
+    if aborted:
+        metrics.incr(f"{label}.aborted_tasks", aborted)
+    return aborted
+
+
+async def watch_disconnect(request: Request, tasks: list, queue: asyncio.Queue, label: str,
+                           poll_interval: float = 0.5) -> None:
+    """
+    任务全部结束前，每 poll_interval 秒检查一次客户端是否断开。
+    断开则取消剩余任务 (进行中的 httpx / Gemini 请求随之中止)。
+    """
+    while not all(task.done() for task in tasks):
+        if await request.is_disconnected():
+            aborted = cancel_pending(tasks, label)
+            metrics.incr(f"{label}.disconnects")
+            print(f"[Stream] Client disconnected ({label}), aborted {aborted} task(s)")
+            await queue.put(DISCONNECTED)
+            return
+        await asyncio.sleep(poll_interval)
@@ -0,0 +1,160 @@
+"""
+摘要重建 / 论文记录 基准测试 (CPU + 内存)
+
+用法 (在 backend/ 目录下):
+    # 直接从 OpenAlex 拉取摘要最长的一批论文
+    python -m benchmarks.bench_abstract --fetch 50
+
+    # 使用本地保存的 OpenAlex /works 响应 (JSON 或 NDJSON，每个 work 需含 abstract_inverted_index)
+    python -m benchmarks.bench_abstract --file works.json
+
+    # 离线：按 Zipf 分布合成倒排索引
+    python -m benchmarks.bench_abstract --synthetic 200 --words 3000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import timeit
+import tracemalloc
+
+from app.services.paper import PaperRecord, reconstruct_abstract
+
+
+def legacy_reconstruct_abstract(inverted_index):
+    """旧实现：(pos, word) 元组列表 + 排序"""
+    if not inverted_index:
+        return ""
+    word_list = []
+    for word, positions in inverted_index.items():
+        for pos in positions:
+            word_list.append((pos, word))
+    word_list.sort(key=lambda x: x[0])
+    return " ".join([w[1] for w in word_list])
+
+
+def legacy_format_result(paper):
+    """旧实现：无论是否需要都立即重建摘要，返回普通 dict"""
+    return {
+        "found": True,
+        "title": paper.get("title"),
+        "doi": paper.get("doi"),
+        "year": str(paper.get("publication_year")),
+        "authors": [a["author"]["display_name"] for a in paper.get("authorships", [])[:3]],
+        "is_oa": paper.get("open_access", {}).get("is_oa", False),
+        "oa_url": paper.get("open_access", {}).get("oa_url", None),
+        "abstract": legacy_reconstruct_abstract(paper.get("abstract_inverted_index")),
+        "cited_by_count": paper.get("cited_by_count", 0),
+        "id": paper.get("id"),
+    }
+
+
+def load_works_from_file(path):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+        works = data.get("results", data) if isinstance(data, dict) else data
+    except json.JSONDecodeError:
+        works = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [w for w in works if w.get("abstract_inverted_index")]
+
+
+def fetch_works(n):
+    import httpx
+
+    params = {
+        "filter": "has_abstract:true,cited_by_count:>1000",
+        "sort": "cited_by_count:desc",
+        "per_page": min(n, 200),
+        "select": "id,doi,title,publication_year,authorships,open_access,cited_by_count,abstract_inverted_index",
+    }
+    response = httpx.get("https://api.openalex.org/works", params=params, timeout=60)
+    response.raise_for_status()
+    return [w for w in response.json()["results"] if w.get("abstract_inverted_index")][:n]
+
+
+def synthetic_works(n, words, seed=42):
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(5000)]
+    weights = [1.0 / (i + 1) for i in range(len(vocab))]
+    works = []
+    for i in range(n):
+        index = {}
+        for pos, word in enumerate(rng.choices(vocab, weights, k=words)):
+            index.setdefault(word, []).append(pos)
+        works.append({
+            "id": f"W{i}", "title": f"Synthetic {i}", "publication_year": 2020,
+            "authorships": [{"author": {"display_name": f"Author {j}"}} for j in range(5)],
+            "open_access": {"is_oa": False}, "cited_by_count": 0,
+            "abstract_inverted_index": index,
+        })
+    return works
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file")
+    parser.add_argument("--fetch", type=int)
+    parser.add_argument("--synthetic", type=int)
+    parser.add_argument("--words", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.file:
+        works = load_works_from_file(args.file)
+    elif args.fetch:
+        works = fetch_works(args.fetch)
+    else:
+        works = synthetic_works(args.synthetic or 200, args.words)
+
+    if not works:
+        sys.exit("No works with abstract_inverted_index found.")
+
+    indexes = [w["abstract_inverted_index"] for w in works]
+    total_tokens = sum(len(p) for idx in indexes for p in idx.values())
+    print(f"works={len(works)} tokens={total_tokens} avg_tokens={total_tokens / len(works):.0f}")
+
+    # 正确性：两种实现结果一致
+    for idx in indexes:
+        assert reconstruct_abstract(idx) == legacy_reconstruct_abstract(idx)
+
+    print("\n== reconstruct_abstract (CPU, best of repeat) ==")
+    for name, fn in (("legacy sort", legacy_reconstruct_abstract), ("linear", reconstruct_abstract)):
+        best = min(timeit.repeat(lambda: [fn(i) for i in indexes], number=1, repeat=args.repeat))
+        _, peak = peak_memory(lambda: [fn(i) for i in indexes])
+        print(f"{name:<12} {best * 1e3 / len(indexes):8.3f} ms/abstract   peak {peak / 1024:9.1f} KiB")
+
+    print("\n== record construction (abstract never read, e.g. discarded DOI match) ==")
+    for name, fn in (("legacy dict", legacy_format_result), ("PaperRecord", PaperRecord.from_openalex)):
+        best = min(timeit.repeat(lambda: [fn(w) for w in works], number=1, repeat=args.repeat))
+        _, peak = peak_memory(lambda: [fn(w) for w in works])
+        print(f"{name:<12} {best * 1e6 / len(works):8.1f} us/record    peak {peak / 1024:9.1f} KiB")
+
+    print("\n== record construction + abstract read ==")
+    start = time.perf_counter()
+    records = [PaperRecord.from_openalex(w) for w in works]
+    _ = [r.abstract for r in records]
+    lazy = time.perf_counter() - start
+    start = time.perf_counter()
+    _ = [legacy_format_result(w)["abstract"] for w in works]
+    eager = time.perf_counter() - start
+    print(f"legacy dict  {eager * 1e3:8.2f} ms total")
+    print(f"PaperRecord  {lazy * 1e3:8.2f} ms total")
+
+    print("\n== per-record object size (excluding shared strings) ==")
+    print(f"dict        {sys.getsizeof(legacy_format_result(works[0]))} bytes")
+    print(f"PaperRecord {sys.getsizeof(PaperRecord.from_openalex(works[0]))} bytes")
+
+
+if __name__ == "__main__":
+    main()
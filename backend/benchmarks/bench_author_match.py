@@ -0,0 +1,102 @@
+"""
+作者匹配基准测试：旧的逐作者 token 集合比对 vs author_match 索引。
+
+用法 (在 backend/ 目录下):
+    python -m benchmarks.bench_author_match
+    python -m benchmarks.bench_author_match --sizes 3 30 300 3000 --repeat 200
+
+作者列表按真实规模合成：普通论文 3~30 人，大合作论文 (高能物理 / 基因组) 数百到数千人，
+约三成名字带重音。分别测试 查询作者在列表开头 / 末尾 / 不在列表中 三种情况，
+以及同一候选列表被多次查询 (多个引用作者、阈值复核) 时索引复用的收益。
+另附一组边界用例，对比两种实现的判定结果。
+"""
+import argparse
+import random
+import timeit
+
+from app.services.author_match import AuthorIndex, author_matches, parse_author_query
+
+GIVEN = ["Ashish", "Noam", "Niki", "Jakob", "Llion", "Aidan", "Łukasz", "Illia", "José", "Zoë", "Søren", "Renée",
+         "Wei", "Yann", "Geoffrey", "Yoshua", "Fei-Fei", "Jürgen", "Sepp", "Andrés", "Chloé", "Mónica"]
+SURNAMES = ["Vaswani", "Shazeer", "Parmar", "Uszkoreit", "Jones", "Gomez", "Kaiser", "Polosukhin", "García",
+            "Müller", "Schmidhuber", "Hochreiter", "Zhang", "Wang", "LeCun", "Bengio", "Hinton", "Li", "Nguyễn",
+            "van der Maaten", "Østergaard", "Dubois", "Rodríguez", "Kowalski", "Smith", "Brown", "Johnson"]
+
+EDGE_CASES = [
+    # (引用作者, 论文作者列表)
+    ("A. Vaswani", ["Ashish Vaswani", "Noam Shazeer"]),
+    ("Vaswani, A.", ["Ashish Vaswani", "Noam Shazeer"]),
+    ("Vaswani A", ["Ashish Vaswani"]),
+    ("B. Vaswani", ["Ashish Vaswani"]),
+    ("Vaswani et al.", ["Ashish Vaswani"]),
+    ("Muller", ["Thomas Müller"]),
+    ("Müller", ["Thomas Muller"]),
+    ("Garcia and Lopez", ["María García", "Juan Pérez"]),
+    ("van der Maaten", ["Laurens van der Maaten"]),
+    ("LeCun, Y., Bengio, Y., & Hinton, G.", ["Geoffrey Hinton"]),
+    ("A. Smith", ["Adam Brown", "Zoe Smith"]),
+    ("Hinton 等", ["Geoffrey E. Hinton"]),
+]
+
+
+def legacy_check_author_match(query_author, paper_authors):
+    """旧实现 (openalex.check_author_match)"""
+    if not query_author:
+        return True
+    q_parts = set(query_author.lower().replace(",", "").replace(".", "").split())
+    q_parts.discard("et")
+    q_parts.discard("al")
+    for db_author in paper_authors:
+        db_parts = set(db_author.lower().replace(",", "").replace(".", "").split())
+        if q_parts.intersection(db_parts):
+            return True
+    return False
+
+
+def make_authors(n: int, rng: random.Random) -> list:
+    return [f"{rng.choice(GIVEN)} {rng.choice(SURNAMES)}{i}" for i in range(n)]
+
+
+def bench(sizes, repeat: int, seed: int) -> None:
+    rng = random.Random(seed)
+    print(f"{'authors':>8} {'position':>9} {'legacy us':>10} {'index us':>9} {'prebuilt us':>12} {'x5 legacy':>10} {'x5 index':>9}")
+    for n in sizes:
+        authors = make_authors(n, rng)
+        # 引用写法 "首字母. 姓"
+        cite = lambda name: f"{name[0]}. {name.split()[-1]}"
+        for position, query in (("first", cite(authors[0])), ("last", cite(authors[-1])),
+                                ("absent", "Q. Nobody et al.")):
+            queries = parse_author_query(query)
+            legacy = timeit.timeit(lambda: legacy_check_author_match(query, authors), number=repeat) / repeat
+            indexed = timeit.timeit(lambda: AuthorIndex(authors).matches_any(queries), number=repeat) / repeat
+            index = AuthorIndex(authors)
+            index.matches_any(parse_author_query("Q. Nobody"))  # 先把所有名字处理一遍
+            prebuilt = timeit.timeit(lambda: index.matches_any(queries), number=repeat) / repeat
+            # 同一候选列表查询 5 次 (多个引用作者 / 复核)：旧实现每次都重建 token 集合
+            legacy5 = timeit.timeit(lambda: [legacy_check_author_match(query, authors) for _ in range(5)],
+                                    number=repeat) / repeat
+            index5 = timeit.timeit(lambda: (lambda ix: [ix.matches_any(queries) for _ in range(5)])(
+                AuthorIndex(authors)), number=repeat) / repeat
+            print(f"{n:>8} {position:>9} {legacy * 1e6:>10.1f} {indexed * 1e6:>9.1f} {prebuilt * 1e6:>12.2f} "
+                  f"{legacy5 * 1e6:>10.1f} {index5 * 1e6:>9.1f}")
+
+
+def edge_cases() -> None:
+    print(f"\n{'query':<40} {'authors':<36} {'legacy':>7} {'new':>5}")
+    for query, authors in EDGE_CASES:
+        print(f"{query:<40} {', '.join(authors):<36} {str(legacy_check_author_match(query, authors)):>7} "
+              f"{str(author_matches(query, authors)):>5}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 30, 300, 3000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    bench(args.sizes, args.repeat, args.seed)
+    edge_cases()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+上游响应体积 / 解析耗时 对比：全量字段 vs select/fields 投影，标准库 json vs orjson
+
+用法 (在 backend/ 目录下，需要联网):
+    python -m benchmarks.bench_payload
+    python -m benchmarks.bench_payload --titles titles.txt   # 每行一个标题
+"""
+import argparse
+import json
+import time
+
+import httpx
+
+from app.services.openalex import OPENALEX_SELECT
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_TITLES = [
+    "Attention is all you need",
+    "Deep residual learning for image recognition",
+    "BERT: Pre-training of deep bidirectional transformers for language understanding",
+    "Generative adversarial nets",
+    "Mastering the game of Go with deep neural networks and tree search",
+]
+
+S2_FIELDS_BEFORE = "title,authors,year,abstract,openAccessPdf,citationCount,url,externalIds"
+S2_FIELDS_AFTER = "title,authors,year,abstract,openAccessPdf,citationCount,url"
+
+
+def parse_ms(body: bytes, loads, repeat: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        loads(body)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def measure(client: httpx.Client, url: str, params: dict) -> dict:
+    response = client.get(url, params=params)
+    response.raise_for_status()
+    body = response.content
+    row = {
+        "wire": response.num_bytes_downloaded,
+        "body": len(body),
+        "json_ms": parse_ms(body, json.loads),
+    }
+    if orjson is not None:
+        row["orjson_ms"] = parse_ms(body, orjson.loads)
+    return row
+
+
+def report(name: str, rows: list) -> None:
+    n = len(rows)
+    line = (f"{name:<22} wire {sum(r['wire'] for r in rows) / n / 1024:8.1f} KiB"
+            f"  body {sum(r['body'] for r in rows) / n / 1024:8.1f} KiB"
+            f"  json {sum(r['json_ms'] for r in rows) / n:7.2f} ms")
+    if orjson is not None:
+        line += f"  orjson {sum(r['orjson_ms'] for r in rows) / n:7.2f} ms"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--titles")
+    args = parser.parse_args()
+
+    titles = DEFAULT_TITLES
+    if args.titles:
+        with open(args.titles, encoding="utf-8") as f:
+            titles = [line.strip() for line in f if line.strip()]
+
+    oa_before, oa_after, s2_before, s2_after = [], [], [], []
+    with httpx.Client(timeout=60) as client:
+        for title in titles:
+            params = {"search": title, "per_page": 20, "mailto": "audit_test@realibuddy.com"}
+            oa_before.append(measure(client, "https://api.openalex.org/works", params))
+            oa_after.append(measure(client, "https://api.openalex.org/works", {**params, "select": OPENALEX_SELECT}))
+
+            s2_url = "https://api.semanticscholar.org/graph/v1/paper/search"
+            s2_before.append(measure(client, s2_url, {"query": title, "limit": 5, "fields": S2_FIELDS_BEFORE}))
+            time.sleep(1)  # S2 匿名访问限速
+            s2_after.append(measure(client, s2_url, {"query": title, "limit": 5, "fields": S2_FIELDS_AFTER}))
+            time.sleep(1)
+
+    print(f"per citation (avg over {len(titles)} titles), orjson={'yes' if orjson else 'not installed'}")
+    report("OpenAlex full", oa_before)
+    report("OpenAlex select=", oa_after)
+    report("S2 fields before", s2_before)
+    report("S2 fields after", s2_after)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+生成 lexical pre-screen 使用的 IDF 表 -> app/services/data/idf_en.json
+
+用法 (在 backend/ 目录下):
+    # 推荐：用 OpenAlex 摘要统计真实文档频率
+    python -m scripts.build_idf_table --openalex 5000
+
+    # 离线：用 wordfreq 的英文词频近似文档频率 (pip install wordfreq)
+    python -m scripts.build_idf_table --wordfreq
+"""
+import argparse
+import json
+import math
+import os
+from collections import Counter
+
+from app.services.lexical import _DATA_DIR, tokenize
+from app.services.paper import reconstruct_abstract
+
+# 估算文档频率时假设的摘要长度 (词数) 与语料规模
+ASSUMED_ABSTRACT_TOKENS = 180
+ASSUMED_DOCS = 1_000_000
+
+
+def df_from_openalex(n_docs: int) -> Counter:
+    import httpx
+
+    df = Counter()
+    cursor, fetched = "*", 0
+    with httpx.Client(timeout=60) as client:
+        while fetched < n_docs and cursor:
+            response = client.get("https://api.openalex.org/works", params={
+                "filter": "has_abstract:true,language:en",
+                "sample": n_docs, "seed": 42,
+                "per_page": 200, "cursor": cursor,
+                "select": "abstract_inverted_index",
+            })
+            response.raise_for_status()
+            data = response.json()
+            for work in data["results"]:
+                df.update(set(tokenize(reconstruct_abstract(work.get("abstract_inverted_index")))))
+                fetched += 1
+            cursor = data["meta"].get("next_cursor")
+    return df, fetched
+
+
+def df_from_wordfreq(top_n: int) -> Counter:
+    """词频 f -> 一篇摘要里至少出现一次的概率 1 - exp(-f * L)"""
+    from wordfreq import top_n_list, word_frequency
+
+    df = Counter()
+    for word in top_n_list("en", top_n):
+        # wordfreq 把数字折叠成 0 (如 "a000")，这些不是真实词
+        if any(ch.isdigit() for ch in word):
+            continue
+        for token in tokenize(word):
+            p_doc = 1 - math.exp(-word_frequency(word, "en") * ASSUMED_ABSTRACT_TOKENS)
+            df[token] = max(df[token], p_doc * ASSUMED_DOCS)
+    return df, ASSUMED_DOCS
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--openalex", type=int)
+    parser.add_argument("--wordfreq", action="store_true")
+    parser.add_argument("--top", type=int, default=8000, help="只保留 IDF 最低 (最常见) 的 N 个词")
+    parser.add_argument("--out", default=os.path.join(_DATA_DIR, "idf_en.json"))
+    args = parser.parse_args()
+
+    if args.openalex:
+        df, n_docs = df_from_openalex(args.openalex)
+        source = f"openalex sample ({n_docs} abstracts)"
+    else:
+        df, n_docs = df_from_wordfreq(args.top * 2)
+        source = f"wordfreq approximation (L={ASSUMED_ABSTRACT_TOKENS}, N={ASSUMED_DOCS})"
+
+    idf = {t: math.log((n_docs + 1) / (d + 1)) + 1 for t, d in df.items()}
+    kept = dict(sorted(idf.items(), key=lambda kv: kv[1])[:args.top])
+    table = {
+        "source": source,
+        # 表外的词都比表内任何词更罕见
+        "default": round(max(kept.values()) + 1, 3),
+        "idf": {t: round(v, 3) for t, v in sorted(kept.items())},
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False, separators=(",", ":"))
+    print(f"wrote {len(kept)} terms to {args.out} ({source})")
+
+
+if __name__ == "__main__":
+    main()
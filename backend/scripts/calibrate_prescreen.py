@@ -0,0 +1,90 @@
+"""
+在录制数据上校准 lexical pre-screen 阈值。
+
+录制：运行服务时设置 PRESCREEN_RECORD_PATH=prescreen.jsonl，
+每次交给 Gemini 的 (claim, abstract, LLM 结论) 会追加写入该文件。
+
+用法 (在 backend/ 目录下):
+    python -m scripts.calibrate_prescreen prescreen.jsonl --precision 0.95
+"""
+import argparse
+import json
+
+from app.services.lexical import has_negation, overlap_scores
+from app.services.numeric_claims import check_figures
+from app.services.prescreen import MIN_CLAIM_TERMS
+
+
+def frange(start, stop, step):
+    values, v = [], start
+    while v <= stop + 1e-9:
+        values.append(round(v, 3))
+        v += step
+    return values
+
+
+def best_thresholds(rows, label, keep, grid_cov, grid_cos, target):
+    """
+    在 precision >= target 的阈值组合里，选短路比例最高的；
+    比例相同时取先遍历到的 (网格按从严到宽排列)
+    """
+    best = None
+    for cov in grid_cov:
+        for cos in grid_cos:
+            picked = [r for r in rows if keep(r, cov, cos)]
+            if not picked:
+                continue
+            precision = sum(r["status"] == label for r in picked) / len(picked)
+            share = len(picked) / len(rows)
+            if precision >= target and (best is None or share > best[2]):
+                best = (cov, cos, share, precision)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    parser.add_argument("--precision", type=float, default=0.95)
+    args = parser.parse_args()
+
+    rows = []
+    with open(args.path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                # 用当前分词/IDF 表重新打分
+                row.update(overlap_scores(row["claim"], row["abstract"]))
+                row["figures_missing"] = bool(check_figures(row["claim"], row["abstract"]).missing)
+                row["negated"] = has_negation(row["claim"])
+                rows.append(row)
+    rows = [r for r in rows if r["claim_terms"] >= MIN_CLAIM_TERMS]
+    if not rows:
+        raise SystemExit("No usable samples.")
+
+    high = best_thresholds(
+        rows, "REAL",
+        lambda r, cov, cos: (r["coverage"] >= cov and r["cosine"] >= cos and not r["figures_missing"]
+                             and not r["negated"]),
+        frange(0.5, 0.95, 0.05)[::-1], frange(0.1, 0.6, 0.05)[::-1], args.precision,
+    )
+    low = best_thresholds(
+        rows, "MISMATCH",
+        lambda r, cov, cos: r["coverage"] <= cov and r["cosine"] <= cos,
+        frange(0.0, 0.3, 0.02), frange(0.0, 0.15, 0.01), args.precision,
+    )
+
+    print(f"samples={len(rows)} target_precision={args.precision}")
+    if high:
+        print(f"PRESCREEN_HIGH_COVERAGE={high[0]}\nPRESCREEN_HIGH_COSINE={high[1]}"
+              f"    # REAL short-circuit {high[2]:.1%}, precision {high[3]:.1%}")
+    else:
+        print("# no REAL thresholds reach the target precision")
+    if low:
+        print(f"PRESCREEN_LOW_COVERAGE={low[0]}\nPRESCREEN_LOW_COSINE={low[1]}"
+              f"    # MISMATCH short-circuit {low[2]:.1%}, precision {low[3]:.1%}")
+    else:
+        print("# no MISMATCH thresholds reach the target precision")
+
+
+if __name__ == "__main__":
+    main()
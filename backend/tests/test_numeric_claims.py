@@ -0,0 +1,22 @@
+from app.services.numeric_claims import check_figures
+
+
+def test_not_significant_does_not_support_p_threshold():
+    report = check_figures("p < 0.05", "The effect was not significant (p = 0.3)")
+    assert [f.raw for f in report.missing] == ["p < 0.05"]
+
+    for abstract in ("There was no significant difference between groups.",
+                     "Results were non-significant in the treatment arm.",
+                     "The change was not statistically significant."):
+        assert check_figures("p < 0.05", abstract).missing, abstract
+
+
+def test_contradicting_p_value_overrides_significance_wording():
+    report = check_figures("p < 0.05", "Accuracy improved significantly, although p = 0.12 for recall.")
+    assert report.missing
+
+
+def test_significance_wording_still_supports_p_threshold():
+    report = check_figures("p < 0.05", "The treatment significantly reduced symptoms.")
+    assert [f.raw for f in report.matched] == ["p < 0.05"]
+    assert check_figures("p < 0.05", "Symptoms dropped significantly (p = 0.01).").matched
@@ -0,0 +1,45 @@
+from app.services import prescreen as prescreen_module
+from app.services.lexical import has_negation
+from app.services.numeric_claims import check_figures
+from app.services.prescreen import prescreen
+
+TRANSFORMER_ABSTRACT = (
+    "The dominant sequence transduction models are based on complex recurrent or convolutional neural "
+    "networks that include an encoder and a decoder. The best performing models also connect the encoder "
+    "and decoder through an attention mechanism. We propose a new simple network architecture, the "
+    "Transformer, based solely on attention mechanisms, dispensing with recurrence and convolutions "
+    "entirely. Experiments on two machine translation tasks show these models to be superior in quality "
+    "while being more parallelizable and requiring significantly less time to train."
+)
+
+
+def test_negated_claim_is_not_short_circuited_as_real(monkeypatch):
+    # 预筛默认关闭，这里打开后检查它本身的判定
+    monkeypatch.setattr(prescreen_module, "ENABLED", True)
+    claim = ("The Transformer is not based on attention mechanisms and does not dispense with "
+             "recurrence and convolutions")
+    verdict = prescreen(claim, TRANSFORMER_ABSTRACT, check_figures(claim, TRANSFORMER_ABSTRACT))
+    assert verdict is None or verdict["status"] != "REAL"
+
+    affirmed = "The Transformer is based solely on attention mechanisms, dispensing with recurrence and convolutions"
+    assert prescreen(affirmed, TRANSFORMER_ABSTRACT, check_figures(affirmed, TRANSFORMER_ABSTRACT))["status"] == "REAL"
+
+
+def test_negation_cues():
+    for text in ("is not based", "no attention", "never converges", "without recurrence",
+                 "fails to converge", "doesn't use", "并非基于注意力"):
+        assert has_negation(text), text
+    assert not has_negation("The Transformer is based on attention mechanisms")
+
+
+def test_missing_figure_is_suspicious_with_default_flags(monkeypatch):
+    # 默认配置：词法阈值关闭，数字核对开启
+    monkeypatch.setattr(prescreen_module, "ENABLED", False)
+    monkeypatch.setattr(prescreen_module, "NUMERIC_ENABLED", True)
+    claim = ("The Transformer, based solely on attention mechanisms and dispensing with recurrence, "
+             "trains 73% faster than recurrent encoder decoder models")
+    verdict = prescreen(claim, TRANSFORMER_ABSTRACT, check_figures(claim, TRANSFORMER_ABSTRACT))
+    assert verdict is not None and verdict["status"] == "SUSPICIOUS"
+
+    affirmed = "The Transformer is based solely on attention mechanisms, dispensing with recurrence and convolutions"
+    assert prescreen(affirmed, TRANSFORMER_ABSTRACT, check_figures(affirmed, TRANSFORMER_ABSTRACT)) is None
@@ -0,0 +1,32 @@
+from app.services.prompt_budget import count_tokens, extraction_chunks
+
+FILLER = "This paragraph discusses general methodology and the broader context of the field in detail."
+FILLER_ZH = "本段讨论了该领域的一般方法和更广泛的背景，内容相当详细。"
+
+
+def _assert_chunked(cited, text, budget):
+    chunks = extraction_chunks(text, budget)
+    assert all(count_tokens(chunk) <= budget for chunk in chunks)
+    # 超出预算时切块，带引用线索的句子一句都不丢
+    assert all(any(sentence in chunk for chunk in chunks) for sentence in cited)
+
+
+def test_long_english_input_keeps_every_cited_sentence():
+    cited = [f"Smith{i} et al. (20{10 + i % 15}) reported that model {i} improves accuracy." for i in range(60)]
+    _assert_chunked(cited, " ".join(f"{sentence} {FILLER} {FILLER}" for sentence in cited), 1200)
+
+
+def test_long_chinese_input_keeps_every_cited_sentence():
+    cited = [f"王{i}等人（20{10 + i % 15}）指出该方法在第{i}个数据集上提升了准确率。" for i in range(60)]
+    _assert_chunked(cited, "".join(sentence + FILLER_ZH * 2 for sentence in cited), 1200)
+
+
+def test_input_without_cues_is_chunked_not_truncated():
+    text = "word " * 5000
+    chunks = extraction_chunks(text, 1200)
+    assert sum(len(chunk.split()) for chunk in chunks) == 5000
+
+
+def test_short_input_is_one_chunk():
+    assert extraction_chunks("Vaswani et al. (2017) introduced the Transformer.") == [
+        "Vaswani et al. (2017) introduced the Transformer."]
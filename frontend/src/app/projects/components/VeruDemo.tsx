@@ -12,6 +12,7 @@ type AuditItem = {
     message: string;
     source: string;
     metadata?: any;
+    deadline_limited?: boolean;
 };
 
 export default function VeruDemo() {
@@ -37,6 +38,12 @@ export default function VeruDemo() {
         body: JSON.stringify({ text: inputText }),
       });
 
+      if (response.status === 503) {
+        // Admission control shed the request; the server says when to retry
+        const retryAfter = response.headers.get("Retry-After") || "a few";
+        alert(`The audit engine is busy. Please retry in ${retryAfter} seconds.`);
+        return;
+      }
       if (!response.ok) throw new Error("Backend connection failed");
       if (!response.body) throw new Error("No response body");
 
@@ -125,7 +132,7 @@ export default function VeruDemo() {
                 <motion.div initial={{opacity:0, x:20}} animate={{opacity:1, x:0}} key={idx} className={`p-3 rounded border text-sm ${item.status === "REAL" ? "border-green-900/50 bg-green-900/10" : item.status === "FAKE" ? "border-red-900/50 bg-red-900/10" : "border-yellow-900/50 bg-yellow-900/10"}`}>
                    <div className="flex justify-between items-start mb-1">
                       <span className={`font-bold text-xs px-1.5 py-0.5 rounded ${item.status === "REAL" ? "bg-green-900 text-green-400" : item.status === "FAKE" ? "bg-red-900 text-red-100" : "bg-yellow-900 text-yellow-100"}`}>{item.status}</span>
-                      <span className="text-xs text-gray-500">via {item.source}</span>
+                      <span className="text-xs text-gray-500">via {item.source}{item.deadline_limited ? " · partial (time limit)" : ""}</span>
                    </div>
                    <div className="font-bold text-gray-300 mb-1 line-clamp-1">"{item.citation_text}"</div>
                    <div className="text-xs text-gray-400 opacity-80">{item.message}</div>
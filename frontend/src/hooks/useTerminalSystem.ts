@@ -242,34 +242,88 @@ Stack: Python, Next.js, C++, Haskell, PyTorch
     try {
       const apiUrl = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
-      const res = await fetch(`${apiUrl}/api/chat`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message: input }),
-      });
-
-      if (!res.ok) throw new Error("Network response was not ok");
-      if (!res.body) throw new Error("No response body");
-
-      const reader = res.body.getReader();
-      const decoder = new TextDecoder();
-
-      setHistory((prev) => [...prev, { role: "assistant", content: "" }]);
-
-      while (true) {
-        const { done, value } = await reader.read();
-        if (done) break;
-        const chunk = decoder.decode(value, { stream: true });
-
+      const appendToAssistant = (text: string) => {
         setHistory((prev) => {
           const newHistory = [...prev];
           const lastIndex = newHistory.length - 1;
           const lastMsg = newHistory[lastIndex];
           if (lastMsg.role === "assistant") {
-            newHistory[lastIndex] = { ...lastMsg, content: lastMsg.content + chunk };
+            newHistory[lastIndex] = { ...lastMsg, content: lastMsg.content + text };
           }
           return newHistory;
         });
+      };
+
+      // SSE stream; on a dropped connection, resend with Last-Event-ID to resume from the server buffer
+      let lastEventId = "";
+      let finished = false;
+      let started = false;
+
+      for (let attempt = 0; attempt < 3 && !finished; attempt++) {
+        try {
+          const headers: Record<string, string> = { "Content-Type": "application/json" };
+          if (lastEventId) headers["Last-Event-ID"] = lastEventId;
+
+          const res = await fetch(`${apiUrl}/api/chat`, {
+            method: "POST",
+            headers,
+            body: JSON.stringify({ message: input }),
+          });
+
+          if (res.status === 503) {
+            // Shed by admission control; a resume would not help either
+            const retryAfter = res.headers.get("Retry-After") || "a few";
+            setHistory((prev) => [...prev, { role: "system", content: `Neural Link busy. Retry in ${retryAfter} seconds.` }]);
+            break;
+          }
+          if (!res.ok) throw new Error("Network response was not ok");
+          if (!res.body) throw new Error("No response body");
+
+          if (!started) {
+            setHistory((prev) => [...prev, { role: "assistant", content: "" }]);
+            started = true;
+          }
+
+          const reader = res.body.getReader();
+          const decoder = new TextDecoder();
+          let buffer = "";
+
+          while (!finished) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // Events are separated by a blank line
+            let boundary: number;
+            while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+              const rawEvent = buffer.slice(0, boundary);
+              buffer = buffer.slice(boundary + 2);
+
+              let eventType = "message";
+              const dataLines: string[] = [];
+              for (const line of rawEvent.split("\n")) {
+                if (line.startsWith(":")) continue; // keep-alive comment
+                const sep = line.indexOf(":");
+                const field = sep === -1 ? line : line.slice(0, sep);
+                let fieldValue = sep === -1 ? "" : line.slice(sep + 1);
+                if (fieldValue.startsWith(" ")) fieldValue = fieldValue.slice(1);
+                if (field === "id") lastEventId = fieldValue;
+                else if (field === "event") eventType = fieldValue;
+                else if (field === "data") dataLines.push(fieldValue);
+              }
+
+              if (eventType === "done") {
+                finished = true;
+              } else if (dataLines.length) {
+                appendToAssistant(dataLines.join("\n"));
+              }
+            }
+          }
+          if (!finished && !lastEventId) break; // nothing to resume from
+        } catch (streamError) {
+          if (!lastEventId) throw streamError;
+          console.warn("Chat stream dropped, resuming...", streamError);
+        }
       }
     } catch (error) {
       console.error(error);